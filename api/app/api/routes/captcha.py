@@ -1,25 +1,181 @@
-from fastapi import APIRouter, Query
+import asyncio
+import functools
+import os
+import threading
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import JSONResponse
 from pydantic import HttpUrl
 
 from api.app.services.captcha_solver_service import solve_and_submit_captcha
 from api.app.services.captcha_solver_service import get_model_info
-from api.app.schemas.captcha import OCRModel
+from api.app.services.model_pool import model_pool
+from api.app.services.ocr_image_service import ocr_images
+from api.app.services.prediction_cache import prediction_cache
+from api.app.services.inference_executor import (
+    QueueFullError,
+    browser_executor,
+    ocr_executor,
+)
+from api.app.schemas.captcha import OCRModel, OCRResponse
 
 router = APIRouter(prefix="/captcha", tags=["captcha"])
 
+MAX_IMAGES = int(os.getenv("OCR_MAX_IMAGES", "128"))
+MAX_IMAGE_BYTES = int(os.getenv("OCR_MAX_IMAGE_BYTES", str(2 * 1024 * 1024)))
+
+
+# ============================================================
+# Exécution bornée (back-pressure + timeout)
+# ============================================================
+
+async def _run_bounded(executor, fn, *args, cancellable=False, **kwargs):
+    """
+    Exécute un traitement bloquant sur un exécuteur dédié : la boucle asyncio
+    reste libre pour /health et /captcha/model-info.
+
+    `cancellable=True` : `fn` reçoit un `cancel_event` positionné en cas
+    de timeout ou de déconnexion du client.
+    """
+    cancel_event = threading.Event()
+    if cancellable:
+        fn = functools.partial(fn, cancel_event=cancel_event)
+
+    try:
+        return await executor.run(fn, *args, cancel_event=cancel_event, **kwargs)
+    except QueueFullError:
+        return JSONResponse(
+            status_code=503,
+            content={"status": "error", "reason": "overloaded"},
+            headers={"Retry-After": "1"},
+        )
+    except asyncio.TimeoutError:
+        return JSONResponse(
+            status_code=504,
+            content={"status": "error", "reason": "timeout"},
+        )
+
 
 @router.get("/model-info")
-def model_info():
+async def model_info():
     return get_model_info()
 
 
+@router.get("/model-pool")
+async def model_pool_info():
+    return model_pool.stats()
+
+
+@router.get("/prediction-cache")
+async def prediction_cache_info():
+    return prediction_cache.stats()
+
+
+@router.get("/executors")
+async def executors_info():
+    return {
+        "ocr": ocr_executor.stats(),
+        "browser": browser_executor.stats(),
+    }
+
+
 @router.post("/solve-and-submit")
-def solve(
+async def solve(
     url: HttpUrl,
-    model: OCRModel = Query(default=OCRModel.a_jb_t)
+    model: OCRModel = Query(default=OCRModel.a_jb_t),
+    min_confidence: Optional[float] = Query(
+        default=None, ge=0, le=1, description="Do not submit answers below this confidence"
+    )
 ):
 
-    return solve_and_submit_captcha(
+    return await _run_bounded(
+        browser_executor,
+        solve_and_submit_captcha,
+        cancellable=True,
         url=str(url),
-        model=model.value
-    )
\ No newline at end of file
+        model=model.value,
+        min_confidence=min_confidence
+    )
+
+
+# ============================================================
+# OCR direct (upload d'images, sans navigateur)
+# ============================================================
+
+async def _read_raw_body(request: Request) -> bytes:
+    # Lecture en flux avec limite de taille (pas de chargement illimité en mémoire)
+    body = bytearray()
+    async for chunk in request.stream():
+        body.extend(chunk)
+        if len(body) > MAX_IMAGE_BYTES:
+            raise HTTPException(status_code=413, detail="image_too_large")
+    return bytes(body)
+
+
+async def _read_multipart(request: Request) -> list:
+    # Starlette parse le multipart en flux ; chaque partie est limitée en taille
+    form = await request.form(max_files=MAX_IMAGES, max_part_size=MAX_IMAGE_BYTES)
+
+    images = []
+    for field in ("files", "file"):
+        for upload in form.getlist(field):
+            if isinstance(upload, str):
+                continue
+            data = await upload.read()
+            if len(data) > MAX_IMAGE_BYTES:
+                raise HTTPException(status_code=413, detail="image_too_large")
+            images.append((upload.filename, data))
+            await upload.close()
+
+    return images
+
+
+@router.post(
+    "/ocr",
+    response_model=OCRResponse,
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "multipart/form-data": {
+                    "schema": {
+                        "type": "object",
+                        "properties": {
+                            "files": {
+                                "type": "array",
+                                "items": {"type": "string", "format": "binary"},
+                            }
+                        },
+                    }
+                },
+                "image/*": {"schema": {"type": "string", "format": "binary"}},
+                "application/octet-stream": {"schema": {"type": "string", "format": "binary"}},
+            },
+        }
+    },
+)
+async def ocr(
+    request: Request,
+    model: OCRModel = Query(default=OCRModel.a_jb_t),
+    top_k: int = Query(default=1, ge=1, le=10, description="Beam search alternatives per image")
+):
+    """
+    OCR d'une ou plusieurs images : multipart (`files`) ou octets bruts (image/*).
+    """
+    content_type = request.headers.get("content-type", "")
+
+    if content_type.startswith("multipart/form-data"):
+        images = await _read_multipart(request)
+    elif content_type.startswith("image/") or content_type.startswith("application/octet-stream"):
+        images = [(None, await _read_raw_body(request))]
+    else:
+        raise HTTPException(status_code=415, detail="unsupported_content_type")
+
+    if not images or not all(data for _, data in images):
+        raise HTTPException(status_code=400, detail="no_image")
+
+    if len(images) > MAX_IMAGES:
+        raise HTTPException(status_code=413, detail="too_many_images")
+
+    return await _run_bounded(ocr_executor, ocr_images, images, model.value, top_k=top_k)
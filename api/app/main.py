@@ -1,10 +1,25 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from api.app.api.routes import captcha
+from api.app.services.model_pool import model_pool, default_warmup_models
+from api.app.services.inference_executor import browser_executor, ocr_executor
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Préchargement des modèles OCR (une seule fois par processus)
+    model_pool.warmup(default_warmup_models())
+    yield
+    ocr_executor.shutdown()
+    browser_executor.shutdown()
+    model_pool.clear()
+
 
-app = FastAPI(title="Captcha Solver API")
+app = FastAPI(title="Captcha Solver API", lifespan=lifespan)
 
 @app.get("/health")
-def health():
+async def health():
     return {"status": "ok"}
 
 app.include_router(captcha.router)
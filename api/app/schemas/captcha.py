@@ -1,11 +1,24 @@
 from enum import Enum
+from typing import Dict, List, Optional
 from pydantic import BaseModel, HttpUrl, Field
 
 
 class OCRModel(str, Enum):
     a_jb_t = "a_jb_t"
+    a_jb_t_len6 = "a_jb_t_len6"
+    a_jb_t_onnx = "a_jb_t_onnx"
+    a_jb_t_int8_dynamic = "a_jb_t_int8_dynamic"
+    a_jb_t_int8_static = "a_jb_t_int8_static"
     easyocr = "easyocr"
+    easyocr_recog = "easyocr_recog"
     trocr_custom = "trocr_custom"
+    trocr_custom_compiled = "trocr_custom_compiled"
+    trocr_custom_int8 = "trocr_custom_int8"
+    trocr_custom_student = "trocr_custom_student"
+    trocr_custom_student_int8 = "trocr_custom_student_int8"
+    cascade_ctc_trocr = "cascade_ctc_trocr"
+    cascade_ctc_easyocr_trocr = "cascade_ctc_easyocr_trocr"
+    ensemble_ctc_trocr_easyocr = "ensemble_ctc_trocr_easyocr"
 
 
 class CaptchaRequest(BaseModel):
@@ -19,4 +32,35 @@ class CaptchaRequest(BaseModel):
     model: OCRModel = Field(
         default=OCRModel.a_jb_t,
         description="OCR model to use"
-    )
\ No newline at end of file
+    )
+
+class OCRAlternative(BaseModel):
+
+    text: str
+    logprob: float
+
+
+class OCRImageResult(BaseModel):
+
+    filename: Optional[str] = Field(default=None, description="Name of the uploaded file")
+    text: Optional[str] = Field(default=None, description="Recognized text")
+    confidence: Optional[float] = Field(default=None, description="Sequence confidence in [0, 1], if the model provides one")
+    logprob: Optional[float] = Field(default=None, description="Log-probability of the decoded sequence (CTC models)")
+    char_probs: Optional[List[float]] = Field(default=None, description="Max probability of each decoded character (CTC models)")
+    alternatives: Optional[List[OCRAlternative]] = Field(default=None, description="Top-k beam search hypotheses, if requested")
+    stage: Optional[str] = Field(default=None, description="Model that produced the answer (cascade)")
+    votes: Optional[Dict[str, str]] = Field(default=None, description="Answer of each member that met its deadline (ensemble)")
+    cached: bool = Field(default=False, description="Served from the prediction cache")
+    duration_ms: float = Field(..., description="OCR time for this image")
+    error: Optional[str] = Field(default=None, description="Decoding error, if any")
+
+
+class OCRResponse(BaseModel):
+
+    status: str
+    reason: Optional[str] = None
+    detail: Optional[str] = None
+    model: Optional[str] = None
+    model_label: Optional[str] = None
+    results: List[OCRImageResult] = Field(default_factory=list)
+    duration_ms: Optional[float] = None
@@ -1,82 +1,46 @@
 import time
-from pathlib import Path
-import shutil
+from contextlib import ExitStack
+from functools import partial
 from src.webscraping.captcha_solver import CaptchaSolver
-from api.app.services.ocr_service import OCRService
-from ocr.easyocr_predictor import EasyOCRPredictor
-from ocr.trocr_predictor import TrOCRPredictor
+from api.app.services.model_registry import MODEL_REGISTRY
+from api.app.services.model_pool import model_pool
+from api.app.services.prediction_cache import prediction_cache
 
 # ============================================================
-# Racine du projet
-# ============================================================
-
-BASE_DIR = Path(__file__).resolve().parents[3]
-
-# ============================================================
-# Registre des modèles OCR (SOURCE UNIQUE DE VÉRITÉ)
-# ============================================================
-
-MODEL_REGISTRY = {
-    "a_jb_t": {
-        "type": "ctc",
-        "label": "Anastasiia JB Théo Model",
-        "path": str(BASE_DIR / "models" / "ANASTASIIA_JB_THEO_9B2_PLUS_SITE_INFER.keras"),
-        "description": "Modèle robuste entraîné sur ensemble de captchas équilibré",
-        "default": True,
-    },
-    "trocr_custom": {
-        "type": "trocr",
-        "label": "TrOCR Custom",
-        "path": str(BASE_DIR / "models" / "trocr_custom"),
-        "description": "TrOCR finetuné sur captchas russes",
-        "default": False,
-    },
-    "easyocr": {
-        "type": "easyocr",
-        "label": "EasyOCR",
-        "path": None,
-        "description": "OCR générique basé sur EasyOCR (baseline externe)",
-        "default": False,
-    },
-}
-
-# ============================================================
-# Factory OCR (POINT D’ENTRÉE UNIQUE OCR)
+# API principale : résolution + soumission du captcha
 # ============================================================
 
-def get_ocr_predictor(model_key: str):
-
-    cfg = MODEL_REGISTRY.get(model_key)
-
-    if not cfg:
-        return None
-
-    if cfg["type"] == "ctc":
-        return OCRService(model_path=cfg["path"])
-
-    if cfg["type"] == "easyocr":
-        return EasyOCRPredictor()
-
-    if cfg["type"] == "trocr":
-        return TrOCRPredictor(cfg["path"])
-
-    return None
+def _cancelled(start) -> dict:
+    return {
+        "status": "error",
+        "reason": "cancelled",
+        "duration_sec": round(time.time() - start, 2),
+    }
 
 
-# ============================================================
-# API principale : résolution + soumission du captcha
-# ============================================================
+def solve_and_submit_captcha(url: str, model: str, save_captcha: bool = False, cancel_event=None,
+                             min_confidence: float = None) -> dict:
+    """
+    `cancel_event` (threading.Event) : positionné par l'appelant en cas de
+    timeout / déconnexion, la résolution s'arrête à l'étape suivante.
 
-def solve_and_submit_captcha(url: str, model: str) -> dict:
+    `min_confidence` : en dessous de cette confiance (modèles CTC), la
+    réponse n'est pas soumise ; l'appelant peut demander un autre captcha.
+    """
     start = time.time()
     solver = CaptchaSolver()
     captcha_path = None
+    # Modèle réservé jusqu'à la fin de la résolution (pas fermé par une éviction)
+    leases = ExitStack()
 
     try:
         # Charger la page
         solver.driver.get(url)
         solver.wait.until(lambda d: d.find_element("tag name", "body"))
 
+        if cancel_event is not None and cancel_event.is_set():
+            return _cancelled(start)
+
         # Détecter le CAPTCHA
         if not solver.extract_captcha():
             return {
@@ -85,9 +49,9 @@ def solve_and_submit_captcha(url: str, model: str) -> dict:
                 "duration_sec": round(time.time() - start, 2),
             }
 
-        # Sauvegarder l’image
-        captcha_path = solver.save_captcha_image()
-        if not captcha_path:
+        # Récupérer l’image en mémoire (aucun fichier sur le chemin critique)
+        captcha_bytes = solver.get_captcha_bytes()
+        if not captcha_bytes:
             return {
                 "status": "error",
                 "reason": "captcha_save_failed",
@@ -105,26 +69,61 @@ def solve_and_submit_captcha(url: str, model: str) -> dict:
                 "duration_sec": round(time.time() - start, 2),
             }
 
-        # OCR
-        predictor = get_ocr_predictor(model_key)
+        # OCR (modèle chargé une seule fois par processus)
+        predictor = leases.enter_context(model_pool.lease(model_key))
         if predictor is None:
             return {
                 "status": "error",
                 "reason": "ocr_initialization_failed",
                 "duration_sec": round(time.time() - start, 2),
             }
-        shutil.copy(captcha_path, "/tmp/api_raw.png")
-        prediction = predictor.predict(captcha_path)
+
+        # Même image déjà résolue (pool fini de captchas, relances) : servie par le cache
+        predict_bytes = partial(prediction_cache.predict_bytes, model_key, predictor)
+        details = prediction_cache.predict_many(model_key, predictor, [captcha_bytes], details=True)[0][0]
+        if details.get("error"):
+            return {
+                "status": "error",
+                "reason": "ocr_failed",
+                "detail": details["error"],
+                "duration_sec": round(time.time() - start, 2),
+            }
+
+        prediction = details["text"]
+        confidence = details.get("confidence")
+
+        # Archivage optionnel (hors chemin critique)
+        if save_captcha:
+            captcha_path = solver.save_captcha_image(captcha_bytes)
+
+        if cancel_event is not None and cancel_event.is_set():
+            return _cancelled(start)
+
+        # Réponse probablement fausse : mieux vaut un nouveau captcha qu'un échec soumis
+        if min_confidence is not None and confidence is not None and confidence < min_confidence:
+            return {
+                "url": url,
+                "model": model_key,
+                "model_label": cfg["label"],
+                "captcha_path": captcha_path,
+                "prediction": prediction,
+                "confidence": confidence,
+                "status": "skipped",
+                "reason": "low_confidence",
+                "success": None,
+                "duration_sec": round(time.time() - start, 2),
+            }
 
         # Soumission du CAPTCHA
-        # Callback OCR
-        model_callback = predictor.predict
+        # Callback OCR (octets de l’image)
+        model_callback = predict_bytes
 
         # Soumission du CAPTCHA (avec OCR intégré)
         result = solver.solve_with_model(
             url=url,
             model_callback=model_callback,
-            human_like=True
+            human_like=True,
+            in_memory=True
         )
 
         success = result.get("success")
@@ -145,6 +144,7 @@ def solve_and_submit_captcha(url: str, model: str) -> dict:
             "model_label": cfg["label"],
             "captcha_path": captcha_path,
             "prediction": prediction,
+            "confidence": confidence,
             "status": status,
             "reason": reason,
             "success": success,
@@ -159,6 +159,7 @@ def solve_and_submit_captcha(url: str, model: str) -> dict:
         }
 
     finally:
+        leases.close()
         solver.close()
 
 
@@ -0,0 +1,144 @@
+import json
+import os
+import threading
+from pathlib import Path
+
+from api.app.services.model_registry import BASE_DIR
+
+# Seuils calibrés par python -m ocr.calibrate_cascade (prioritaires sur le registre)
+THRESHOLDS_FILE = Path(os.getenv("CASCADE_THRESHOLDS_FILE", str(BASE_DIR / "models" / "cascade_thresholds.json")))
+
+
+def load_calibrated_thresholds(cascade_key: str):
+    if not THRESHOLDS_FILE.exists():
+        return None
+    with open(THRESHOLDS_FILE, encoding="utf-8") as f:
+        return json.load(f).get(cascade_key, {}).get("thresholds")
+
+
+class CascadePredictor:
+    """
+    Cascade de modèles : le modèle rapide (CTC) traite tout, seules les
+    images sous son seuil de confiance passent au modèle suivant.
+
+    `stages` : liste de {"model": clé du registre, "min_confidence": seuil}.
+    Le dernier étage accepte tout. Un étage sans confiance (TrOCR, EasyOCR)
+    accepte aussi tout ce qu'il reçoit.
+
+    Les modèles des étages sont pris dans le pool et épinglés à la
+    construction (jamais chargés deux fois, même s'ils sont aussi servis
+    seuls, ni évincés tant que la cascade est résidente) ; `close` les libère.
+    """
+
+    def __init__(self, cascade_key: str, stages: list, pool=None):
+        if pool is None:
+            from api.app.services.model_pool import model_pool as pool
+
+        self.cascade_key = cascade_key
+        self.pool = pool
+        self.stages = [dict(stage) for stage in stages]
+
+        self.predictors = []
+        for stage in self.stages:
+            predictor = self.pool.pin(stage["model"])
+            if predictor is None:
+                self.close()
+                raise RuntimeError(f"Cascade stage unavailable: {stage['model']}")
+            self.predictors.append(predictor)
+
+        calibrated = load_calibrated_thresholds(cascade_key)
+        if calibrated:
+            for stage, threshold in zip(self.stages, calibrated):
+                stage["min_confidence"] = threshold
+
+        self._lock = threading.Lock()
+        self._counts = [{"received": 0, "accepted": 0} for _ in self.stages]
+
+    # ======================
+    # PREDICT
+    # ======================
+    def predict(self, image_path: str) -> str:
+        return self.predict_details_batch([image_path])[0]["text"]
+
+    def predict_bytes(self, data) -> str:
+        return self.predict(data)
+
+    def predict_array(self, array) -> str:
+        return self.predict(array)
+
+    def predict_batch(self, items) -> list:
+        return [result["text"] for result in self.predict_details_batch(items)]
+
+    def predict_details_batch(self, items, top_k: int = 1) -> list:
+        results = [None] * len(items)
+        pending = list(range(len(items)))
+
+        for level, (stage, predictor) in enumerate(zip(self.stages, self.predictors)):
+            if not pending:
+                break
+
+            batch = [items[i] for i in pending]
+            if hasattr(predictor, "predict_details_batch"):
+                outputs = predictor.predict_details_batch(batch, top_k=top_k)
+            elif hasattr(predictor, "predict_batch"):
+                outputs = [{"text": text, "confidence": None} for text in predictor.predict_batch(batch)]
+            else:
+                outputs = [{"text": predictor.predict(item), "confidence": None} for item in batch]
+
+            is_last = level == len(self.stages) - 1
+            threshold = stage.get("min_confidence")
+
+            escalated = []
+            for i, output in zip(pending, outputs):
+                confidence = output.get("confidence")
+                accept = (
+                    is_last
+                    or threshold is None
+                    or confidence is None
+                    or confidence >= threshold
+                )
+                if accept:
+                    results[i] = {**output, "stage": stage["model"]}
+                else:
+                    escalated.append(i)
+
+            with self._lock:
+                self._counts[level]["received"] += len(pending)
+                self._counts[level]["accepted"] += len(pending) - len(escalated)
+
+            pending = escalated
+
+        return results
+
+    def warmup(self):
+        for predictor in self.predictors:
+            if hasattr(predictor, "warmup"):
+                predictor.warmup()
+
+    def close(self):
+        # Appelé par le pool à l'éviction de la cascade (après le dernier rendu)
+        predictors, self.predictors = self.predictors, []
+        for stage in self.stages[:len(predictors)]:
+            self.pool.unpin(stage["model"])
+
+    # ======================
+    # STATISTIQUES PAR ÉTAGE
+    # ======================
+    def stats(self) -> dict:
+        with self._lock:
+            total = self._counts[0]["received"] if self._counts else 0
+            return {
+                "stages": [
+                    {
+                        "model": stage["model"],
+                        "min_confidence": stage.get("min_confidence"),
+                        "received": counts["received"],
+                        "accepted": counts["accepted"],
+                        # Part des images résolues à cet étage / part des images qui l'atteignent
+                        "hit_rate": round(counts["accepted"] / total, 4) if total else None,
+                        "reach_rate": round(counts["received"] / total, 4) if total else None,
+                    }
+                    for stage, counts in zip(self.stages, self._counts)
+                ],
+                "images": total,
+            }
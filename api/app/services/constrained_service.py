@@ -0,0 +1,79 @@
+from api.app.services.micro_batcher import MicroBatcher
+from ocr.ctc_decoding import DecodingConstraints
+from ocr.preprocess import preprocess_item_np
+
+
+class ConstrainedPredictor:
+    """
+    Variante à décodage contraint d'un modèle CTC du registre.
+
+    Le modèle `base` est pris dans le pool et épinglé : ses poids ne sont
+    chargés qu'une fois, qu'il soit servi seul ou avec contraintes. Seul
+    le décodage change (DecodingConstraints passées à chaque appel).
+
+    `max_batch_size` : micro-batching propre à la variante (les requêtes
+    contraintes ne sont pas mélangées à celles du modèle de base).
+    """
+
+    def __init__(self, model_key: str, base: str, constraints: dict, max_batch_size: int = None,
+                 max_wait_ms: float = 5.0, pool=None):
+        if pool is None:
+            from api.app.services.model_pool import model_pool as pool
+
+        self.model_key = model_key
+        self.base_key = base
+        self.pool = pool
+        self.constraints = DecodingConstraints(**constraints)
+
+        self.base = self.pool.pin(base)
+        if self.base is None:
+            raise RuntimeError(f"Base model unavailable: {base}")
+
+        self.batcher = None
+        if max_batch_size:
+            self.batcher = MicroBatcher(
+                self.predict_details_batch,
+                max_batch_size=max_batch_size,
+                max_wait_ms=max_wait_ms,
+                # Décodage + prétraitement chez l'appelant : seul le modèle est batché
+                prepare=preprocess_item_np
+            )
+
+    # ======================
+    # PREDICT
+    # ======================
+    def predict(self, image_path: str) -> str:
+        return self.predict_details(image_path)["text"]
+
+    def predict_bytes(self, data) -> str:
+        return self.predict(data)
+
+    def predict_array(self, array) -> str:
+        return self.predict(array)
+
+    def predict_batch(self, items) -> list:
+        return self.base.predict_batch(items, constraints=self.constraints)
+
+    def predict_details(self, item) -> dict:
+        batcher = self.batcher
+        if batcher is not None:
+            return batcher.predict(item)
+
+        return self.predict_details_batch([item])[0]
+
+    def predict_details_batch(self, items, top_k: int = 1) -> list:
+        return self.base.predict_details_batch(items, top_k=top_k, constraints=self.constraints)
+
+    def warmup(self):
+        if hasattr(self.base, "warmup"):
+            self.base.warmup()
+
+    def close(self):
+        # Appelé par le pool à l'éviction de la variante (après le dernier rendu)
+        if self.batcher is not None:
+            self.batcher.close()
+            self.batcher = None
+
+        if self.base is not None:
+            self.base = None
+            self.pool.unpin(self.base_key)
@@ -0,0 +1,265 @@
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+# Confiance supposée d'un modèle qui n'en fournit pas (TrOCR)
+DEFAULT_CONFIDENCE = 0.5
+
+
+# ============================================================
+# Vote par caractère pondéré par la confiance
+# ============================================================
+
+def vote(candidates: list) -> dict:
+    """
+    `candidates` : liste de {"model", "text", "confidence", "char_probs", "weight"}.
+
+    1) longueur : celle qui cumule le plus de score (poids x confiance)
+    2) position par position, parmi les textes de cette longueur : le
+       caractère au plus fort score (probabilité du caractère si le modèle
+       la fournit, sinon sa confiance globale)
+    """
+    candidates = [c for c in candidates if c.get("text")]
+    if not candidates:
+        return {"text": "", "confidence": 0.0}
+
+    def score(c):
+        confidence = c.get("confidence")
+        return c["weight"] * (DEFAULT_CONFIDENCE if confidence is None else confidence)
+
+    by_length = defaultdict(float)
+    for c in candidates:
+        by_length[len(c["text"])] += score(c)
+    length = max(by_length, key=by_length.get)
+    aligned = [c for c in candidates if len(c["text"]) == length]
+
+    chars, shares = [], []
+    for j in range(length):
+        votes = defaultdict(float)
+        for c in aligned:
+            char_probs = c.get("char_probs")
+            if char_probs and len(char_probs) == length:
+                votes[c["text"][j]] += c["weight"] * char_probs[j]
+            else:
+                votes[c["text"][j]] += score(c)
+
+        best = max(votes, key=votes.get)
+        total = sum(votes.values())
+        chars.append(best)
+        shares.append(votes[best] / total if total > 0 else 0.0)
+
+    # Confiance : part moyenne des votes obtenue par chaque caractère retenu,
+    # ramenée à la part de score portée par la longueur retenue
+    length_share = by_length[length] / sum(by_length.values())
+    confidence = length_share * (sum(shares) / len(shares) if shares else 1.0)
+
+    return {"text": "".join(chars), "confidence": round(float(confidence), 6)}
+
+
+# ============================================================
+# Ensemble de modèles exécutés en parallèle
+# ============================================================
+
+class EnsemblePredictor:
+    """
+    Exécute plusieurs modèles du registre en parallèle sur les mêmes images
+    et combine leurs sorties par vote (voir `vote`).
+
+    `members` : liste de {"model", "weight", "deadline_ms"}. Un modèle qui
+    n'a pas répondu à son échéance (comptée depuis le début de son calcul)
+    est ignoré pour cette requête : la latence reste celle du modèle le
+    plus lent retenu, pas la somme.
+
+    Les membres sont épinglés dans le pool à la construction (libérés par
+    `close`) et partagent un pool de threads dimensionné pour
+    `max_concurrency` requêtes simultanées (par défaut : les workers OCR
+    de l'API). Seul un membre dont un calcul a dépassé son échéance et
+    tourne encore est sauté, jusqu'à la fin de ce calcul, au lieu d'empiler.
+    """
+
+    def __init__(self, ensemble_key: str, members: list, pool=None, max_concurrency: int = None):
+        if pool is None:
+            from api.app.services.model_pool import model_pool as pool
+        if max_concurrency is None:
+            from api.app.services.inference_executor import ocr_executor
+            max_concurrency = ocr_executor.max_workers
+
+        self.ensemble_key = ensemble_key
+        self.pool = pool
+        self.members = [
+            {"weight": 1.0, "deadline_ms": None, **member}
+            for member in members
+        ]
+
+        # Un membre qui ne se charge pas (dépendance absente...) est écarté
+        self.predictors = {}
+        for member in self.members:
+            try:
+                predictor = self.pool.pin(member["model"])
+            except Exception as e:
+                print(f"[ensemble] Loading {member['model']} failed: {e}")
+                continue
+            if predictor is None:
+                print(f"[ensemble] Unknown member: {member['model']}")
+                continue
+            self.predictors[member["model"]] = predictor
+
+        if not self.predictors:
+            raise RuntimeError(f"No ensemble member available: {ensemble_key}")
+
+        # Un thread par membre et par requête simultanée : pas d'attente derrière une autre requête
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_concurrency * len(self.predictors),
+            thread_name_prefix=f"ensemble-{ensemble_key}"
+        )
+        # Calculs en retard encore en cours, par membre
+        self._overrun = defaultdict(int)
+
+        self._lock = threading.Lock()
+        self._counts = {
+            m["model"]: {"answered": 0, "timeouts": 0, "errors": 0, "skipped": 0}
+            for m in self.members
+        }
+
+    # ======================
+    # PREDICT
+    # ======================
+    def predict(self, image_path: str) -> str:
+        return self.predict_details_batch([image_path])[0]["text"]
+
+    def predict_bytes(self, data) -> str:
+        return self.predict(data)
+
+    def predict_array(self, array) -> str:
+        return self.predict(array)
+
+    def predict_batch(self, items) -> list:
+        return [result["text"] for result in self.predict_details_batch(items)]
+
+    def _run_member(self, predictor, items: list, started: dict) -> list:
+        # L'échéance part d'ici, pas de la soumission
+        started["at"] = time.perf_counter()
+        started["event"].set()
+
+        if hasattr(predictor, "predict_details_batch"):
+            return predictor.predict_details_batch(items)
+        if hasattr(predictor, "predict_batch"):
+            return [{"text": text, "confidence": None} for text in predictor.predict_batch(items)]
+        return [{"text": predictor.predict(item), "confidence": None} for item in items]
+
+    def _submit(self, model_key: str, items: list):
+        with self._lock:
+            if self._overrun[model_key]:
+                return None
+
+        started = {"event": threading.Event(), "at": None}
+        predictor = self.predictors[model_key]
+        return self._executor.submit(self._run_member, predictor, items, started), started
+
+    def _mark_overrun(self, model_key: str, future):
+        # Membre sauté tant que ce calcul en retard n'est pas terminé
+        with self._lock:
+            self._overrun[model_key] += 1
+
+        def done(_):
+            with self._lock:
+                self._overrun[model_key] -= 1
+
+        future.add_done_callback(done)
+
+    def _wait(self, member: dict, future, started: dict) -> list:
+        deadline = member["deadline_ms"]
+        if deadline is None:
+            return future.result()
+
+        deadline = deadline / 1000.0
+        # Pool dimensionné pour la charge : le calcul démarre normalement aussitôt
+        if not started["event"].wait(timeout=deadline):
+            future.cancel()
+            raise FutureTimeoutError()
+        try:
+            return future.result(timeout=max(0.0, deadline - (time.perf_counter() - started["at"])))
+        except FutureTimeoutError:
+            # Le calcul continue en arrière-plan
+            self._mark_overrun(member["model"], future)
+            raise
+
+    def predict_details_batch(self, items, top_k: int = 1) -> list:
+        submitted = [
+            (member, self._submit(member["model"], items))
+            for member in self.members
+            if member["model"] in self.predictors
+        ]
+
+        outputs = {}
+        for member, job in submitted:
+            if job is None:
+                status = "skipped"
+            else:
+                future, started = job
+                try:
+                    outputs[member["model"]] = (member, self._wait(member, future, started))
+                    status = "answered"
+                except FutureTimeoutError:
+                    status = "timeouts"
+                except Exception as e:
+                    print(f"[ensemble] {member['model']} failed: {e}")
+                    status = "errors"
+
+            with self._lock:
+                self._counts[member["model"]][status] += 1
+
+        if not outputs:
+            # Erreur par image, comme un échec de décodage : l'appelant répond ocr_failed
+            return [
+                {"text": None, "confidence": None, "error": "no_ensemble_member_answered", "votes": {}}
+                for _ in items
+            ]
+
+        results = []
+        for i in range(len(items)):
+            candidates = [
+                {
+                    "model": model_key,
+                    "text": (preds[i].get("text") or "").strip().lower(),
+                    "confidence": preds[i].get("confidence"),
+                    "char_probs": preds[i].get("char_probs"),
+                    "weight": member["weight"],
+                }
+                for model_key, (member, preds) in outputs.items()
+            ]
+            result = vote(candidates)
+            result["votes"] = {c["model"]: c["text"] for c in candidates}
+            results.append(result)
+
+        return results
+
+    def warmup(self):
+        for predictor in self.predictors.values():
+            if hasattr(predictor, "warmup"):
+                predictor.warmup()
+
+    def close(self):
+        # Appelé par le pool à l'éviction de l'ensemble (après le dernier rendu)
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+        predictors, self.predictors = self.predictors, {}
+        for model_key in predictors:
+            self.pool.unpin(model_key)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "members": [
+                    {
+                        "model": m["model"],
+                        "weight": m["weight"],
+                        "deadline_ms": m["deadline_ms"],
+                        "available": m["model"] in self.predictors and not self._overrun[m["model"]],
+                        **self._counts[m["model"]],
+                    }
+                    for m in self.members
+                ]
+            }
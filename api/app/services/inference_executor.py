@@ -0,0 +1,118 @@
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class QueueFullError(Exception):
+    """Plus de place dans la file d'attente : la requête est refusée (back-pressure)."""
+
+
+class InferenceExecutor:
+    """
+    Exécuteur borné pour les traitements bloquants (inférence, navigateur).
+
+    - `max_workers` threads dédiés (hors threadpool de FastAPI)
+    - au plus `max_queue` tâches en attente au-delà des workers, sinon QueueFullError
+    - timeout par appel : la tâche encore en file est annulée, celle en cours
+      est abandonnée par l'appelant et libère sa place à la fin
+    """
+
+    def __init__(self, name: str, max_workers: int, max_queue: int, timeout: float = None):
+        self.name = name
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.timeout = timeout
+
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self._slots = threading.BoundedSemaphore(max_workers + max_queue)
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._rejected = 0
+        self._timeouts = 0
+
+    def _release(self, _future):
+        with self._lock:
+            self._pending -= 1
+        self._slots.release()
+
+    def submit(self, fn, *args, **kwargs):
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._rejected += 1
+            raise QueueFullError(f"{self.name}: queue full")
+
+        with self._lock:
+            self._pending += 1
+
+        future = self._executor.submit(fn, *args, **kwargs)
+        future.add_done_callback(self._release)
+        return future
+
+    async def run(self, fn, *args, timeout: float = None, cancel_event: threading.Event = None, **kwargs):
+        """
+        Exécute `fn` sur l'exécuteur sans bloquer la boucle asyncio.
+        Lève QueueFullError ou asyncio.TimeoutError.
+
+        `cancel_event` est positionné en cas de timeout ou d'annulation :
+        une tâche déjà démarrée peut le consulter pour s'arrêter au plus tôt.
+        """
+        future = self.submit(fn, *args, **kwargs)
+        timeout = self.timeout if timeout is None else timeout
+
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+        except asyncio.TimeoutError:
+            with self._lock:
+                self._timeouts += 1
+            self._cancel(future, cancel_event)
+            raise
+        except asyncio.CancelledError:
+            # Client déconnecté : on retire la tâche si elle n'a pas démarré
+            self._cancel(future, cancel_event)
+            raise
+
+    @staticmethod
+    def _cancel(future, cancel_event):
+        future.cancel()
+        if cancel_event is not None:
+            cancel_event.set()
+
+    def stats(self) -> dict:
+        with self._lock:
+            pending = self._pending
+            rejected = self._rejected
+            timeouts = self._timeouts
+
+        return {
+            "max_workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "in_flight": pending,
+            "queued": max(0, pending - self.max_workers),
+            "rejected": rejected,
+            "timeouts": timeouts,
+        }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+# ============================================================
+# Exécuteurs du processus
+# ============================================================
+
+# OCR pur : les workers en attente du micro-batcher ne coûtent qu'un thread
+ocr_executor = InferenceExecutor(
+    "ocr",
+    max_workers=int(os.getenv("OCR_WORKERS", "16")),
+    max_queue=int(os.getenv("OCR_MAX_QUEUE", "256")),
+    timeout=float(os.getenv("OCR_TIMEOUT_SEC", "30")),
+)
+
+# Session navigateur complète : lourde, peu de sessions simultanées
+browser_executor = InferenceExecutor(
+    "browser",
+    max_workers=int(os.getenv("BROWSER_WORKERS", "2")),
+    max_queue=int(os.getenv("BROWSER_MAX_QUEUE", "8")),
+    timeout=float(os.getenv("BROWSER_TIMEOUT_SEC", "180")),
+)
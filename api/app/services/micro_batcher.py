@@ -0,0 +1,133 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+
+class MicroBatcher:
+    """
+    Regroupe les requêtes qui arrivent dans une même fenêtre de temps
+    (ex. 5 ms / 64 images max) et les exécute en un seul appel batché.
+
+    `batch_fn` reçoit une liste d'entrées et doit renvoyer une liste
+    de résultats de même longueur, dans le même ordre.
+
+    `prepare` (optionnel) : appliqué à chaque entrée dans le thread de
+    l'appelant, avant la mise en file (décodage, prétraitement). Une
+    entrée invalide échoue alors seule, sans entrer dans un batch.
+    """
+
+    def __init__(self, batch_fn, max_batch_size: int = 64, max_wait_ms: float = 5.0, prepare=None):
+        self.batch_fn = batch_fn
+        self.prepare = prepare
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+
+        self._queue = queue.Queue()
+        self._closed = False
+        # Fermeture et dépôt exclusifs : rien ne passe derrière la sentinelle
+        self._lock = threading.Lock()
+
+        self._worker = threading.Thread(
+            target=self._run,
+            name="ocr-micro-batcher",
+            daemon=True
+        )
+        self._worker.start()
+
+    # ======================
+    # API
+    # ======================
+    def submit(self, item) -> Future:
+        if self.prepare is not None:
+            item = self.prepare(item)
+
+        future = Future()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("MicroBatcher is closed")
+            self._queue.put((item, future))
+        return future
+
+    def predict(self, item, timeout=None):
+        return self.submit(item).result(timeout=timeout)
+
+    def close(self):
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(None)
+        self._worker.join()
+
+    # ======================
+    # BOUCLE DE BATCHING
+    # ======================
+    def _collect(self):
+        first = self._queue.get()
+        if first is None:
+            return None
+
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                entry = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if entry is None:
+                # Fermeture : on traite ce qui a déjà été reçu
+                self._queue.put(None)
+                break
+            batch.append(entry)
+
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            if batch is None:
+                return
+
+            # Les appelants ayant annulé leur future sont ignorés
+            batch = [(item, fut) for item, fut in batch if fut.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+
+            items = [item for item, _ in batch]
+
+            try:
+                results = self.batch_fn(items)
+            except Exception as e:
+                if len(batch) == 1:
+                    batch[0][1].set_exception(e)
+                else:
+                    # Une entrée fautive ne doit pas faire échouer les autres requêtes
+                    self._run_one_by_one(batch)
+                continue
+
+            if results is None or len(results) != len(items):
+                # Aucun appelant ne doit rester bloqué sur une future jamais résolue
+                error = RuntimeError(
+                    f"batch_fn returned {0 if results is None else len(results)} results for {len(items)} items"
+                )
+                for _, fut in batch:
+                    fut.set_exception(error)
+                continue
+
+            for (_, fut), res in zip(batch, results):
+                fut.set_result(res)
+
+    def _run_one_by_one(self, batch):
+        for item, fut in batch:
+            try:
+                results = self.batch_fn([item])
+                if results is None or len(results) != 1:
+                    raise RuntimeError(f"batch_fn returned {0 if results is None else len(results)} results for 1 item")
+                fut.set_result(results[0])
+            except Exception as e:
+                fut.set_exception(e)
@@ -0,0 +1,325 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from api.app.services.model_registry import MODEL_REGISTRY, get_ocr_predictor
+
+
+# ============================================================
+# Mesure mémoire
+# ============================================================
+
+def _rss_bytes() -> int:
+    """
+    RSS courant du processus (Linux : /proc/self/statm, sinon pic ru_maxrss).
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def _torch_module_bytes(module) -> int:
+    return sum(p.numel() * p.element_size() for p in module.parameters())
+
+
+def _weights_bytes(predictor) -> int:
+    """
+    Taille des poids du modèle (Keras, torch ou EasyOCR), 0 si inconnue.
+    """
+    try:
+        # ONNX Runtime : taille du graphe exporté
+        if getattr(predictor, "session", None) is not None and getattr(predictor, "model_path", None):
+            return os.path.getsize(predictor.model_path)
+
+        # Keras (OCRService / OCRPredictor)
+        keras_model = getattr(predictor, "infer_model", None) or getattr(predictor, "prediction_model", None)
+        if keras_model is not None:
+            return int(sum(w.numpy().nbytes for w in keras_model.weights))
+
+        # Torch (TrOCR)
+        torch_model = getattr(predictor, "model", None)
+        if torch_model is not None and hasattr(torch_model, "parameters"):
+            return _torch_module_bytes(torch_model)
+
+        # EasyOCR (détecteur + reconnaissance)
+        reader = getattr(predictor, "reader", None)
+        if reader is not None:
+            return sum(
+                _torch_module_bytes(m)
+                for m in (getattr(reader, "detector", None), getattr(reader, "recognizer", None))
+                if m is not None and hasattr(m, "parameters")
+            )
+    except Exception:
+        pass
+
+    return 0
+
+
+# ============================================================
+# Pool de modèles (un chargement par processus, éviction LRU)
+# ============================================================
+
+class ModelPool:
+    """
+    Garde en mémoire les prédicteurs OCR déjà chargés.
+
+    - chargement paresseux au premier `get`
+    - au plus `max_resident` modèles résidents (éviction LRU)
+    - mémoire mesurée au chargement (delta RSS + taille des poids)
+
+    Un prédicteur utilisé via `lease` n'est fermé qu'une fois rendu par
+    tous ses utilisateurs, même s'il est évincé entre-temps. Les modèles
+    épinglés (`pin`, étages d'une cascade, membres d'un ensemble) comptent
+    dans `max_resident` mais ne sont jamais évincés.
+    """
+
+    def __init__(self, factory, max_resident: int = 2):
+        self.factory = factory
+        self.max_resident = max(1, max_resident)
+
+        self._models = OrderedDict()
+        self._infos = {}
+        self._lock = threading.Lock()
+        self._load_locks = {}
+
+        self._pins = {}      # clé -> nombre de prédicteurs composites qui la retiennent
+        self._leases = {}    # id(prédicteur) -> utilisations en cours
+        self._retired = {}   # id(prédicteur) -> prédicteur évincé, fermé au dernier rendu
+
+    def _load_lock(self, model_key: str):
+        with self._lock:
+            return self._load_locks.setdefault(model_key, threading.Lock())
+
+    # ======================
+    # ACCÈS
+    # ======================
+    def _claim(self, model_key: str, predictor, lease: bool, pin: bool):
+        # Appelé sous self._lock : réservation atomique avec l'accès
+        if lease:
+            self._leases[id(predictor)] = self._leases.get(id(predictor), 0) + 1
+        if pin:
+            self._pins[model_key] = self._pins.get(model_key, 0) + 1
+
+    def _hit(self, model_key: str, lease: bool, pin: bool):
+        # Appelé sous self._lock
+        predictor = self._models.get(model_key)
+        if predictor is not None:
+            self._models.move_to_end(model_key)
+            self._infos[model_key]["hits"] += 1
+            self._infos[model_key]["last_used"] = time.time()
+            self._claim(model_key, predictor, lease, pin)
+        return predictor
+
+    def _get(self, model_key: str, lease: bool = False, pin: bool = False):
+        with self._lock:
+            predictor = self._hit(model_key, lease, pin)
+        if predictor is not None:
+            return predictor
+
+        # Un seul chargement par clé, même si plusieurs requêtes arrivent en même temps
+        with self._load_lock(model_key):
+            with self._lock:
+                predictor = self._hit(model_key, lease, pin)
+            if predictor is not None:
+                return predictor
+
+            rss_before = _rss_bytes()
+            start = time.perf_counter()
+
+            predictor = self.factory(model_key)
+            if predictor is None:
+                return None
+
+            load_time = time.perf_counter() - start
+            rss_delta = max(0, _rss_bytes() - rss_before)
+
+            with self._lock:
+                self._models[model_key] = predictor
+                self._infos[model_key] = {
+                    "load_time_sec": round(load_time, 3),
+                    "rss_delta_mb": round(rss_delta / 2**20, 1),
+                    "weights_mb": round(_weights_bytes(predictor) / 2**20, 1),
+                    "loaded_at": time.time(),
+                    "last_used": time.time(),
+                    "hits": 0,
+                }
+                self._claim(model_key, predictor, lease, pin)
+                to_close = self._evict_over_capacity(keep=model_key)
+
+            self._close_all(to_close)
+            return predictor
+
+    def get(self, model_key: str):
+        """
+        Prédicteur sans réservation : peut être fermé s'il est évincé
+        pendant son utilisation. Pour une requête, préférer `lease`.
+        """
+        return self._get(model_key)
+
+    @contextmanager
+    def lease(self, model_key: str):
+        """
+        with model_pool.lease(key) as predictor: ...
+        Le prédicteur reste ouvert jusqu'à la sortie du bloc.
+        """
+        predictor = self._get(model_key, lease=True)
+        try:
+            yield predictor
+        finally:
+            if predictor is not None:
+                self._release(predictor)
+
+    def _release(self, predictor):
+        with self._lock:
+            count = self._leases.get(id(predictor), 0) - 1
+            if count > 0:
+                self._leases[id(predictor)] = count
+                return
+            self._leases.pop(id(predictor), None)
+            retired = self._retired.pop(id(predictor), None)
+
+        if retired is not None:
+            self._close_all([("retired", retired)])
+
+    def pin(self, model_key: str):
+        """
+        Charge `model_key` et l'exclut de l'éviction jusqu'à `unpin`.
+        """
+        return self._get(model_key, pin=True)
+
+    def unpin(self, model_key: str):
+        with self._lock:
+            count = self._pins.get(model_key, 0) - 1
+            if count > 0:
+                self._pins[model_key] = count
+            else:
+                self._pins.pop(model_key, None)
+            to_close = self._evict_over_capacity()
+        self._close_all(to_close)
+
+    # ======================
+    # ÉVICTION
+    # ======================
+    def _evict_over_capacity(self, keep: str = None) -> list:
+        """
+        Retire les modèles les moins récents au-delà de `max_resident`
+        (sauf épinglés et `keep`). Appelé sous self._lock ; renvoie ceux
+        à fermer tout de suite, les autres sont fermés à leur dernier rendu.
+        """
+        candidates = [key for key in self._models if key != keep and key not in self._pins]
+        to_close = []
+        while len(self._models) > self.max_resident and candidates:
+            key = candidates.pop(0)
+            to_close += self._retire(key)
+        return to_close
+
+    def _retire(self, model_key: str) -> list:
+        # Appelé sous self._lock
+        predictor = self._models.pop(model_key, None)
+        self._infos.pop(model_key, None)
+        if predictor is None:
+            return []
+        print(f"[model_pool] Evicting {model_key}")
+        if self._leases.get(id(predictor)):
+            self._retired[id(predictor)] = predictor
+            return []
+        return [(model_key, predictor)]
+
+    @staticmethod
+    def _close_all(predictors):
+        for key, predictor in predictors:
+            if hasattr(predictor, "close"):
+                try:
+                    predictor.close()
+                except Exception as e:
+                    print(f"[model_pool] Closing {key} failed: {e}")
+
+    def warmup(self, model_keys) -> dict:
+        """
+        Charge (et préchauffe si possible) les modèles demandés.
+        Une erreur de chargement est journalisée sans interrompre le démarrage.
+        """
+        status = {}
+
+        for model_key in model_keys:
+            try:
+                predictor = self.get(model_key)
+                if predictor is None:
+                    status[model_key] = "unknown_model"
+                    continue
+                if hasattr(predictor, "warmup"):
+                    predictor.warmup()
+                status[model_key] = "ready"
+            except Exception as e:
+                print(f"[model_pool] Warm-up failed for {model_key}: {e}")
+                status[model_key] = f"error: {e}"
+
+        return status
+
+    def evict(self, model_key: str) -> bool:
+        with self._lock:
+            found = model_key in self._models
+            to_close = self._retire(model_key)
+            self._pins.pop(model_key, None)
+
+        self._close_all(to_close)
+        return found
+
+    def clear(self):
+        for model_key in list(self._models):
+            self.evict(model_key)
+
+    def stats(self) -> dict:
+        with self._lock:
+            models = [
+                {
+                    "key": key,
+                    **self._infos[key],
+                    "pinned": key in self._pins,
+                    "in_use": self._leases.get(id(self._models[key]), 0),
+                }
+                for key in reversed(self._models)
+            ]
+            predictors = {key: self._models[key] for key in self._models}
+
+        # Statistiques propres au prédicteur (ex. taux par étage d'une cascade)
+        for model in models:
+            predictor = predictors[model["key"]]
+            if hasattr(predictor, "stats"):
+                model["predictor_stats"] = predictor.stats()
+
+        return {
+            "max_resident": self.max_resident,
+            "resident": len(models),
+            "retired_in_use": len(self._retired),
+            "process_rss_mb": round(_rss_bytes() / 2**20, 1),
+            "models": models,
+        }
+
+
+# ============================================================
+# Pool du processus
+# ============================================================
+
+model_pool = ModelPool(
+    get_ocr_predictor,
+    max_resident=int(os.getenv("OCR_MAX_RESIDENT_MODELS", "2"))
+)
+
+
+def default_warmup_models() -> list:
+    """
+    Modèles à précharger au démarrage : OCR_WARMUP_MODELS="a_jb_t,trocr_custom"
+    ou, à défaut, le modèle par défaut du registre.
+    """
+    env = os.getenv("OCR_WARMUP_MODELS")
+    if env is not None:
+        return [k.strip().lower() for k in env.split(",") if k.strip()]
+
+    return [key for key, cfg in MODEL_REGISTRY.items() if cfg.get("default")]
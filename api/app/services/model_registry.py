@@ -0,0 +1,201 @@
+from pathlib import Path
+
+# ============================================================
+# Racine du projet
+# ============================================================
+
+BASE_DIR = Path(__file__).resolve().parents[3]
+
+# ============================================================
+# Registre des modèles OCR (SOURCE UNIQUE DE VÉRITÉ)
+# ============================================================
+
+MODEL_REGISTRY = {
+    "a_jb_t": {
+        "type": "ctc",
+        "label": "Anastasiia JB Théo Model",
+        "path": str(BASE_DIR / "models" / "ANASTASIIA_JB_THEO_9B2_PLUS_SITE_INFER.keras"),
+        "description": "Modèle robuste entraîné sur ensemble de captchas équilibré",
+        "default": True,
+        # Micro-batching des requêtes concurrentes (fenêtre 5 ms / 64 images)
+        "batching": {"max_batch_size": 64, "max_wait_ms": 5.0},
+    },
+    # Même modèle (poids partagés avec a_jb_t), décodage contraint : seuls
+    # les textes de 6 caractères (MAX_LEN des notebooks) sont explorés.
+    # Clés possibles : length, min_length, max_length, allowed (alphabet),
+    # pattern (regex du site).
+    "a_jb_t_len6": {
+        "type": "ctc_constrained",
+        "label": "Anastasiia JB Théo Model (6 caractères)",
+        "base": "a_jb_t",
+        "path": None,
+        "description": "Beam search restreint aux captchas de 6 caractères",
+        "default": False,
+        "batching": {"max_batch_size": 64, "max_wait_ms": 5.0},
+        "constraints": {"length": 6},
+    },
+    "a_jb_t_onnx": {
+        "type": "ctc_onnx",
+        "label": "Anastasiia JB Théo Model (ONNX)",
+        "path": str(BASE_DIR / "models" / "ANASTASIIA_JB_THEO_9B2_PLUS_SITE_INFER.onnx"),
+        "description": "Même modèle exporté en ONNX (python -m ocr.export), exécuté sans TensorFlow",
+        "default": False,
+        "batching": {"max_batch_size": 64, "max_wait_ms": 5.0},
+    },
+    # Variantes int8 publiées par python -m ocr.quantize (seulement si la précision tient)
+    "a_jb_t_int8_dynamic": {
+        "type": "ctc_onnx",
+        "label": "Anastasiia JB Théo Model (int8 dynamique)",
+        "path": str(BASE_DIR / "models" / "ANASTASIIA_JB_THEO_9B2_PLUS_SITE_INFER_INT8_DYNAMIC.onnx"),
+        "description": "Poids int8, activations quantifiées à la volée",
+        "default": False,
+        "batching": {"max_batch_size": 64, "max_wait_ms": 5.0},
+    },
+    "a_jb_t_int8_static": {
+        "type": "ctc_onnx",
+        "label": "Anastasiia JB Théo Model (int8 statique)",
+        "path": str(BASE_DIR / "models" / "ANASTASIIA_JB_THEO_9B2_PLUS_SITE_INFER_INT8_STATIC.onnx"),
+        "description": "Poids et activations int8, calibrés sur les captchas labellisés",
+        "default": False,
+        "batching": {"max_batch_size": 64, "max_wait_ms": 5.0},
+    },
+    "trocr_custom": {
+        "type": "trocr",
+        "label": "TrOCR Custom",
+        "path": str(BASE_DIR / "models" / "trocr_custom"),
+        "description": "TrOCR finetuné sur captchas russes",
+        "default": False,
+        # Génération greedy, bornée par la generation_config du checkpoint
+        # (max_length 6, token de départ compris : 5 nouveaux tokens)
+        "options": {"num_beams": 1, "batch_size": 16},
+    },
+    "trocr_custom_compiled": {
+        "type": "trocr",
+        "label": "TrOCR Custom (compilé)",
+        "path": str(BASE_DIR / "models" / "trocr_custom"),
+        "description": "Même TrOCR, encodeur torch.compile + cache KV, préchauffé au chargement",
+        "default": False,
+        "options": {"num_beams": 1, "batch_size": 16, "compile": True},
+    },
+    # Variantes produites par python -m ocr.trocr_compress
+    "trocr_custom_int8": {
+        "type": "trocr",
+        "label": "TrOCR Custom (int8 dynamique)",
+        "path": str(BASE_DIR / "models" / "trocr_custom_int8"),
+        "description": "Couches Linear quantifiées en int8 (CPU)",
+        "default": False,
+        "options": {"num_beams": 1, "batch_size": 16},
+    },
+    "trocr_custom_student": {
+        "type": "trocr",
+        "label": "TrOCR Custom (élève distillé)",
+        "path": str(BASE_DIR / "models" / "trocr_custom_student"),
+        "description": "TrOCR réduit en couches, distillé depuis trocr_custom",
+        "default": False,
+        "options": {"num_beams": 1, "batch_size": 16},
+    },
+    "trocr_custom_student_int8": {
+        "type": "trocr",
+        "label": "TrOCR Custom (élève distillé, int8)",
+        "path": str(BASE_DIR / "models" / "trocr_custom_student_int8"),
+        "description": "Élève distillé puis quantifié en int8 dynamique",
+        "default": False,
+        "options": {"num_beams": 1, "batch_size": 16},
+    },
+    "easyocr": {
+        "type": "easyocr",
+        "label": "EasyOCR",
+        "path": None,
+        "description": "OCR générique basé sur EasyOCR (baseline externe)",
+        "default": False,
+    },
+    "easyocr_recog": {
+        "type": "easyocr",
+        "label": "EasyOCR (reconnaissance seule)",
+        "path": None,
+        "description": "EasyOCR sans détecteur CRAFT : l'image recadrée entière va au reconnaisseur",
+        "default": False,
+        "options": {"recognition_only": True, "batch_size": 32},
+    },
+    # Cascade : le CTC traite tout, seules les images peu sûres montent d'un étage.
+    # Seuils par défaut, remplacés par ceux de python -m ocr.calibrate_cascade.
+    "cascade_ctc_trocr": {
+        "type": "cascade",
+        "label": "Cascade CTC → TrOCR",
+        "path": None,
+        "description": "Modèle CTC, TrOCR uniquement pour les captchas à faible confiance",
+        "default": False,
+        "stages": [
+            {"model": "a_jb_t", "min_confidence": 0.5},
+            {"model": "trocr_custom"},
+        ],
+    },
+    "cascade_ctc_easyocr_trocr": {
+        "type": "cascade",
+        "label": "Cascade CTC → EasyOCR → TrOCR",
+        "path": None,
+        "description": "Comme cascade_ctc_trocr, avec EasyOCR (reconnaissance seule) en étage intermédiaire",
+        "default": False,
+        "stages": [
+            {"model": "a_jb_t", "min_confidence": 0.5},
+            {"model": "easyocr_recog", "min_confidence": 0.7},
+            {"model": "trocr_custom"},
+        ],
+    },
+    # Ensemble : les trois familles en parallèle, vote par caractère.
+    # Un membre en retard sur son échéance est ignoré pour la requête.
+    "ensemble_ctc_trocr_easyocr": {
+        "type": "ensemble",
+        "label": "Ensemble CTC + TrOCR + EasyOCR",
+        "path": None,
+        "description": "Vote par caractère pondéré par la confiance, échéance par modèle",
+        "default": False,
+        "members": [
+            {"model": "a_jb_t", "weight": 1.0, "deadline_ms": 1000},
+            {"model": "trocr_custom", "weight": 1.0, "deadline_ms": 3000},
+            {"model": "easyocr_recog", "weight": 0.5, "deadline_ms": 2000},
+        ],
+    },
+}
+
+# ============================================================
+# Factory OCR (POINT D’ENTRÉE UNIQUE OCR)
+# ============================================================
+
+def get_ocr_predictor(model_key: str):
+
+    cfg = MODEL_REGISTRY.get(model_key)
+
+    if not cfg:
+        return None
+
+    # Imports locaux : seul le framework du modèle demandé est chargé
+    if cfg["type"] == "ctc":
+        from api.app.services.ocr_service import OCRService
+        return OCRService(model_path=cfg["path"], constraints=cfg.get("constraints"), **cfg.get("batching", {}))
+
+    if cfg["type"] == "ctc_onnx":
+        from api.app.services.onnx_ocr_service import ONNXOCRService
+        return ONNXOCRService(model_path=cfg["path"], constraints=cfg.get("constraints"), **cfg.get("batching", {}))
+
+    if cfg["type"] == "ctc_constrained":
+        from api.app.services.constrained_service import ConstrainedPredictor
+        return ConstrainedPredictor(model_key, cfg["base"], cfg["constraints"], **cfg.get("batching", {}))
+
+    if cfg["type"] == "easyocr":
+        from ocr.easyocr_predictor import EasyOCRPredictor
+        return EasyOCRPredictor(**cfg.get("options", {}))
+
+    if cfg["type"] == "cascade":
+        from api.app.services.cascade_service import CascadePredictor
+        return CascadePredictor(model_key, cfg["stages"])
+
+    if cfg["type"] == "ensemble":
+        from api.app.services.ensemble_service import EnsemblePredictor
+        return EnsemblePredictor(model_key, cfg["members"])
+
+    if cfg["type"] == "trocr":
+        from ocr.trocr_predictor import TrOCRPredictor
+        return TrOCRPredictor(cfg["path"], **cfg.get("options", {}))
+
+    return None
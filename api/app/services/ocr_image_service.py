@@ -0,0 +1,114 @@
+import time
+from contextlib import ExitStack
+
+from api.app.services.model_registry import MODEL_REGISTRY
+from api.app.services.model_pool import model_pool
+from api.app.services.prediction_cache import prediction_cache
+
+
+# ============================================================
+# OCR direct sur images (sans navigateur)
+# ============================================================
+
+def _ms(seconds: float) -> float:
+    return round(seconds * 1000, 2)
+
+
+def _result(name, prediction, cached, duration_ms, error=None) -> dict:
+    prediction = prediction or {}
+    return {
+        "filename": name,
+        "text": prediction.get("text"),
+        "confidence": prediction.get("confidence"),
+        "logprob": prediction.get("logprob"),
+        "char_probs": prediction.get("char_probs"),
+        "alternatives": prediction.get("alternatives"),
+        "stage": prediction.get("stage"),
+        "votes": prediction.get("votes"),
+        "cached": cached,
+        "duration_ms": duration_ms,
+        # Erreur du modèle lui-même (ex. aucun membre d'un ensemble n'a répondu)
+        "error": error or prediction.get("error"),
+    }
+
+
+def _predict_images(model_key, predictor, images, top_k) -> list:
+    results = []
+
+    t0 = time.perf_counter()
+    try:
+        # Cache par contenu : seules les images inconnues passent par le modèle (en un batch)
+        predictions = prediction_cache.predict_many(
+            model_key, predictor, [data for _, data in images], details=True, top_k=top_k
+        )
+    except ValueError:
+        # Une image illisible : on retombe sur le traitement image par image
+        predictions = None
+    batch_ms = _ms((time.perf_counter() - t0) / max(1, len(images)))
+
+    if predictions is not None:
+        results = [
+            _result(name, prediction, cached, batch_ms)
+            for (name, _), (prediction, cached) in zip(images, predictions)
+        ]
+
+    if not results:
+        for name, data in images:
+            t0 = time.perf_counter()
+            try:
+                (prediction, cached), error = prediction_cache.predict_many(
+                    model_key, predictor, [data], details=True, top_k=top_k
+                )[0], None
+            except ValueError as e:
+                prediction, cached, error = None, False, str(e)
+
+            results.append(_result(name, prediction, cached, _ms(time.perf_counter() - t0), error))
+
+    return results
+
+
+def ocr_images(images: list, model: str, top_k: int = 1) -> dict:
+    """
+    OCR d'une liste d'images encodées (bytes) avec le modèle demandé.
+
+    `images` : liste de (nom, octets). Les images déjà vues sont servies
+    par le cache de prédictions ; pour les autres, les modèles qui savent
+    traiter un batch (predict_batch) font une seule passe réseau. Le temps
+    par image est alors le temps du batch amorti.
+
+    Les modèles CTC renseignent la confiance (probabilité de la séquence),
+    les probabilités par caractère et, si `top_k` > 1, les alternatives.
+    """
+    start = time.perf_counter()
+
+    model_key = (model or "").strip().lower()
+    cfg = MODEL_REGISTRY.get(model_key)
+
+    if not cfg:
+        return {"status": "error", "reason": "unknown_model"}
+
+    # Modèle réservé pendant la requête : une éviction ne le ferme pas en cours d'usage
+    with ExitStack() as leases:
+        try:
+            predictor = leases.enter_context(model_pool.lease(model_key))
+        except Exception as e:
+            # Fichier .keras / .onnx absent, étage de cascade introuvable...
+            print(f"[ocr] Loading {model_key} failed: {e}")
+            return {"status": "error", "reason": "ocr_initialization_failed", "detail": str(e)}
+
+        if predictor is None:
+            return {"status": "error", "reason": "ocr_initialization_failed"}
+
+        try:
+            results = _predict_images(model_key, predictor, images, top_k)
+        except Exception as e:
+            print(f"[ocr] {model_key} failed: {e}")
+            return {"status": "error", "reason": "ocr_failed", "detail": str(e)}
+
+    return {
+        "status": "success",
+        "model": model_key,
+        "model_label": cfg["label"],
+        "results": results,
+        "duration_ms": _ms(time.perf_counter() - start),
+    }
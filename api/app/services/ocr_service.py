@@ -1,8 +1,9 @@
 import numpy as np
-import tensorflow as tf
 from keras.models import load_model
-from keras import layers
-from pathlib import Path
+
+from api.app.services.micro_batcher import MicroBatcher
+from ocr.ctc_decoding import DecodingConstraints, decode_details, greedy_decode_text
+from ocr.preprocess import BatchPreprocessor, preprocess_item_np
 
 
 # ======================
@@ -17,59 +18,119 @@ class OCRService:
     """
     OCR Service strictement identique au notebook de test.
     Garantit des performances équivalentes.
+
+    Si `max_batch_size` est fourni, les appels concurrents à `predict`
+    sont regroupés par un MicroBatcher (une seule passe réseau par fenêtre).
+
+    `constraints` : longueur / alphabet / regex du site (DecodingConstraints),
+    imposés pendant le décodage.
     """
 
-    def __init__(self, model_path: str):
+    def __init__(self, model_path: str, max_batch_size: int = None, max_wait_ms: float = 5.0,
+                 constraints: dict = None):
         # Charger le modèle d'inférence (SANS CTCLayer)
         self.infer_model = load_model(model_path, compile=False)
-
-        # Decoder vocab (IDENTIQUE)
-        self.num_to_char = layers.StringLookup(
-            vocabulary=list(CHARS),
-            mask_token=None,
-            invert=True
-        )
+        self.constraints = DecodingConstraints(**constraints) if constraints else None
+        # Buffer d'entrée réutilisé d'un batch à l'autre (un par thread)
+        self.preprocess = BatchPreprocessor(capacity=max_batch_size or 64)
+
+        self.batcher = None
+        if max_batch_size:
+            # Le batcher renvoie les résultats détaillés (texte + scores, coût négligeable)
+            self.batcher = MicroBatcher(
+                self.predict_details_batch,
+                max_batch_size=max_batch_size,
+                max_wait_ms=max_wait_ms,
+                # Décodage + prétraitement chez l'appelant : seul le modèle est batché
+                prepare=preprocess_item_np
+            )
 
     # ======================
-    # IMAGE LOADER (COPIE NOTEBOOK)
+    # DECODAGE CTC (GREEDY, NUMPY)
     # ======================
-    def _load_image(self, path: str):
-        img = tf.io.decode_image(
-            tf.io.read_file(path),
-            channels=1,
-            expand_animations=False
-        )
-
-        img = tf.image.resize(
-            tf.image.convert_image_dtype(img, tf.float32),
-            [IMG_HEIGHT, IMG_WIDTH]
-        )
-
-        img = tf.transpose(img, [1, 0, 2])
-        return img
+    def _decode(self, pred) -> list:
+        # Même résultat que ctc_decode(greedy=True) + StringLookup(invert=True)
+        texts = greedy_decode_text(np.asarray(pred))
+        return [text.lower() for text in texts]
 
     # ======================
     # PREDICT TEXT (COPIE NOTEBOOK)
     # ======================
     def predict(self, image_path: str) -> str:
-        img = self._load_image(image_path)
-        img = tf.expand_dims(img, 0)
+        # Lecture unique : close() peut remettre self.batcher à None entre-temps
+        batcher = self.batcher
+        if batcher is not None:
+            return batcher.predict(image_path)["text"]
 
-        pred = self.infer_model(img, training=False)
+        return self.predict_batch([image_path])[0]
 
-        decoded, _ = tf.keras.backend.ctc_decode(
-            pred,
-            input_length=np.ones(pred.shape[0]) * pred.shape[1],
-            greedy=True
-        )
+    # ======================
+    # PREDICT EN MÉMOIRE (SANS FICHIER)
+    # ======================
+    def predict_bytes(self, data) -> str:
+        return self.predict(data)
 
-        seq = decoded[0][0].numpy()
+    def predict_array(self, array) -> str:
+        return self.predict(array)
 
-        # garder uniquement caractères valides
-        seq = seq[(seq >= 0) & (seq < NUM_CHARS)]
+    # ======================
+    # PREDICT BATCH (UNE SEULE PASSE RÉSEAU)
+    # ======================
+    def predict_batch(self, paths_or_arrays, constraints: DecodingConstraints = None) -> list:
+        """
+        Prédit le texte d'une liste d'images (chemins, bytes ou tableaux NumPy)
+        en un seul appel au modèle.
+        """
+        if not paths_or_arrays:
+            return []
+
+        # Prétraitement NumPy / OpenCV du batch entier (même résultat que la chaîne TF du notebook)
+        batch = self.preprocess(paths_or_arrays)
+
+        pred = self.infer_model(batch, training=False)
+
+        constraints = constraints or self.constraints
+        if constraints is not None:
+            return [r["text"] for r in decode_details(np.asarray(pred), constraints=constraints)]
+
+        return self._decode(pred)
+
+    def predict_details(self, item) -> dict:
+        batcher = self.batcher
+        if batcher is not None:
+            return batcher.predict(item)
+
+        return self.predict_details_batch([item])[0]
+
+    def predict_details_batch(self, paths_or_arrays, top_k: int = 1,
+                              constraints: DecodingConstraints = None) -> list:
+        """
+        Comme predict_batch, avec les scores CTC : log-probabilité de la
+        séquence, confiance, probabilité par caractère et, si top_k > 1,
+        les alternatives du beam search.
+
+        `constraints` : contraintes de cet appel, à la place de celles du service
+        (variante contrainte d'un modèle déjà chargé, voir ConstrainedPredictor).
+        """
+        if not paths_or_arrays:
+            return []
+
+        batch = self.preprocess(paths_or_arrays)
+
+        # Alphabet déjà en minuscules : pas de .lower() nécessaire
+        return decode_details(
+            np.asarray(self.infer_model(batch, training=False)),
+            top_k=top_k,
+            constraints=constraints or self.constraints
+        )
 
-        # 🔥 FIX CRITIQUE : StringLookup invert attend index >= 1
-        seq = seq + 1
+    def warmup(self):
+        """
+        Première passe à blanc : évite de payer le traçage TF sur la première requête.
+        """
+        self.predict_batch([np.zeros((IMG_WIDTH, IMG_HEIGHT, 1), dtype=np.float32)])
 
-        text = "".join(self.num_to_char(seq).numpy().astype(str))
-        return text.lower()
\ No newline at end of file
+    def close(self):
+        if self.batcher is not None:
+            self.batcher.close()
+            self.batcher = None
@@ -0,0 +1,114 @@
+import numpy as np
+import onnxruntime as ort
+
+from api.app.services.micro_batcher import MicroBatcher
+from ocr.ctc_decoding import DecodingConstraints, decode_details, greedy_decode_text
+from ocr.preprocess import IMG_HEIGHT, IMG_WIDTH, BatchPreprocessor, preprocess_item_np
+
+
+class ONNXOCRService:
+    """
+    Même interface que OCRService, sur le modèle CTC exporté en ONNX
+    (python -m ocr.export). Aucune dépendance TensorFlow : ONNX Runtime
+    pour le réseau, NumPy / OpenCV pour le prétraitement et le décodage.
+    """
+
+    def __init__(self, model_path: str, max_batch_size: int = None, max_wait_ms: float = 5.0,
+                 num_threads: int = None, constraints: dict = None):
+        self.model_path = model_path
+        self.constraints = DecodingConstraints(**constraints) if constraints else None
+        # Buffer d'entrée réutilisé d'un batch à l'autre (un par thread)
+        self.preprocess = BatchPreprocessor(capacity=max_batch_size or 64)
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+
+        self.session = ort.InferenceSession(
+            model_path,
+            sess_options=options,
+            providers=["CPUExecutionProvider"]
+        )
+        self.input_name = self.session.get_inputs()[0].name
+
+        self.batcher = None
+        if max_batch_size:
+            # Le batcher renvoie les résultats détaillés (texte + scores, coût négligeable)
+            self.batcher = MicroBatcher(
+                self.predict_details_batch,
+                max_batch_size=max_batch_size,
+                max_wait_ms=max_wait_ms,
+                # Décodage + prétraitement chez l'appelant : seul le modèle est batché
+                prepare=preprocess_item_np
+            )
+
+    # ======================
+    # PREDICT
+    # ======================
+    def predict(self, image_path: str) -> str:
+        # Lecture unique : close() peut remettre self.batcher à None entre-temps
+        batcher = self.batcher
+        if batcher is not None:
+            return batcher.predict(image_path)["text"]
+
+        return self.predict_batch([image_path])[0]
+
+    def predict_bytes(self, data) -> str:
+        return self.predict(data)
+
+    def predict_array(self, array) -> str:
+        return self.predict(array)
+
+    def predict_probs(self, batch: np.ndarray) -> np.ndarray:
+        """
+        Sorties softmax (B, T, C) pour un batch déjà prétraité (B, 200, 50, 1).
+        """
+        return self.session.run(None, {self.input_name: batch})[0]
+
+    def predict_batch(self, paths_or_arrays, constraints: DecodingConstraints = None) -> list:
+        if not paths_or_arrays:
+            return []
+
+        batch = self.preprocess(paths_or_arrays)
+
+        pred = self.predict_probs(batch)
+
+        constraints = constraints or self.constraints
+        if constraints is not None:
+            return [r["text"] for r in decode_details(pred, constraints=constraints)]
+
+        return [text.lower() for text in greedy_decode_text(pred)]
+
+    def predict_details(self, item) -> dict:
+        batcher = self.batcher
+        if batcher is not None:
+            return batcher.predict(item)
+
+        return self.predict_details_batch([item])[0]
+
+    def predict_details_batch(self, paths_or_arrays, top_k: int = 1,
+                              constraints: DecodingConstraints = None) -> list:
+        """
+        Comme predict_batch, avec les scores CTC : log-probabilité de la
+        séquence, confiance, probabilité par caractère et, si top_k > 1,
+        les alternatives du beam search.
+
+        `constraints` : contraintes de cet appel, à la place de celles du service.
+        """
+        if not paths_or_arrays:
+            return []
+
+        batch = self.preprocess(paths_or_arrays)
+
+        # Alphabet déjà en minuscules : pas de .lower() nécessaire
+        return decode_details(self.predict_probs(batch), top_k=top_k, constraints=constraints or self.constraints)
+
+    def warmup(self):
+        self.predict_batch([np.zeros((IMG_WIDTH, IMG_HEIGHT, 1), dtype=np.float32)])
+
+    def close(self):
+        if self.batcher is not None:
+            self.batcher.close()
+            self.batcher = None
+
@@ -0,0 +1,272 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+from api.app.services.model_registry import MODEL_REGISTRY
+
+
+# ============================================================
+# Clé de cache : hash du contenu + modèle + version
+# ============================================================
+
+def image_digest(data) -> str:
+    # blake2b : rapide et sans collision pratique, 128 bits suffisent
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def model_version(model_key: str) -> str:
+    """
+    Version explicite du registre ("version"), sinon taille + date des
+    fichiers du modèle : un modèle réexporté invalide ses anciennes entrées.
+    """
+    cfg = MODEL_REGISTRY.get(model_key, {})
+    if cfg.get("version"):
+        return str(cfg["version"])
+
+    # Modèle composite : dépend des versions de ses modèles et de ses seuils
+    if cfg.get("stages"):
+        parts = [(stage["model"], model_version(stage["model"]), stage.get("min_confidence")) for stage in cfg["stages"]]
+        return hashlib.blake2b(repr(parts).encode(), digest_size=8).hexdigest()
+
+    # Variante contrainte : version du modèle de base + contraintes
+    if cfg.get("base"):
+        parts = (model_version(cfg["base"]), sorted(cfg.get("constraints", {}).items()))
+        return hashlib.blake2b(repr(parts).encode(), digest_size=8).hexdigest()
+
+    if cfg.get("members"):
+        parts = [(m["model"], model_version(m["model"]), m.get("weight")) for m in cfg["members"]]
+        return hashlib.blake2b(repr(parts).encode(), digest_size=8).hexdigest()
+
+    path = cfg.get("path")
+    if not path or not os.path.exists(path):
+        return "0"
+
+    root = Path(path)
+    files = [root] if root.is_file() else sorted(p for p in root.iterdir() if p.is_file())
+    stats = [(p.name, p.stat().st_size, p.stat().st_mtime_ns) for p in files]
+    # Contraintes de décodage : changer la regex d'un site invalide ses entrées
+    if cfg.get("constraints"):
+        stats.append(sorted(cfg["constraints"].items()))
+    return hashlib.blake2b(repr(stats).encode(), digest_size=8).hexdigest()
+
+
+# ============================================================
+# Cache de prédictions (mémoire LRU/TTL + SQLite optionnel)
+# ============================================================
+
+class PredictionCache:
+    """
+    Cache des prédictions OCR adressé par le contenu de l'image.
+
+    - mémoire : au plus `max_entries` entrées (éviction LRU), durée de vie `ttl_sec`
+    - disque (optionnel) : SQLite `db_path`, relu au démarrage suivant
+    - `max_entries=0` désactive le cache
+
+    Une seule entrée par image : le résultat détaillé, dont le texte est
+    dérivé (le texte seul et /captcha/ocr partagent les mêmes entrées).
+    """
+
+    def __init__(self, max_entries: int = 10000, ttl_sec: float = 3600, db_path: str = None):
+        self.max_entries = max(0, max_entries)
+        self.ttl_sec = ttl_sec
+        self.db_path = db_path
+
+        self._entries = OrderedDict()
+        self._versions = {}
+        self._lock = threading.Lock()
+        # SQLite sous son propre verrou : une lecture disque ne bloque pas la mémoire
+        self._db_lock = threading.Lock()
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        self._db = None
+        if db_path:
+            Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS predictions "
+                "(key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+            # Entrées expirées depuis le dernier démarrage
+            self._db.execute("DELETE FROM predictions WHERE created_at < ?", (time.time() - ttl_sec,))
+            self._db.commit()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def key(self, model_key: str, data) -> str:
+        version = self._versions.get(model_key)
+        if version is None:
+            version = self._versions[model_key] = model_version(model_key)
+        return f"{model_key}:{version}:{image_digest(data)}"
+
+    # ======================
+    # LECTURE / ÉCRITURE
+    # ======================
+    def get(self, key: str):
+        now = time.time()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, created_at = entry
+                if now - created_at <= self.ttl_sec:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+
+            if self._db is None:
+                self.misses += 1
+                return None
+
+        with self._db_lock:
+            row = self._db.execute(
+                "SELECT value, created_at FROM predictions WHERE key = ?", (key,)
+            ).fetchone()
+
+        with self._lock:
+            if row is not None and now - row[1] <= self.ttl_sec:
+                value = json.loads(row[0])
+                self._store(key, value, row[1])
+                self.hits += 1
+                self.disk_hits += 1
+                return value
+
+            self.misses += 1
+            return None
+
+    def put(self, key: str, value):
+        now = time.time()
+
+        with self._lock:
+            self._store(key, value, now)
+
+        if self._db is not None:
+            with self._db_lock:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO predictions (key, value, created_at) VALUES (?, ?, ?)",
+                    (key, json.dumps(value), now)
+                )
+                self._db.commit()
+
+    def _store(self, key, value, created_at):
+        self._entries[key] = (value, created_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    # ======================
+    # PRÉDICTION À TRAVERS LE CACHE
+    # ======================
+    def predict_many(self, model_key: str, predictor, images: list, details: bool = False,
+                     top_k: int = 1) -> list:
+        """
+        Textes d'une liste d'images encodées (bytes). Seules les images
+        absentes du cache passent par le modèle, en un seul batch si possible.
+        Retourne des couples (texte, servi_par_le_cache). Le texte est
+        dérivé du résultat détaillé mis en cache.
+
+        `details` : résultats structurés (texte, confiance, scores CTC,
+        `top_k` alternatives) à la place du texte seul.
+        """
+        if not self.enabled:
+            if details:
+                return [(value, False) for value in _predict_details(predictor, images, top_k)]
+            return [(value, False) for value in _predict(predictor, images)]
+
+        # Les alternatives dépendent de top_k ; top_k=1 est l'entrée partagée
+        suffix = f":k{top_k}" if top_k > 1 else ""
+        keys = [self.key(model_key, data) + suffix for data in images]
+        # Entrée texte seul d'un ancien format : traitée comme absente
+        results = [value if isinstance(value, dict) else None for value in map(self.get, keys)]
+
+        cached = [value is not None for value in results]
+
+        # Images manquantes, dédoublonnées (même captcha plusieurs fois dans la requête)
+        missing = {}
+        for i, value in enumerate(results):
+            if value is None:
+                missing.setdefault(keys[i], i)
+
+        if missing:
+            predictions = _predict_details(predictor, [images[i] for i in missing.values()], top_k)
+            predicted = dict(zip(missing, predictions))
+            for key, prediction in predicted.items():
+                # Échec ponctuel (ensemble sans réponse à temps) : pas mis en cache
+                if not prediction.get("error"):
+                    self.put(key, prediction)
+            results = [predicted[k] if v is None else v for k, v in zip(keys, results)]
+
+        if not details:
+            results = [value["text"] for value in results]
+
+        return list(zip(results, cached))
+
+    def predict_bytes(self, model_key: str, predictor, data):
+        return self.predict_many(model_key, predictor, [data])[0][0]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+        if self._db is not None:
+            with self._db_lock:
+                self._db.execute("DELETE FROM predictions")
+                self._db.commit()
+
+    def stats(self) -> dict:
+        disk_entries = None
+        if self._db is not None:
+            with self._db_lock:
+                disk_entries = self._db.execute("SELECT COUNT(*) FROM predictions").fetchone()[0]
+
+        with self._lock:
+            lookups = self.hits + self.misses
+
+            return {
+                "enabled": self.enabled,
+                "max_entries": self.max_entries,
+                "ttl_sec": self.ttl_sec,
+                "entries": len(self._entries),
+                "disk_path": self.db_path,
+                "disk_entries": disk_entries,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+            }
+
+
+def _predict(predictor, images: list) -> list:
+    if len(images) > 1 and hasattr(predictor, "predict_batch"):
+        return predictor.predict_batch(images)
+    return [predictor.predict_bytes(data) for data in images]
+
+
+def _predict_details(predictor, images: list, top_k: int = 1) -> list:
+    # Modèles CTC : scores disponibles ; autres modèles : texte seul
+    if len(images) == 1 and top_k == 1 and hasattr(predictor, "predict_details"):
+        # Image seule : passe par le micro-batcher du modèle
+        return [predictor.predict_details(images[0])]
+    if hasattr(predictor, "predict_details_batch"):
+        return predictor.predict_details_batch(images, top_k=top_k)
+    return [{"text": text, "confidence": None} for text in _predict(predictor, images)]
+
+
+# ============================================================
+# Cache du processus
+# ============================================================
+
+prediction_cache = PredictionCache(
+    max_entries=int(os.getenv("PREDICTION_CACHE_SIZE", "10000")),
+    ttl_sec=float(os.getenv("PREDICTION_CACHE_TTL_SEC", "3600")),
+    db_path=os.getenv("PREDICTION_CACHE_DB") or None,
+)
@@ -90,6 +90,9 @@ if st.button("Résoudre le CAPTCHA"):
             if prediction:
                 st.write("Texte détecté :", prediction)
 
+            if data.get("confidence") is not None:
+                st.write("Confiance :", round(data["confidence"], 3))
+
             if duration:
                 st.write("⏱ Temps :", round(duration, 2), "secondes")
 
@@ -0,0 +1,234 @@
+"""
+Augmentation par batch pour le fine-tuning (CPU).
+
+Chaque transformation est une seule opération vectorisée sur le batch
+entier (B, 200, 50, 1) — axe 1 = largeur (x), axe 2 = hauteur (y), comme
+la sortie de preprocess_image — au lieu d'une chaîne d'ops par image :
+
+- rotation légère + translation + déformation élastique : une seule
+  grille d'échantillonnage, un seul rééchantillonnage bilinéaire
+- traits parasites (distance de chaque pixel à des segments aléatoires)
+- flou gaussien (mélange image / image floutée, intensité aléatoire)
+- luminosité, contraste, bruit gaussien
+
+Tirages sans état (tf.random.stateless_*) : le résultat ne dépend que
+de (seed, step), quel que soit le parallélisme de tf.data.
+"""
+
+import math
+
+import tensorflow as tf
+
+
+# Proche de aug_site_strong (notebooks/training_off.ipynb)
+SITE_PRESET = {
+    "brightness": 0.15,
+    "contrast": (0.7, 1.4),
+    "noise": 0.02,
+    "shift": (6.0, 3.0),
+    "rotation": 3.0,
+    "elastic_alpha": 1.5,
+    "blur": 0.3,
+    "lines": 2,
+}
+
+
+def _gaussian_kernel(sigma: float, size: int = 5):
+    x = tf.range(size, dtype=tf.float32) - (size - 1) / 2
+    g = tf.exp(-(x ** 2) / (2 * sigma ** 2))
+    g = g / tf.reduce_sum(g)
+    return (g[:, None] * g[None, :])[:, :, None, None]
+
+
+def _sample_bilinear(images, x, y):
+    """
+    images (B, W, H, 1) ; x, y (B, W, H) : coordonnées source en pixels.
+    Bords répliqués.
+    """
+    shape = tf.shape(images)
+    b, w, h = shape[0], shape[1], shape[2]
+    flat = tf.reshape(images, [b, w * h])
+
+    x = tf.clip_by_value(x, 0.0, tf.cast(w - 1, tf.float32))
+    y = tf.clip_by_value(y, 0.0, tf.cast(h - 1, tf.float32))
+    x0, y0 = tf.floor(x), tf.floor(y)
+    wx, wy = x - x0, y - y0
+
+    x0 = tf.cast(x0, tf.int32)
+    y0 = tf.cast(y0, tf.int32)
+    x1 = tf.minimum(x0 + 1, w - 1)
+    y1 = tf.minimum(y0 + 1, h - 1)
+
+    def gather(xi, yi):
+        idx = tf.reshape(xi * h + yi, [b, -1])
+        return tf.reshape(tf.gather(flat, idx, batch_dims=1), [b, w, h])
+
+    top = gather(x0, y0) * (1 - wy) + gather(x0, y1) * wy
+    bottom = gather(x1, y0) * (1 - wy) + gather(x1, y1) * wy
+    return ((1 - wx) * top + wx * bottom)[..., None]
+
+
+class BatchAugmenter:
+    """
+    `augmenter(images, step)` : batch augmenté (même forme, valeurs dans [0, 1]).
+    Chaque transformation est appliquée à une image avec la probabilité `p`
+    (0 ou None pour la désactiver via son paramètre).
+
+    - brightness : décalage max de luminosité
+    - contrast : (min, max) du facteur de contraste
+    - noise : écart-type du bruit gaussien
+    - shift : translation max (x, y) en pixels
+    - rotation : angle max en degrés
+    - elastic_alpha / elastic_grid : amplitude (pixels) et grille du champ élastique
+    - blur : sigma du flou gaussien
+    - lines / line_width : nombre max de traits parasites et épaisseur
+    """
+
+    def __init__(self, seed: int = 42, p: float = 0.5, brightness: float = 0.0, contrast=None,
+                 noise: float = 0.0, shift=None, rotation: float = 0.0, elastic_alpha: float = 0.0,
+                 elastic_grid=(10, 4), blur: float = 0.0, lines: int = 0, line_width: float = 1.0):
+        self.seed = seed
+        self.p = p
+        self.brightness = brightness
+        self.contrast = contrast
+        self.noise = noise
+        self.shift = shift
+        self.rotation = rotation
+        self.elastic_alpha = elastic_alpha
+        self.elastic_grid = elastic_grid
+        self.blur = blur
+        self.lines = lines
+        self.line_width = line_width
+
+    # ======================
+    # TIRAGES
+    # ======================
+    def _uniform(self, seed, shape, low=-1.0, high=1.0):
+        return tf.random.stateless_uniform(shape, seed, minval=low, maxval=high)
+
+    def _mask(self, seed, b):
+        # (B, 1, 1, 1) : 1 pour les images transformées
+        return tf.cast(self._uniform(seed, [b, 1, 1, 1], 0.0, 1.0) < self.p, tf.float32)
+
+    # ======================
+    # TRANSFORMATIONS
+    # ======================
+    def _geometry(self, images, seeds):
+        shape = tf.shape(images)
+        b, w, h = shape[0], shape[1], shape[2]
+        wf, hf = tf.cast(w, tf.float32), tf.cast(h, tf.float32)
+
+        xs, ys = tf.meshgrid(tf.range(wf), tf.range(hf), indexing="ij")  # (W, H)
+        xs = tf.broadcast_to(xs, [b, w, h])
+        ys = tf.broadcast_to(ys, [b, w, h])
+        cx, cy = (wf - 1) / 2, (hf - 1) / 2
+
+        src_x, src_y = xs, ys
+
+        if self.rotation:
+            on = self._mask(seeds[0], b)[..., 0]
+            theta = self._uniform(seeds[1], [b, 1, 1]) * math.radians(self.rotation) * on
+            cos, sin = tf.cos(theta), tf.sin(theta)
+            src_x = cos * (xs - cx) - sin * (ys - cy) + cx
+            src_y = sin * (xs - cx) + cos * (ys - cy) + cy
+
+        if self.shift:
+            on = self._mask(seeds[2], b)[..., 0]
+            offset = self._uniform(seeds[3], [b, 1, 1, 2]) * tf.constant(self.shift, tf.float32)
+            src_x = src_x + offset[..., 0] * on
+            src_y = src_y + offset[..., 1] * on
+
+        if self.elastic_alpha:
+            on = self._mask(seeds[4], b)
+            gx, gy = self.elastic_grid
+            coarse = tf.random.stateless_normal([b, gx, gy, 2], seeds[5]) * self.elastic_alpha
+            # Champ grossier interpolé : déformation lisse à l'échelle des caractères
+            flow = tf.image.resize(coarse, [w, h], method="bilinear") * on
+            src_x = src_x + flow[..., 0]
+            src_y = src_y + flow[..., 1]
+
+        return _sample_bilinear(images, src_x, src_y)
+
+    def _lines(self, images, seeds):
+        shape = tf.shape(images)
+        b, w, h = shape[0], shape[1], shape[2]
+        wf, hf = tf.cast(w, tf.float32), tf.cast(h, tf.float32)
+
+        # (B, L, 1, 1) : extrémités des segments, en pixels
+        ends = self._uniform(seeds[0], [b, self.lines, 1, 1, 4], 0.0, 1.0)
+        ax, ay = ends[..., 0] * wf, ends[..., 1] * hf
+        bx, by = ends[..., 2] * wf, ends[..., 3] * hf
+        enabled = tf.cast(self._uniform(seeds[1], [b, self.lines, 1, 1], 0.0, 1.0) < self.p, tf.float32)
+        shade = self._uniform(seeds[2], [b, self.lines, 1, 1], 0.3, 0.6)
+
+        xs, ys = tf.meshgrid(tf.range(wf), tf.range(hf), indexing="ij")
+        px, py = xs[None, None], ys[None, None]  # (1, 1, W, H)
+
+        # Distance de chaque pixel au segment [a, b]
+        dx, dy = bx - ax, by - ay
+        t = ((px - ax) * dx + (py - ay) * dy) / tf.maximum(dx * dx + dy * dy, 1e-6)
+        t = tf.clip_by_value(t, 0.0, 1.0)
+        dist = tf.sqrt((px - ax - t * dx) ** 2 + (py - ay - t * dy) ** 2)
+
+        # Trait anti-crénelé : couverture 1 au centre, 0 à line_width / 2 + 0.5
+        coverage = tf.clip_by_value(self.line_width / 2 + 0.5 - dist, 0.0, 1.0) * enabled  # (B, L, W, H)
+
+        # Un trait assombrit le pixel jusqu'à sa teinte (le plus foncé l'emporte)
+        target = tf.reduce_min(tf.where(coverage > 0, shade, tf.ones_like(shade) * 1e9), axis=1)
+        alpha = tf.reduce_max(coverage, axis=1)
+        target = tf.minimum(target, images[..., 0])
+        return (images[..., 0] * (1 - alpha) + target * alpha)[..., None]
+
+    def _blur(self, images, seeds):
+        kernel = _gaussian_kernel(self.blur)
+        blurred = tf.nn.depthwise_conv2d(images, kernel, strides=[1, 1, 1, 1], padding="SAME")
+        # Intensité aléatoire : mélange image nette / image floutée
+        mix = self._uniform(seeds[1], [tf.shape(images)[0], 1, 1, 1], 0.0, 1.0) * self._mask(seeds[0], tf.shape(images)[0])
+        return images + (blurred - images) * mix
+
+    def __call__(self, images, step):
+        """
+        `step` : entier (ou tenseur scalaire) propre au batch, combiné à `seed`.
+        """
+        images = tf.convert_to_tensor(images, tf.float32)
+        b = tf.shape(images)[0]
+        seed = tf.stack([tf.constant(self.seed, tf.int64), tf.cast(step, tf.int64)])
+        seeds = tf.unstack(tf.random.experimental.stateless_split(seed, num=17))
+
+        if self.rotation or self.shift or self.elastic_alpha:
+            images = self._geometry(images, seeds[0:6])
+
+        if self.lines:
+            images = self._lines(images, seeds[6:9])
+
+        if self.blur:
+            images = self._blur(images, seeds[9:11])
+
+        if self.brightness:
+            delta = self._uniform(seeds[11], [b, 1, 1, 1]) * self.brightness
+            images = images + delta * self._mask(seeds[12], b)
+
+        if self.contrast:
+            low, high = self.contrast
+            factor = self._uniform(seeds[13], [b, 1, 1, 1], low, high)
+            factor = 1 + (factor - 1) * self._mask(seeds[14], b)
+            mean = tf.reduce_mean(images, axis=[1, 2, 3], keepdims=True)
+            images = (images - mean) * factor + mean
+
+        if self.noise:
+            noise = tf.random.stateless_normal(tf.shape(images), seeds[15], stddev=self.noise)
+            images = images + noise * self._mask(seeds[16], b)
+
+        return tf.clip_by_value(images, 0.0, 1.0)
+
+    def apply(self, ds):
+        """
+        Dataset de batches {"image", "label"} -> mêmes batches augmentés.
+        Le `step` de chaque batch vient d'une suite tirée de `seed`, nouvelle
+        à chaque epoch mais identique d'un entraînement à l'autre.
+        """
+        steps = tf.data.Dataset.random(seed=self.seed, rerandomize_each_iteration=True)
+        return tf.data.Dataset.zip(steps, ds).map(
+            lambda step, batch: {**batch, "image": self(batch["image"], step)},
+            num_parallel_calls=tf.data.AUTOTUNE
+        )
@@ -0,0 +1,270 @@
+"""
+Benchmark reproductible des modèles OCR du registre.
+
+    python -m ocr.benchmark --data-dir data/data_benchmark_unique
+    python -m ocr.benchmark --data-dir data/data_benchmark_unique --models a_jb_t a_jb_t_onnx
+
+Les labels sont les noms de fichiers (comme dans notebooks/benchmark.ipynb).
+Chaque modèle tourne dans un processus séparé (temps de chargement et pic
+de RSS non pollués par les autres modèles). Résultats écrits en JSON et CSV
+dans --output-dir, suffixés par le commit courant pour comparer les runs.
+"""
+
+import argparse
+import csv
+import json
+import multiprocessing
+import platform
+import resource
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+from ocr.dataset import load_labelled
+from ocr.metrics import compute_metrics
+
+DEFAULT_BATCH_SIZES = (1, 8, 32, 128)
+
+
+# ======================
+# OUTILS
+# ======================
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"],
+            stderr=subprocess.DEVNULL,
+            text=True,
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss : Ko sous Linux, octets sous macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == "darwin":
+        return round(peak / 2**20, 1)
+    return round(peak / 2**10, 1)
+
+
+def percentiles_ms(durations) -> dict:
+    if not durations:
+        return {"p50_ms": None, "p95_ms": None, "p99_ms": None, "mean_ms": None}
+    arr = np.asarray(durations) * 1000
+    return {
+        "p50_ms": round(float(np.percentile(arr, 50)), 2),
+        "p95_ms": round(float(np.percentile(arr, 95)), 2),
+        "p99_ms": round(float(np.percentile(arr, 99)), 2),
+        "mean_ms": round(float(arr.mean()), 2),
+    }
+
+
+# ======================
+# BENCHMARK D'UN MODÈLE
+# ======================
+def _throughput(predictor, images: list, batch_size: int) -> dict:
+    batched = hasattr(predictor, "predict_batch")
+    start = time.perf_counter()
+
+    for i in range(0, len(images), batch_size):
+        chunk = images[i:i + batch_size]
+        if batched:
+            predictor.predict_batch(chunk)
+        else:
+            for data in chunk:
+                predictor.predict_bytes(data)
+
+    elapsed = time.perf_counter() - start
+    return {
+        "batch_size": batch_size,
+        "batched": batched,
+        "images_per_sec": round(len(images) / elapsed, 2) if elapsed > 0 else None,
+    }
+
+
+def benchmark_model(model_key: str, image_paths: list, labels: list, batch_sizes=DEFAULT_BATCH_SIZES,
+                    warmup: int = 3) -> dict:
+    from api.app.services.model_registry import MODEL_REGISTRY, get_ocr_predictor
+
+    cfg = MODEL_REGISTRY[model_key]
+    images = [Path(p).read_bytes() if isinstance(p, (str, Path)) else p for p in image_paths]
+
+    start = time.perf_counter()
+    predictor = get_ocr_predictor(model_key)
+    load_time = time.perf_counter() - start
+
+    # Appels directs : le micro-batcher ajouterait sa fenêtre d'attente à chaque image
+    batcher = getattr(predictor, "batcher", None)
+    if batcher is not None:
+        predictor.batcher = None
+
+    try:
+        for data in images[:warmup]:
+            predictor.predict_bytes(data)
+
+        # Exactitude + latence image par image
+        preds, durations = [], []
+        for data in images:
+            t0 = time.perf_counter()
+            text = predictor.predict_bytes(data)
+            durations.append(time.perf_counter() - t0)
+            preds.append((text or "").strip().lower())
+
+        exact, cer = compute_metrics(preds, labels)
+
+        throughput = [_throughput(predictor, images, bs) for bs in batch_sizes]
+
+    finally:
+        if batcher is not None:
+            batcher.close()
+        # Libère aussi les membres épinglés et threads (cascade, ensemble) en mode --no-isolate
+        if hasattr(predictor, "close"):
+            predictor.close()
+
+    return {
+        "model": model_key,
+        "type": cfg["type"],
+        "label": cfg["label"],
+        "images": len(images),
+        "exact_match": round(exact, 4),
+        "cer": round(cer, 4),
+        "load_time_sec": round(load_time, 3),
+        "peak_rss_mb": peak_rss_mb(),
+        "latency": percentiles_ms(durations),
+        "throughput": throughput,
+    }
+
+
+def _benchmark_isolated(model_key, image_paths, labels, batch_sizes) -> dict:
+    # Les memoryview d'un dataset en shards ne passent pas entre processus
+    image_paths = [bytes(p) if isinstance(p, memoryview) else p for p in image_paths]
+
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=1, mp_context=ctx) as pool:
+        return pool.submit(benchmark_model, model_key, image_paths, labels, batch_sizes).result()
+
+
+def run_benchmarks(model_keys, image_paths, labels, batch_sizes=DEFAULT_BATCH_SIZES, isolate=True) -> list:
+    """
+    Un résultat par modèle ; une erreur de chargement n'interrompt pas les suivants.
+    """
+    from api.app.services.model_registry import MODEL_REGISTRY
+
+    results = []
+    for model_key in model_keys:
+        if model_key not in MODEL_REGISTRY:
+            results.append({"model": model_key, "error": "unknown_model"})
+            continue
+
+        print(f"Benchmarking {model_key} on {len(image_paths)} images...")
+        try:
+            if isolate:
+                result = _benchmark_isolated(model_key, image_paths, labels, batch_sizes)
+            else:
+                result = benchmark_model(model_key, image_paths, labels, batch_sizes)
+        except Exception as e:
+            result = {"model": model_key, "error": str(e)}
+        results.append(result)
+
+    return results
+
+
+# ======================
+# SORTIES
+# ======================
+def flatten(result: dict) -> dict:
+    row = {k: v for k, v in result.items() if k not in ("latency", "throughput")}
+    row.update(result["latency"])
+    for tp in result["throughput"]:
+        row[f"images_per_sec_bs{tp['batch_size']}"] = tp["images_per_sec"]
+    return row
+
+
+def write_reports(report: dict, output_dir: str) -> tuple:
+    out = Path(output_dir)
+    out.mkdir(parents=True, exist_ok=True)
+
+    stem = f"benchmark_{report['meta']['timestamp']}_{report['meta']['commit']}"
+    json_path = out / f"{stem}.json"
+    csv_path = out / f"{stem}.csv"
+
+    with open(json_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+
+    rows = [flatten(r) for r in report["results"] if "error" not in r]
+    if not rows:
+        csv_path = None
+    else:
+        fields = list(dict.fromkeys(k for row in rows for k in row))
+        with open(csv_path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=fields)
+            writer.writeheader()
+            writer.writerows(rows)
+
+    return json_path, csv_path
+
+
+def print_summary(results: list):
+    print("\n================ OCR BENCHMARK ================")
+    for r in results:
+        if "error" in r:
+            print(f"\n--- {r['model']} --- ERROR: {r['error']}")
+            continue
+        print(f"\n--- {r['model']} ({r['label']}) ---")
+        print(f"Exact Match : {r['exact_match']:.4f}")
+        print(f"CER         : {r['cer']:.4f}")
+        print(f"Load time   : {r['load_time_sec']:.3f} s")
+        print(f"Peak RSS    : {r['peak_rss_mb']} MB")
+        lat = r["latency"]
+        print(f"Latency     : p50={lat['p50_ms']} ms  p95={lat['p95_ms']} ms  p99={lat['p99_ms']} ms")
+        for tp in r["throughput"]:
+            print(f"Throughput  : bs={tp['batch_size']:<4d} {tp['images_per_sec']} img/s")
+
+
+def main(argv=None):
+    from api.app.services.model_registry import MODEL_REGISTRY
+
+    parser = argparse.ArgumentParser(description="Benchmark des modèles OCR du registre")
+    parser.add_argument("--data-dir", required=True, help="Dossier d'images labellisées par leur nom, ou de shards (ocr.shards)")
+    parser.add_argument("--models", nargs="+", default=list(MODEL_REGISTRY), help="Clés MODEL_REGISTRY")
+    parser.add_argument("--batch-sizes", nargs="+", type=int, default=list(DEFAULT_BATCH_SIZES))
+    parser.add_argument("--limit", type=int, default=None, help="Nombre max d'images")
+    parser.add_argument("--output-dir", default="benchmarks")
+    parser.add_argument("--no-isolate", action="store_true", help="Tous les modèles dans ce processus")
+    args = parser.parse_args(argv)
+
+    image_paths, labels = load_labelled(args.data_dir, args.limit)
+    if not image_paths:
+        print(f"No images found in {args.data_dir}")
+        return 1
+
+    results = run_benchmarks(args.models, image_paths, labels, args.batch_sizes, isolate=not args.no_isolate)
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.now().strftime("%Y%m%d_%H%M%S"),
+            "data_dir": str(args.data_dir),
+            "images": len(image_paths),
+            "batch_sizes": args.batch_sizes,
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "processor": platform.processor(),
+        },
+        "results": results,
+    }
+
+    print_summary(results)
+    json_path, csv_path = write_reports(report, args.output_dir)
+    print(f"\nReport saved to {json_path}" + (f" and {csv_path}" if csv_path else ""))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,192 @@
+"""
+Calibration des seuils de confiance d'une cascade du registre.
+
+    python -m ocr.calibrate_cascade --data-dir data/data_benchmark_unique
+    python -m ocr.calibrate_cascade --data-dir data/data_benchmark_unique --cascade cascade_ctc_easyocr_trocr
+
+Chaque étage est exécuté sur toutes les images labellisées. Les seuils sont
+choisis du dernier étage vers le premier : pour chaque étage, le seuil qui
+fait monter le moins d'images possible tout en restant à `--tolerance`
+près de la meilleure exactitude atteignable par la suite de la cascade.
+Les seuils sont écrits dans models/cascade_thresholds.json, relu par
+CascadePredictor au chargement.
+"""
+
+import argparse
+import json
+import sys
+import time
+
+import numpy as np
+
+from ocr.dataset import load_labelled
+
+
+# ======================
+# SORTIES PAR ÉTAGE
+# ======================
+def run_stage(model_key: str, image_paths: list, labels: list, batch_size: int = 32) -> dict:
+    from api.app.services.model_registry import get_ocr_predictor
+
+    predictor = get_ocr_predictor(model_key)
+    texts, confidences = [], []
+
+    start = time.perf_counter()
+    for i in range(0, len(image_paths), batch_size):
+        batch = image_paths[i:i + batch_size]
+        if hasattr(predictor, "predict_details_batch"):
+            outputs = predictor.predict_details_batch(batch)
+        else:
+            outputs = [{"text": text, "confidence": None} for text in predictor.predict_batch(batch)]
+        texts.extend((o["text"] or "").strip().lower() for o in outputs)
+        confidences.extend(o.get("confidence") for o in outputs)
+    elapsed = time.perf_counter() - start
+
+    if hasattr(predictor, "close"):
+        predictor.close()
+
+    has_confidence = all(c is not None for c in confidences)
+    return {
+        "model": model_key,
+        "correct": np.array([t == l for t, l in zip(texts, labels)]),
+        "confidence": np.array(confidences, dtype=np.float64) if has_confidence else None,
+        "ms_per_image": 1000 * elapsed / max(1, len(image_paths)),
+    }
+
+
+# ======================
+# CHOIX DES SEUILS
+# ======================
+def choose_threshold(confidence, correct, fallback_correct, tolerance: float):
+    """
+    Seuil t : on garde la sortie de l'étage si confiance >= t, sinon on
+    prend celle de la suite de la cascade (`fallback_correct`).
+    """
+    # 0 : tout garder ; 1.01 : tout escalader (la confiance est dans [0, 1])
+    candidates = np.unique(np.concatenate([confidence, [0.0, 1.01]]))
+
+    accuracy = np.array([
+        np.where(confidence >= t, correct, fallback_correct).mean() for t in candidates
+    ])
+    escalation = np.array([(confidence < t).mean() for t in candidates])
+
+    admissible = accuracy >= accuracy.max() - tolerance
+    best = np.flatnonzero(admissible)[np.argmin(escalation[admissible])]
+
+    return float(candidates[best]), float(accuracy[best]), float(escalation[best])
+
+
+def calibrate(stage_outputs: list, tolerance: float = 0.005) -> dict:
+    fallback = stage_outputs[-1]["correct"]
+    thresholds = [None] * len(stage_outputs)
+
+    for level in range(len(stage_outputs) - 2, -1, -1):
+        stage = stage_outputs[level]
+        if stage["confidence"] is None:
+            # Pas de confiance : l'étage accepte tout, la suite n'est jamais atteinte
+            fallback = stage["correct"]
+            continue
+
+        thresholds[level], _, _ = choose_threshold(stage["confidence"], stage["correct"], fallback, tolerance)
+
+        accept = stage["confidence"] >= thresholds[level]
+        fallback = np.where(accept, stage["correct"], fallback)
+
+    return {"thresholds": thresholds, **simulate(stage_outputs, thresholds)}
+
+
+def simulate(stage_outputs: list, thresholds: list) -> dict:
+    """
+    Exactitude, taux par étage et coût moyen de la cascade pour ces seuils.
+    """
+    n = len(stage_outputs[0]["correct"])
+    pending = np.ones(n, dtype=bool)
+    correct = np.zeros(n, dtype=bool)
+    cost_ms = 0.0
+    stages = []
+
+    for level, (stage, threshold) in enumerate(zip(stage_outputs, thresholds)):
+        received = pending.copy()
+        cost_ms += stage["ms_per_image"] * received.mean()
+
+        if level == len(stage_outputs) - 1 or threshold is None or stage["confidence"] is None:
+            accept = received
+        else:
+            accept = received & (stage["confidence"] >= threshold)
+
+        correct |= accept & stage["correct"]
+        pending = received & ~accept
+
+        stages.append({
+            "model": stage["model"],
+            "min_confidence": threshold,
+            "reach_rate": round(float(received.mean()), 4),
+            "hit_rate": round(float(accept.mean()), 4),
+            "stage_exact_match": round(float(stage["correct"].mean()), 4),
+            "ms_per_image": round(stage["ms_per_image"], 2),
+        })
+
+    return {
+        "exact_match": round(float(correct.mean()), 4),
+        "expected_ms_per_image": round(float(cost_ms), 2),
+        "stages": stages,
+    }
+
+
+def main(argv=None):
+    from api.app.services.cascade_service import THRESHOLDS_FILE
+    from api.app.services.model_registry import MODEL_REGISTRY
+
+    parser = argparse.ArgumentParser(description="Calibration des seuils d'une cascade OCR")
+    parser.add_argument("--data-dir", required=True, help="Captchas labellisés par leur nom de fichier, ou shards (ocr.shards)")
+    parser.add_argument("--cascade", default="cascade_ctc_trocr", help="Clé MODEL_REGISTRY de type cascade")
+    parser.add_argument("--limit", type=int, default=None)
+    parser.add_argument("--tolerance", type=float, default=0.005, help="Perte d'exactitude tolérée")
+    parser.add_argument("--output", default=str(THRESHOLDS_FILE))
+    args = parser.parse_args(argv)
+
+    cfg = MODEL_REGISTRY.get(args.cascade)
+    if not cfg or cfg["type"] != "cascade":
+        print(f"Unknown cascade: {args.cascade}")
+        return 1
+
+    image_paths, labels = load_labelled(args.data_dir, args.limit)
+    if not image_paths:
+        print(f"No images found in {args.data_dir}")
+        return 1
+
+    outputs = []
+    for stage in cfg["stages"]:
+        print(f"Running {stage['model']} on {len(image_paths)} images...")
+        outputs.append(run_stage(stage["model"], image_paths, labels))
+
+    report = {
+        "default": simulate(outputs, [s.get("min_confidence") for s in cfg["stages"]]),
+        "calibrated": calibrate(outputs, args.tolerance),
+        "images": len(image_paths),
+        "data_dir": str(args.data_dir),
+    }
+
+    existing = {}
+    try:
+        with open(args.output, encoding="utf-8") as f:
+            existing = json.load(f)
+    except (OSError, ValueError):
+        pass
+
+    existing[args.cascade] = {
+        "thresholds": report["calibrated"]["thresholds"],
+        "exact_match": report["calibrated"]["exact_match"],
+        "expected_ms_per_image": report["calibrated"]["expected_ms_per_image"],
+        "images": report["images"],
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(existing, f, indent=2)
+
+    print(json.dumps(report, indent=2))
+    print(f"Thresholds saved to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,5 @@
+# Alphabet des captchas (sans dépendance TensorFlow)
+characters = list("0123456789abcdefghijklmnopqrstuvwxyz")
+num_chars = len(characters)
+num_classes = num_chars + 1  # + blank CTC (dernière classe)
+max_length = 6  # longueur max d'un captcha (MAX_LEN des notebooks)
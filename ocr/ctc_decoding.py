@@ -0,0 +1,351 @@
+"""
+Décodage CTC en NumPy pur (aucune dépendance TensorFlow).
+
+- greedy_decode : collapse vectorisé sur tout le batch (B, T, C)
+- beam_search_decode : prefix beam search (largeur configurable)
+- decode_details : texte + scores (log-probabilité, probabilité par caractère, alternatives)
+- DecodingConstraints : longueur, alphabet et regex imposés pendant le beam search
+- indices_to_text : table de correspondance indice -> caractère
+"""
+
+import math
+from collections import defaultdict
+from functools import lru_cache
+
+import numpy as np
+
+from .charset import characters, num_chars
+
+BLANK_INDEX = num_chars  # le blank CTC est la dernière classe
+
+# Table indice -> caractère : le blank et le padding (-1) donnent ""
+CHAR_TABLE = np.array(characters + [""])
+
+NEG_INF = -math.inf
+
+
+# ======================
+# MAPPING INDICES -> TEXTE
+# ======================
+def indices_to_text(sequences, table=CHAR_TABLE) -> list:
+    """
+    `sequences` : tableau dense (B, L) complété par -1, ou liste de séquences.
+    """
+    if isinstance(sequences, np.ndarray) and sequences.ndim == 2:
+        chars = table[sequences]
+        return ["".join(row) for row in chars]
+
+    return ["".join(table[np.asarray(seq, dtype=np.int64)]) for seq in sequences]
+
+
+# ======================
+# GREEDY (VECTORISÉ)
+# ======================
+def greedy_decode(probs, blank=BLANK_INDEX):
+    """
+    Best path : argmax par pas de temps, fusion des répétitions, suppression du blank.
+
+    Retourne (dense, lengths) : dense (B, T) complété par -1, lengths (B,).
+    """
+    probs = np.asarray(probs)
+    best = probs.argmax(axis=-1)  # (B, T)
+
+    keep = best != blank
+    keep[:, 1:] &= best[:, 1:] != best[:, :-1]
+
+    lengths = keep.sum(axis=1)
+    dense = np.full(best.shape, -1, dtype=np.int64)
+
+    # Position de chaque caractère conservé dans sa séquence compactée
+    positions = np.cumsum(keep, axis=1) - 1
+    rows = np.broadcast_to(np.arange(best.shape[0])[:, None], best.shape)
+    dense[rows[keep], positions[keep]] = best[keep]
+
+    return dense, lengths
+
+
+def greedy_decode_text(probs, table=CHAR_TABLE) -> list:
+    dense, _ = greedy_decode(probs)
+    return indices_to_text(dense, table)
+
+
+# ======================
+# CONTRAINTES DE DÉCODAGE
+# ======================
+class DecodingConstraints:
+    """
+    Espace des textes valides pour un site :
+    - length : longueur exacte (ou min_length / max_length)
+    - allowed : caractères autorisés (sous-ensemble de l'alphabet)
+    - pattern : regex du site, testée sur les préfixes (correspondance
+      partielle du module `regex`) pour couper les faisceaux au plus tôt
+
+    Utilisée par le beam search : un préfixe invalide n'est jamais étendu.
+    Les tests de préfixes sont mémorisés (LRU de `prefix_cache_size` entrées).
+    """
+
+    def __init__(self, length: int = None, min_length: int = None, max_length: int = None,
+                 allowed: str = None, pattern: str = None, table=CHAR_TABLE,
+                 prefix_cache_size: int = 65536):
+        self.min_length = length if length is not None else (min_length or 0)
+        self.max_length = length if length is not None else max_length
+        self.table = table
+
+        # Classes interdites (le blank reste toujours autorisé)
+        self.allowed_indices = None
+        if allowed is not None:
+            self.allowed_indices = {i for i, char in enumerate(characters) if char in set(allowed)}
+
+        self.pattern = pattern
+        self._regex = None
+        if pattern:
+            import regex
+            self._regex = regex.compile(pattern)
+
+        # Préfixes d'images successives : mémoire bornée, partagée entre threads
+        self._matches_prefix = lru_cache(maxsize=prefix_cache_size)(self._match_prefix)
+
+    def allows_class(self, c: int) -> bool:
+        return self.allowed_indices is None or c in self.allowed_indices
+
+    def allows_prefix(self, prefix: tuple) -> bool:
+        """
+        Le préfixe peut-il encore être complété en un texte valide ?
+        """
+        if self.max_length is not None and len(prefix) > self.max_length:
+            return False
+        if self._regex is None:
+            return True
+        return self._matches_prefix(prefix)
+
+    def _match_prefix(self, prefix: tuple) -> bool:
+        text = "".join(self.table[list(prefix)]) if prefix else ""
+        return self._regex.fullmatch(text, partial=True) is not None
+
+    def accepts(self, prefix: tuple) -> bool:
+        """
+        Texte complet valide (longueur, alphabet et regex complète).
+        """
+        if len(prefix) < self.min_length:
+            return False
+        if self.max_length is not None and len(prefix) > self.max_length:
+            return False
+        # Le chemin glouton n'est pas filtré caractère par caractère comme la beam search
+        if not all(self.allows_class(c) for c in prefix):
+            return False
+        if self._regex is None:
+            return True
+
+        text = "".join(self.table[list(prefix)]) if prefix else ""
+        return self._regex.fullmatch(text) is not None
+
+    def reachable(self, prefix: tuple, remaining_frames: int) -> bool:
+        # Chaque caractère manquant consomme au moins une frame
+        return len(prefix) + remaining_frames >= self.min_length
+
+
+# ======================
+# PREFIX BEAM SEARCH
+# ======================
+def _logsumexp(a: float, b: float) -> float:
+    if a == NEG_INF:
+        return b
+    if b == NEG_INF:
+        return a
+    if a > b:
+        return a + math.log1p(math.exp(b - a))
+    return b + math.log1p(math.exp(a - b))
+
+
+def _prefix_beam_search(log_probs, beam_width, blank, prune_log_prob, constraints=None):
+    # beams : préfixe -> [log p(fin par blank), log p(fin par caractère)]
+    beams = {(): [0.0, NEG_INF]}
+    steps = len(log_probs)
+
+    for t, lp in enumerate(log_probs):
+        candidates = np.flatnonzero(lp >= prune_log_prob)
+        if candidates.size == 0:
+            candidates = np.array([int(lp.argmax())])
+        candidates = [(int(c), float(lp[c])) for c in candidates if c != blank]
+        if constraints is not None:
+            candidates = [(c, lp_c) for c, lp_c in candidates if constraints.allows_class(c)]
+        lp_blank = float(lp[blank])
+
+        next_beams = defaultdict(lambda: [NEG_INF, NEG_INF])
+
+        for prefix, (p_b, p_nb) in beams.items():
+            p_total = _logsumexp(p_b, p_nb)
+
+            # Blank : le préfixe est inchangé
+            entry = next_beams[prefix]
+            entry[0] = _logsumexp(entry[0], p_total + lp_blank)
+
+            last = prefix[-1] if prefix else None
+
+            for c, lp_c in candidates:
+                if c == last:
+                    # Répétition sans blank intermédiaire : fusion dans le même préfixe
+                    entry[1] = _logsumexp(entry[1], p_nb + lp_c)
+
+                if constraints is not None and not constraints.allows_prefix(prefix + (c,)):
+                    continue
+
+                extended = next_beams[prefix + (c,)]
+
+                if c == last:
+                    # Caractère doublé : seulement après un blank
+                    extended[1] = _logsumexp(extended[1], p_b + lp_c)
+                else:
+                    extended[1] = _logsumexp(extended[1], p_total + lp_c)
+
+        if constraints is not None:
+            # Préfixes trop courts pour atteindre la longueur minimale
+            remaining = steps - t - 1
+            next_beams = {
+                prefix: scores for prefix, scores in next_beams.items()
+                if constraints.reachable(prefix, remaining)
+            }
+
+        beams = dict(
+            sorted(
+                next_beams.items(),
+                key=lambda kv: _logsumexp(*kv[1]),
+                reverse=True
+            )[:beam_width]
+        )
+
+    return [
+        (np.array(prefix, dtype=np.int64), _logsumexp(p_b, p_nb))
+        for prefix, (p_b, p_nb) in beams.items()
+        if constraints is None or constraints.accepts(prefix)
+    ]
+
+
+def beam_search_decode(probs, beam_width: int = 10, top_paths: int = 1,
+                       blank=BLANK_INDEX, prune_prob: float = 1e-3, constraints=None):
+    """
+    Prefix beam search CTC sur des probabilités softmax (B, T, C).
+
+    Retourne, pour chaque image, la liste des `top_paths` meilleures
+    hypothèses (indices, log-probabilité), triées par score décroissant.
+    Les caractères de probabilité < `prune_prob` sur une frame sont ignorés.
+
+    `constraints` (DecodingConstraints) : seuls les textes valides sont
+    explorés ; la liste est vide si aucun ne survit au faisceau.
+    """
+    probs = np.asarray(probs, dtype=np.float64)
+    log_probs = np.log(probs + 1e-8)
+    prune_log_prob = math.log(prune_prob) if prune_prob > 0 else NEG_INF
+
+    results = []
+    for sample in log_probs:
+        hyps = _prefix_beam_search(sample, beam_width, blank, prune_log_prob, constraints)
+        results.append(hyps[:top_paths])
+
+    return results
+
+
+def beam_search_decode_text(probs, beam_width: int = 10, table=CHAR_TABLE) -> list:
+    return [
+        indices_to_text([hyps[0][0]], table)[0]
+        for hyps in beam_search_decode(probs, beam_width=beam_width)
+    ]
+
+
+# ======================
+# RÉSULTATS DÉTAILLÉS (SCORES)
+# ======================
+def greedy_decode_details(probs, blank=BLANK_INDEX, table=CHAR_TABLE) -> list:
+    """
+    Best path avec ses scores, pour chaque image :
+    - text
+    - logprob : log-probabilité du chemin argmax (somme sur les frames)
+    - confidence : exp(logprob), dans [0, 1]
+    - char_probs : probabilité max de chaque caractère émis sur ses frames
+    """
+    probs = np.asarray(probs)
+    best = probs.argmax(axis=-1)  # (B, T)
+    best_p = np.take_along_axis(probs, best[..., None], axis=-1)[..., 0].astype(np.float64)
+
+    logprobs = np.log(best_p + 1e-8).sum(axis=1)
+
+    # Début de chaque segment (frames consécutives de même classe)
+    starts = np.ones(best.shape, dtype=bool)
+    starts[:, 1:] = best[:, 1:] != best[:, :-1]
+
+    results = []
+    for row, p_row, s_row, logprob in zip(best, best_p, starts, logprobs):
+        idx = np.flatnonzero(s_row)
+        seg_max = np.maximum.reduceat(p_row, idx)
+        labels = row[idx]
+        emitted = labels != blank
+
+        results.append({
+            "text": "".join(table[labels[emitted]]),
+            "logprob": float(logprob),
+            "confidence": float(np.exp(logprob)),
+            "char_probs": [round(float(p), 6) for p in seg_max[emitted]],
+        })
+
+    return results
+
+
+def decode_details(probs, top_k: int = 1, beam_width: int = 10, use_beam: bool = False,
+                   constraints=None, table=CHAR_TABLE) -> list:
+    """
+    greedy_decode_details + les `top_k` alternatives du beam search
+    (texte, log-probabilité sommée sur tous les alignements) si top_k > 1.
+    `use_beam` : texte et log-probabilité pris du meilleur faisceau.
+
+    `constraints` (DecodingConstraints) : une sortie greedy valide est
+    gardée telle quelle ; les autres images sont redécodées par le beam
+    search contraint. Sans texte valide : text "" et confidence 0.
+    """
+    probs = np.asarray(probs)
+    results = greedy_decode_details(probs, table=table)
+
+    if constraints is None:
+        if top_k <= 1 and not use_beam:
+            return results
+        rows = list(range(len(results)))
+    else:
+        rows = [
+            i for i, result in enumerate(results)
+            if use_beam or top_k > 1 or not constraints.accepts(_text_to_indices(result["text"]))
+        ]
+        use_beam = True
+
+    if not rows:
+        return results
+
+    beams = beam_search_decode(
+        probs[rows],
+        beam_width=max(beam_width, top_k),
+        top_paths=max(1, top_k),
+        constraints=constraints
+    )
+    for i, hyps in zip(rows, beams):
+        result = results[i]
+        alternatives = [
+            {"text": indices_to_text([indices], table)[0], "logprob": float(logp)}
+            for indices, logp in hyps
+        ]
+        if use_beam:
+            greedy_text = result["text"]
+            if alternatives:
+                result["text"] = alternatives[0]["text"]
+                result["logprob"] = alternatives[0]["logprob"]
+                result["confidence"] = float(np.exp(result["logprob"]))
+            else:
+                result.update({"text": "", "logprob": None, "confidence": 0.0})
+            if result["text"] != greedy_text:
+                # Probabilités par caractère du chemin greedy : plus alignées sur le texte
+                result["char_probs"] = None
+        if top_k > 1:
+            result["alternatives"] = alternatives
+
+    return results
+
+
+def _text_to_indices(text: str) -> tuple:
+    return tuple(characters.index(char) for char in text)
@@ -1,9 +1,30 @@
 import tensorflow as tf
 from keras import layers
-from .vocab import num_chars
+from .charset import num_chars
+
+
+def _global_mean(loss):
+    """
+    Moyenne de la perte sur le batch global.
+
+    Sous tf.distribute chaque réplica ne voit qu'une part du batch : somme
+    locale / taille du batch global (tailles sommées entre réplicas), donc
+    chaque exemple compte une fois même si les parts sont inégales.
+    Keras divise ensuite les pertes add_loss par le nombre de réplicas
+    (scale_loss_for_distribution) avant de sommer les gradients : on le compense.
+    """
+    ctx = tf.distribute.get_replica_context()
+    replicas = tf.distribute.get_strategy().num_replicas_in_sync
+    if ctx is None or replicas == 1:
+        return tf.reduce_mean(loss)
+
+    batch = ctx.all_reduce(tf.distribute.ReduceOp.SUM, tf.cast(tf.shape(loss)[0], loss.dtype))
+    return tf.reduce_sum(loss) / batch * replicas
+
 
 class CTCLayer(layers.Layer):
     def call(self, y_true, y_pred):
+        y_pred = tf.cast(y_pred, tf.float32)
         batch = tf.shape(y_true)[0]
         input_len = tf.fill([batch], tf.shape(y_pred)[1])
         label_len = tf.reduce_sum(tf.cast(y_true >= 0, tf.int32), axis=1)
@@ -18,5 +39,5 @@ class CTCLayer(layers.Layer):
             blank_index=num_chars,
         )
 
-        self.add_loss(tf.reduce_mean(loss))
+        self.add_loss(_global_mean(loss))
         return y_pred
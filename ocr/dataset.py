@@ -0,0 +1,41 @@
+from pathlib import Path
+
+IMG_EXT = (".png", ".jpg", ".jpeg")
+
+
+def list_images(d):
+    out = []
+    for ext in ("*.png", "*.jpg", "*.jpeg"):
+        out.extend(Path(d).glob(ext))
+    return sorted(out)
+
+
+def label_from_path(path) -> str:
+    # Le label est le nom du fichier (comme dans les notebooks)
+    return Path(path).stem.lower()
+
+
+def load_labelled_folder(folder, limit=None):
+    """
+    (chemins, labels) d'un dossier d'images nommées d'après leur texte.
+    """
+    files = list_images(folder)
+    if limit:
+        files = files[:limit]
+    return [str(p) for p in files], [label_from_path(p) for p in files]
+
+
+def load_labelled(source, limit=None):
+    """
+    (images, labels) d'un dossier d'images ou d'un dossier de shards
+    (python -m ocr.shards). Images : chemins dans le premier cas, octets
+    encodés (memoryview sur le fichier, sans copie) dans le second.
+    """
+    from ocr.shards import ShardedDataset, is_shard_dir
+
+    if is_shard_dir(source):
+        dataset = ShardedDataset(source)
+        images = dataset.raw_images(limit)
+        return images, dataset.labels[:len(images)]
+
+    return load_labelled_folder(source, limit)
@@ -1,22 +1,29 @@
-import numpy as np
-import tensorflow as tf
-from .vocab import num_to_char
+from .ctc_decoding import DecodingConstraints, beam_search_decode_text, decode_details
 
 def decode_beam(preds, beam_width=10):
-    input_len = np.ones(preds.shape[0]) * preds.shape[1]
+    """
+    Décodage CTC beam search (NumPy, sans TensorFlow).
+    `preds` : probabilités softmax (B, T, C).
+    """
+    return beam_search_decode_text(preds, beam_width=beam_width)
 
-    decoded, _ = tf.nn.ctc_beam_search_decoder(
-        tf.math.log(tf.transpose(preds,[1,0,2]) + 1e-8),
-        input_len.astype(np.int32),
+def decode_beam_details(preds, beam_width=10, top_k=3):
+    """
+    Comme decode_beam, avec les scores : pour chaque image, texte et
+    log-probabilité du meilleur faisceau, probabilités par caractère
+    et `top_k` alternatives.
+    """
+    return decode_details(preds, top_k=top_k, beam_width=beam_width, use_beam=True)
+
+def decode_constrained(preds, beam_width=10, **constraints):
+    """
+    Beam search limité aux textes valides du site : `length` ou
+    `min_length` / `max_length`, `allowed` (caractères), `pattern` (regex).
+    """
+    results = decode_details(
+        preds,
         beam_width=beam_width,
+        use_beam=True,
+        constraints=DecodingConstraints(**constraints)
     )
-
-    dense = tf.sparse.to_dense(decoded[0], -1)
-
-    texts = []
-    for seq in dense:
-        seq = seq[seq >= 0]
-        texts.append(
-            b"".join(tf.gather(num_to_char, seq).numpy()).decode()
-        )
-    return texts
+    return [result["text"] for result in results]
@@ -1,24 +1,114 @@
+from pathlib import Path
+
+import cv2
 import easyocr
+import numpy as np
+
+from ocr.charset import characters
+from ocr.image_io import decode_image_bytes, is_image_bytes
+
+# Alphabet des captchas : EasyOCR ignore les autres caractères au décodage
+ALLOWLIST = "".join(characters)
 
 
 class EasyOCRPredictor:
-    def __init__(self, languages=None):
+    """
+    EasyOCR sur des captchas déjà recadrés.
+
+    - `recognition_only` : pas de détecteur CRAFT (ni chargé, ni exécuté),
+      l'image entière est la seule boîte passée au reconnaisseur
+    - `predict_batch` : en mode reconnaissance seule, un seul passage du
+      reconnaisseur pour tout le batch
+    - `allowlist` : par défaut l'alphabet des captchas (ocr/charset.py)
+    """
+
+    def __init__(self, languages=None, recognition_only: bool = False, allowlist: str = ALLOWLIST,
+                 batch_size: int = 32):
         if languages is None:
             languages = ["en"]
 
+        self.recognition_only = recognition_only
+        self.allowlist = allowlist
+        self.batch_size = batch_size
+
         self.reader = easyocr.Reader(
             languages,
-            gpu=False  # True si CUDA
+            gpu=False,  # True si CUDA
+            detector=not recognition_only
         )
 
     def predict(self, image_path: str) -> str:
         """
         Retourne le texte OCR détecté par EasyOCR
         """
+        return self._readtext(image_path)
+
+    def predict_array(self, array) -> str:
+        """
+        Même chose à partir d'une image déjà décodée (tableau NumPy)
+        """
+        return self._readtext(np.asarray(array))
+
+    def predict_bytes(self, data) -> str:
+        """
+        Même chose à partir des octets de l'image, sans fichier
+        """
+        return self.predict_array(decode_image_bytes(data))
+
+    def predict_batch(self, items) -> list:
+        """
+        Textes de plusieurs images (chemins, octets ou tableaux), dans l'ordre
+        """
+        if not self.recognition_only:
+            return [
+                self._readtext(decode_image_bytes(item) if is_image_bytes(item) else item)
+                for item in items
+            ]
+
+        return [result["text"] for result in self.predict_details_batch(items)]
+
+    def predict_details_batch(self, items, top_k: int = 1) -> list:
+        """
+        Texte + confiance du reconnaisseur (mode reconnaissance seule)
+        """
+        if not self.recognition_only:
+            return [{"text": text, "confidence": None} for text in self.predict_batch(items)]
+
+        results = []
+        for i in range(0, len(items), self.batch_size):
+            greys = [self._load(item) for item in items[i:i + self.batch_size]]
+            results.extend(self._recognize_batch(greys))
+        return results
+
+    # ======================
+    # IMAGE LOADER
+    # ======================
+    def _load(self, item):
+        """
+        Image en niveaux de gris (H, W) uint8, entrée du reconnaisseur
+        """
+        if is_image_bytes(item):
+            return decode_image_bytes(item, grayscale=True)
+
+        if not isinstance(item, np.ndarray):
+            return decode_image_bytes(Path(item).read_bytes(), grayscale=True)
+
+        if item.ndim == 3:
+            return cv2.cvtColor(item, cv2.COLOR_RGB2GRAY)
+        return item
+
+    # ======================
+    # OCR
+    # ======================
+    def _readtext(self, image) -> str:
+        if self.recognition_only:
+            return self._recognize_batch([self._load(image)])[0]["text"]
+
         results = self.reader.readtext(
-            image_path,
+            image,
             detail=0,
-            paragraph=False
+            paragraph=False,
+            allowlist=self.allowlist
         )
 
         if not results:
@@ -26,3 +116,41 @@ class EasyOCRPredictor:
 
         # Concaténation simple (captchas courts)
         return "".join(results)
+
+    def _recognize_batch(self, greys) -> list:
+        """
+        Une boîte = l'image entière. Les recadrages de toutes les images
+        sont reconnus ensemble (get_text), dans l'ordre du batch.
+        """
+        from easyocr.recognition import get_text
+        from easyocr.utils import get_image_list
+
+        imgH = 64  # hauteur d'entrée du reconnaisseur EasyOCR
+        crops, max_width = [], 0
+
+        for grey in greys:
+            h, w = grey.shape[:2]
+            image_list, width = get_image_list([[0, w, 0, h]], [], grey, model_height=imgH)
+            crops.extend(image_list)
+            max_width = max(max_width, width)
+
+        ignore_char = "".join(set(self.reader.character) - set(self.allowlist))
+
+        results = get_text(
+            self.reader.character,
+            imgH,
+            int(max_width),
+            self.reader.recognizer,
+            self.reader.converter,
+            crops,
+            ignore_char=ignore_char,
+            decoder="greedy",
+            batch_size=self.batch_size,
+            workers=0,
+            device=self.reader.device
+        )
+
+        return [
+            {"text": text.strip(), "confidence": float(confidence)}
+            for _, text, confidence in results
+        ]
@@ -0,0 +1,134 @@
+"""
+Export du modèle CTC (sans CTCLayer) au format ONNX + contrôle de parité.
+
+    python -m ocr.export \
+        --model models/ANASTASIIA_JB_THEO_9B2_PLUS_SITE_INFER.keras \
+        --output models/ANASTASIIA_JB_THEO_9B2_PLUS_SITE_INFER.onnx \
+        --reference-dir data/samples
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+import numpy as np
+
+from ocr.ctc_decoding import greedy_decode_text
+from ocr.preprocess import IMG_HEIGHT, IMG_WIDTH, preprocess_batch_np
+
+IMG_EXT = (".png", ".jpg", ".jpeg")
+
+
+# ======================
+# CHARGEMENT KERAS
+# ======================
+def load_inference_model(model_path: str):
+    """
+    Accepte un modèle d'entraînement ([image, label] -> CTCLayer)
+    ou un modèle d'inférence déjà extrait.
+    """
+    import keras
+    from ocr.ctc_layer import CTCLayer
+
+    model = keras.models.load_model(
+        model_path,
+        custom_objects={"CTCLayer": CTCLayer},
+        compile=False
+    )
+
+    if len(model.inputs) > 1:
+        # Modèle de prédiction (sans la couche CTC)
+        model = keras.Model(model.inputs[0], model.layers[-2].output)
+
+    # Keras n'exporte qu'un modèle déjà appelé au moins une fois
+    model(np.zeros((1, IMG_WIDTH, IMG_HEIGHT, 1), dtype=np.float32), training=False)
+    return model
+
+
+# ======================
+# EXPORT
+# ======================
+def export_onnx(model, output_path: str) -> str:
+    Path(output_path).parent.mkdir(parents=True, exist_ok=True)
+    model.export(output_path, format="onnx")
+    return output_path
+
+
+# ======================
+# PARITÉ KERAS / ONNX
+# ======================
+def list_reference_images(reference_dir, limit=None) -> list:
+    if not Path(reference_dir).is_dir():
+        return []
+    paths = sorted(
+        p for p in Path(reference_dir).iterdir()
+        if p.suffix.lower() in IMG_EXT
+    )
+    return paths[:limit] if limit else paths
+
+
+def check_parity(model, onnx_path: str, image_paths: list, batch_size: int = 32) -> dict:
+    import onnxruntime as ort
+
+    session = ort.InferenceSession(onnx_path, providers=["CPUExecutionProvider"])
+    input_name = session.get_inputs()[0].name
+
+    max_abs_diff = 0.0
+    same_text = 0
+
+    for i in range(0, len(image_paths), batch_size):
+        batch = preprocess_batch_np(image_paths[i:i + batch_size])
+
+        ref = np.asarray(model(batch, training=False))
+        out = session.run(None, {input_name: batch})[0]
+
+        max_abs_diff = max(max_abs_diff, float(np.abs(ref - out).max()))
+        same_text += sum(
+            a == b for a, b in zip(greedy_decode_text(ref), greedy_decode_text(out))
+        )
+
+    n = len(image_paths)
+    return {
+        "images": n,
+        "max_abs_diff": max_abs_diff,
+        "text_agreement": same_text / n if n else None,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export du modèle CTC en ONNX")
+    parser.add_argument("--model", required=True, help="Modèle .keras (entraînement ou inférence)")
+    parser.add_argument("--output", required=True, help="Fichier .onnx de sortie")
+    parser.add_argument("--reference-dir", help="Images de référence pour le contrôle de parité")
+    parser.add_argument("--limit", type=int, default=None, help="Nombre max d'images de référence")
+    parser.add_argument("--atol", type=float, default=1e-4, help="Écart max toléré sur les probabilités")
+    args = parser.parse_args(argv)
+
+    # Vérifié avant l'export : un dossier vide ou absent ne doit pas passer pour un écart de parité
+    references = []
+    if args.reference_dir:
+        references = list_reference_images(args.reference_dir, args.limit)
+        if not references:
+            parser.error(f"no reference images in {args.reference_dir}")
+
+    model = load_inference_model(args.model)
+    export_onnx(model, args.output)
+    print(f"ONNX model saved to {args.output}")
+
+    if not references:
+        return 0
+
+    report = check_parity(model, args.output, references)
+    print(json.dumps(report, indent=2))
+
+    if report["max_abs_diff"] > args.atol or report["text_agreement"] != 1.0:
+        print("PARITY CHECK FAILED")
+        return 1
+
+    print("PARITY CHECK OK")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,29 @@
+import cv2
+import numpy as np
+
+
+def decode_image_bytes(data, grayscale: bool = False) -> np.ndarray:
+    """
+    Décode une image encodée (PNG/JPEG/...) depuis `bytes`, `bytearray`
+    ou `memoryview`, sans fichier temporaire.
+
+    np.frombuffer ne copie pas le buffer source : seule l'image décodée
+    est allouée. Retourne un tableau uint8 (H, W) en niveaux de gris
+    ou (H, W, 3) en RGB.
+    """
+    buffer = np.frombuffer(data, dtype=np.uint8)
+
+    flag = cv2.IMREAD_GRAYSCALE if grayscale else cv2.IMREAD_COLOR
+    image = cv2.imdecode(buffer, flag)
+
+    if image is None:
+        raise ValueError("Impossible de décoder l'image")
+
+    if not grayscale:
+        image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+
+    return image
+
+
+def is_image_bytes(item) -> bool:
+    return isinstance(item, (bytes, bytearray, memoryview))
@@ -0,0 +1,25 @@
+def levenshtein(a, b):
+    n, m = len(a), len(b)
+    if n == 0: return m
+    if m == 0: return n
+    prev = list(range(m + 1))
+    for i in range(1, n + 1):
+        cur = [i] + [0] * m
+        for j in range(1, m + 1):
+            cost = 0 if a[i-1] == b[j-1] else 1
+            cur[j] = min(prev[j] + 1, cur[j-1] + 1, prev[j-1] + cost)
+        prev = cur
+    return prev[m]
+
+def compute_metrics(preds, labels):
+    """
+    Retourne (exact match, CER) — mêmes définitions que notebooks/benchmark.ipynb
+    """
+    n = len(labels)
+    exact = sum(p == l for p, l in zip(preds, labels)) / max(1, n)
+    edits, chars = 0, 0
+    for p, l in zip(preds, labels):
+        edits += levenshtein(p, l)
+        chars += len(l)
+    cer = edits / max(1, chars)
+    return exact, cer
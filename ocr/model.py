@@ -1,7 +1,7 @@
 import keras
 from keras import layers
 from .ctc_layer import CTCLayer
-from .vocab import num_classes
+from .charset import num_classes
 
 IMG_WIDTH = 200
 IMG_HEIGHT = 50
@@ -22,7 +22,15 @@ def build_ocr_model():
     x = layers.Bidirectional(layers.LSTM(256, return_sequences=True))(x)
     x = layers.Bidirectional(layers.LSTM(128, return_sequences=True))(x)
 
-    y = layers.Dense(num_classes, activation="softmax")(x)
-    out = CTCLayer()(lbl, y)
+    # Softmax et perte CTC en float32, même sous mixed_bfloat16
+    y = layers.Dense(num_classes, activation="softmax", name="char_softmax", dtype="float32")(x)
+    out = CTCLayer(dtype="float32")(lbl, y)
 
     return keras.Model([img, lbl], out)
+
+
+def build_infer_model(model):
+    """
+    Modèle d'inférence (image -> softmax), sans CTCLayer : celui que sert OCRService.
+    """
+    return keras.Model(model.inputs[0], model.get_layer("char_softmax").output)
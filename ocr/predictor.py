@@ -1,8 +1,6 @@
-import numpy as np
-import tensorflow as tf
 import keras
 
-from ocr.preprocess import preprocess_image
+from ocr.preprocess import preprocess_batch_np
 from ocr.decoder import decode_beam
 from ocr.vocab import num_to_char
 from ocr.ctc_layer import CTCLayer
@@ -27,11 +25,23 @@ class OCRPredictor:
         Prédit le texte d'une image captcha
         """
         # 1) Preprocess image
-        image = preprocess_image(image_path)
-        image = tf.expand_dims(image, axis=0)  # batch = 1
+        return self._predict_batch(preprocess_batch_np([image_path]))
 
-        # 2) Prédiction réseau
-        preds = self.prediction_model.predict(image, verbose=0)
+    def predict_array(self, array) -> str:
+        """
+        Prédit le texte d'une image déjà décodée (tableau NumPy)
+        """
+        return self._predict_batch(preprocess_batch_np([array]))
+
+    def predict_bytes(self, data) -> str:
+        """
+        Prédit le texte d'une image encodée (bytes / memoryview), sans fichier
+        """
+        return self._predict_batch(preprocess_batch_np([data]))
+
+    def _predict_batch(self, batch) -> str:
+        # 2) Prédiction réseau (batch = 1)
+        preds = self.prediction_model.predict(batch, verbose=0)
 
         # 3) Décodage CTC (beam search)
         text = decode_beam(preds)[0]
@@ -1,12 +1,162 @@
-import tensorflow as tf
+import threading
+from pathlib import Path
+
+import cv2
+import numpy as np
 
 IMG_WIDTH = 200
 IMG_HEIGHT = 50
 
+# ======================
+# CHAÎNE TENSORFLOW (entraînement / OCRPredictor)
+# ======================
+# Import local : les runtimes sans TensorFlow (ONNX) n'utilisent que la version NumPy
+
 def preprocess_image(img_path):
+    import tensorflow as tf
+
     img = tf.io.read_file(img_path)
-    img = tf.io.decode_png(img, channels=1)
+    # decode_image : PNG et JPEG (même résultat que decode_png pour un PNG)
+    img = tf.io.decode_image(img, channels=1, expand_animations=False)
     img = tf.image.convert_image_dtype(img, tf.float32)
     img = tf.image.resize(img, [IMG_HEIGHT, IMG_WIDTH])
     img = tf.transpose(img, [1, 0, 2])
     return img
+
+def preprocess_array(array):
+    """
+    Même chaîne que preprocess_image pour une image déjà décodée
+    (H, W), (H, W, 3) ou (H, W, 4) uint8.
+    """
+    import tensorflow as tf
+
+    img = tf.convert_to_tensor(array)
+    if img.shape.rank == 2:
+        img = img[..., tf.newaxis]
+    if img.shape[-1] == 4:
+        img = img[..., :3]
+    if img.shape[-1] == 3:
+        img = tf.image.rgb_to_grayscale(img)
+    img = tf.image.convert_image_dtype(img, tf.float32)
+    img = tf.image.resize(img, [IMG_HEIGHT, IMG_WIDTH])
+    img = tf.transpose(img, [1, 0, 2])
+    return img
+
+# ======================
+# CHAÎNE NUMPY / OPENCV (moteur partagé, sans TensorFlow)
+# ======================
+# cv2.IMREAD_GRAYSCALE donne les mêmes niveaux de gris que decode_png(channels=1)
+# et cv2.INTER_LINEAR en float32 suit tf.image.resize (bilinéaire, demi-pixel).
+# Service (Keras, ONNX), benchmark et entraînement passent tous par ici.
+
+def to_gray(array) -> np.ndarray:
+    """
+    Image décodée (H, W) / (H, W, C) -> niveaux de gris (H, W).
+    Les images couleur sont supposées en RGB.
+    """
+    img = np.asarray(array)
+    if img.ndim == 3 and img.shape[-1] == 1:
+        img = img[..., 0]
+    if img.ndim == 3 and img.shape[-1] == 4:
+        img = img[..., :3]
+    if img.ndim == 3:
+        img = cv2.cvtColor(img, cv2.COLOR_RGB2GRAY)
+    return img
+
+def decode_gray(item) -> np.ndarray:
+    """
+    Chemin, octets encodés ou tableau -> image (H, W) en niveaux de gris.
+    """
+    if isinstance(item, (bytes, bytearray, memoryview)):
+        img = cv2.imdecode(np.frombuffer(item, dtype=np.uint8), cv2.IMREAD_GRAYSCALE)
+        if img is None:
+            raise ValueError("Impossible de décoder l'image")
+        return img
+
+    if isinstance(item, (str, Path)):
+        img = cv2.imread(str(item), cv2.IMREAD_GRAYSCALE)
+        if img is None:
+            raise ValueError(f"Impossible de lire l'image : {item}")
+        return img
+
+    return to_gray(item)
+
+def is_preprocessed(item) -> bool:
+    return (
+        isinstance(item, np.ndarray)
+        and item.shape == (IMG_WIDTH, IMG_HEIGHT, 1)
+        and item.dtype == np.float32
+    )
+
+def preprocess_batch_np(items, out=None) -> np.ndarray:
+    """
+    Décodage + gris + resize 200x50 + transposition de tout un batch,
+    écrit dans `out` (B, 200, 50, 1) float32 préalloué (alloué si absent).
+
+    Accepte chemins, octets encodés, images décodées ou tenseurs déjà
+    prétraités (200, 50, 1) float32, copiés tels quels.
+    """
+    n = len(items)
+    if out is None:
+        out = np.empty((n, IMG_WIDTH, IMG_HEIGHT, 1), dtype=np.float32)
+    elif out.shape[0] < n or out.shape[1:] != (IMG_WIDTH, IMG_HEIGHT, 1) or out.dtype != np.float32:
+        raise ValueError(f"Buffer incompatible : {out.shape} {out.dtype}")
+
+    resized = np.empty((IMG_HEIGHT, IMG_WIDTH), dtype=np.float32)
+
+    for i, item in enumerate(items):
+        if is_preprocessed(item):
+            out[i] = item
+            continue
+
+        gray = decode_gray(item)
+        img = gray.astype(np.float32)
+        # Comme convert_image_dtype : seuls les entiers sont ramenés dans [0, 1]
+        if np.issubdtype(gray.dtype, np.integer):
+            img *= 1.0 / np.iinfo(gray.dtype).max
+        cv2.resize(img, (IMG_WIDTH, IMG_HEIGHT), dst=resized, interpolation=cv2.INTER_LINEAR)
+        out[i, :, :, 0] = resized.T
+
+    return out[:n]
+
+class BatchPreprocessor:
+    """
+    preprocess_batch_np avec un buffer réutilisé d'un appel à l'autre
+    (agrandi au besoin). Le résultat est une vue sur ce buffer : il est
+    valide jusqu'à l'appel suivant du même thread. Un buffer par thread :
+    un seul objet peut servir tous les threads d'un service.
+    """
+
+    def __init__(self, capacity: int = 64):
+        self.capacity = capacity
+        self._local = threading.local()
+
+    @property
+    def buffer(self) -> np.ndarray:
+        buffer = getattr(self._local, "buffer", None)
+        if buffer is None:
+            buffer = self._local.buffer = np.empty((self.capacity, IMG_WIDTH, IMG_HEIGHT, 1), dtype=np.float32)
+        return buffer
+
+    def __call__(self, items) -> np.ndarray:
+        buffer = self.buffer
+        if len(items) > buffer.shape[0]:
+            buffer = self._local.buffer = np.empty((len(items), IMG_WIDTH, IMG_HEIGHT, 1), dtype=np.float32)
+        return preprocess_batch_np(items, out=buffer)
+
+def preprocess_item_np(item) -> np.ndarray:
+    """
+    Une image (chemin, octets, tableau) -> tenseur (200, 50, 1) float32
+    dans son propre buffer (ValueError si elle est illisible).
+    """
+    return preprocess_batch_np([item])[0]
+
+def load_image_np(img_path) -> np.ndarray:
+    return preprocess_batch_np([str(img_path)])[0]
+
+def preprocess_array_np(array) -> np.ndarray:
+    """
+    Image décodée (H, W) / (H, W, C) uint8 -> tenseur (200, 50, 1) float32.
+    Les images couleur sont supposées en RGB.
+    """
+    return preprocess_batch_np([to_gray(array)])[0]
@@ -0,0 +1,210 @@
+"""
+Quantification int8 post-entraînement du CRNN exporté en ONNX, avec contrôle de précision.
+
+    python -m ocr.quantize \
+        --model models/ANASTASIIA_JB_THEO_9B2_PLUS_SITE_INFER.onnx \
+        --calib-dir data/finetune_site \
+        --eval-dir data/data_benchmark_unique
+
+Produit deux variantes, publiées uniquement si elles ne régressent pas
+au-delà des seuils par rapport au modèle float :
+- dynamic : poids int8, activations quantifiées à la volée (Conv, MatMul ;
+  LSTM seulement si l'export contient des nœuds ONNX LSTM, sinon la
+  récurrence reste en float)
+- static  : poids et activations int8 (QDQ), échelles calibrées sur les captchas
+"""
+
+import argparse
+import json
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+import onnxruntime as ort
+from onnxruntime.quantization import (
+    CalibrationDataReader,
+    CalibrationMethod,
+    QuantFormat,
+    QuantType,
+    quant_pre_process,
+    quantize_dynamic,
+    quantize_static,
+)
+
+from ocr.ctc_decoding import greedy_decode_text
+from ocr.dataset import load_labelled
+from ocr.metrics import compute_metrics
+from ocr.preprocess import preprocess_batch_np
+
+VARIANTS = ("dynamic", "static")
+
+
+# ======================
+# CALIBRATION
+# ======================
+class CaptchaCalibrationReader(CalibrationDataReader):
+    """
+    Fournit à ONNX Runtime des batchs prétraités de captchas labellisés.
+    """
+
+    def __init__(self, input_name: str, image_paths: list, batch_size: int = 16):
+        self.input_name = input_name
+        self.batches = [
+            image_paths[i:i + batch_size]
+            for i in range(0, len(image_paths), batch_size)
+        ]
+        self._iter = iter(self.batches)
+
+    def get_next(self):
+        paths = next(self._iter, None)
+        if paths is None:
+            return None
+        return {self.input_name: preprocess_batch_np(paths)}
+
+    def rewind(self):
+        self._iter = iter(self.batches)
+
+
+# ======================
+# ÉVALUATION
+# ======================
+def evaluate(model_path: str, image_paths: list, labels: list, batch_size: int = 64) -> dict:
+    session = ort.InferenceSession(model_path, providers=["CPUExecutionProvider"])
+    input_name = session.get_inputs()[0].name
+
+    preds = []
+    for i in range(0, len(image_paths), batch_size):
+        batch = preprocess_batch_np(image_paths[i:i + batch_size])
+        probs = session.run(None, {input_name: batch})[0]
+        preds.extend(text.lower() for text in greedy_decode_text(probs))
+
+    exact, cer = compute_metrics(preds, labels)
+    return {
+        "exact_match": round(exact, 4),
+        "cer": round(cer, 4),
+        "size_mb": round(Path(model_path).stat().st_size / 2**20, 2),
+    }
+
+
+# ======================
+# QUANTIFICATION
+# ======================
+def quantize_variant(variant: str, model_path: str, output_path: str, calib_paths: list):
+    with tempfile.TemporaryDirectory() as tmp:
+        # Inférence de formes + fusions avant quantification
+        prepared = str(Path(tmp) / "prepared.onnx")
+        quant_pre_process(model_path, prepared)
+
+        if variant == "dynamic":
+            quantize_dynamic(
+                prepared,
+                output_path,
+                weight_type=QuantType.QInt8,
+            )
+            return
+
+        input_name = ort.InferenceSession(
+            prepared, providers=["CPUExecutionProvider"]
+        ).get_inputs()[0].name
+
+        quantize_static(
+            prepared,
+            output_path,
+            CaptchaCalibrationReader(input_name, calib_paths),
+            quant_format=QuantFormat.QDQ,
+            activation_type=QuantType.QInt8,
+            weight_type=QuantType.QInt8,
+            per_channel=True,
+            calibrate_method=CalibrationMethod.MinMax,
+        )
+
+
+def passes_gate(reference: dict, candidate: dict, max_exact_drop: float, max_cer_increase: float) -> bool:
+    return (
+        reference["exact_match"] - candidate["exact_match"] <= max_exact_drop
+        and candidate["cer"] - reference["cer"] <= max_cer_increase
+    )
+
+
+def variant_path(model_path: str, variant: str) -> Path:
+    path = Path(model_path)
+    return path.with_name(f"{path.stem}_INT8_{variant.upper()}{path.suffix}")
+
+
+def run(model_path, calib_paths, eval_paths, eval_labels, variants=VARIANTS,
+        max_exact_drop=0.01, max_cer_increase=0.005, output_dir=None) -> dict:
+    reference = evaluate(model_path, eval_paths, eval_labels)
+    report = {"float": reference, "variants": {}}
+
+    for variant in variants:
+        final_path = variant_path(model_path, variant)
+        if output_dir:
+            final_path = Path(output_dir) / final_path.name
+
+        with tempfile.TemporaryDirectory() as tmp:
+            candidate_path = str(Path(tmp) / final_path.name)
+            quantize_variant(variant, model_path, candidate_path, calib_paths)
+
+            metrics = evaluate(candidate_path, eval_paths, eval_labels)
+            published = passes_gate(reference, metrics, max_exact_drop, max_cer_increase)
+
+            if published:
+                final_path.parent.mkdir(parents=True, exist_ok=True)
+                shutil.move(candidate_path, final_path)
+            else:
+                # Une variante publiée par un run précédent ne doit plus être servie
+                final_path.unlink(missing_ok=True)
+
+        report["variants"][variant] = {
+            **metrics,
+            "path": str(final_path),
+            "published": published,
+        }
+
+        status = "PUBLISHED" if published else "REJECTED (accuracy regression)"
+        print(f"[{variant}] exact={metrics['exact_match']:.4f} cer={metrics['cer']:.4f} -> {status}")
+
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Quantification int8 du modèle CTC ONNX")
+    parser.add_argument("--model", required=True, help="Modèle float .onnx (python -m ocr.export)")
+    parser.add_argument("--calib-dir", required=True, help="Captchas labellisés pour la calibration")
+    parser.add_argument("--eval-dir", required=True, help="Captchas labellisés pour l'évaluation")
+    parser.add_argument("--calib-limit", type=int, default=512)
+    parser.add_argument("--eval-limit", type=int, default=None)
+    parser.add_argument("--variants", nargs="+", choices=VARIANTS, default=list(VARIANTS))
+    parser.add_argument("--max-exact-drop", type=float, default=0.01, help="Perte max d'exact match")
+    parser.add_argument("--max-cer-increase", type=float, default=0.005, help="Hausse max du CER")
+    parser.add_argument("--output-dir", default=None, help="Par défaut : à côté du modèle float")
+    parser.add_argument("--report", default=None, help="Rapport JSON (défaut : <model>_quantization.json)")
+    args = parser.parse_args(argv)
+
+    calib_paths, _ = load_labelled(args.calib_dir, args.calib_limit)
+    eval_paths, eval_labels = load_labelled(args.eval_dir, args.eval_limit)
+
+    report = run(
+        args.model,
+        calib_paths,
+        eval_paths,
+        eval_labels,
+        variants=args.variants,
+        max_exact_drop=args.max_exact_drop,
+        max_cer_increase=args.max_cer_increase,
+        output_dir=args.output_dir,
+    )
+
+    report_path = args.report or str(Path(args.model).with_suffix("")) + "_quantization.json"
+    with open(report_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+    print(json.dumps(report, indent=2))
+    print(f"Report saved to {report_path}")
+
+    return 0 if all(v["published"] for v in report["variants"].values()) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
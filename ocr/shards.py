@@ -0,0 +1,284 @@
+"""
+Format de dataset en shards memory-mappés.
+
+    python -m ocr.shards --data-dir data/finetune_site --output data/shards/finetune_site
+
+Un dossier de milliers de petits PNG (label = nom du fichier) est
+décodé une seule fois et écrit en shards de taille fixe :
+
+    index.json                  métadonnées + liste des shards
+    shard_00000_images.npy      (N, 200, 50, 1) float32, déjà prétraité
+    shard_00000_labels.npy      (N, L) int32, indices de caractères complétés par -1
+    shard_00000_raw.bin         images encodées d'origine, bout à bout
+    shard_00000_offsets.npy     (N + 1,) int64, bornes de chaque image dans raw.bin
+
+ShardedDataset relit ces fichiers en np.load(mmap_mode="r") : les
+tranches d'un même shard sont des vues sur le fichier, sans copie.
+L'entraînement lit les tenseurs prétraités ; le benchmark et la
+calibration lisent les octets d'origine (tous les modèles les acceptent).
+"""
+
+import argparse
+import json
+import mmap
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+from ocr.charset import characters
+from ocr.dataset import load_labelled_folder
+from ocr.preprocess import IMG_HEIGHT, IMG_WIDTH, preprocess_batch_np
+
+INDEX_FILE = "index.json"
+FORMAT_VERSION = 1
+
+
+def is_shard_dir(path) -> bool:
+    return (Path(path) / INDEX_FILE).is_file()
+
+
+def encode_labels(labels: list, length: int) -> np.ndarray:
+    encoded = np.full((len(labels), length), -1, dtype=np.int32)
+    for i, label in enumerate(labels):
+        encoded[i, :len(label)] = [characters.index(char) for char in label]
+    return encoded
+
+
+def decode_labels(encoded: np.ndarray) -> list:
+    return ["".join(characters[c] for c in row if c >= 0) for row in encoded]
+
+
+# ======================
+# ÉCRITURE
+# ======================
+class ShardWriter:
+    """
+    Écriture en flux : `add` accumule des images encodées (octets) et leurs
+    labels, chaque shard plein est écrit aussitôt ; `close` écrit l'index.
+
+    `label_length` : longueur max des labels, fixée d'avance (les labels
+    d'un shard sont un tableau (N, label_length)).
+    Le prétraitement (OpenCV, sans GIL) est réparti sur `workers` threads
+    et écrit directement dans le fichier memory-mappé du shard.
+    """
+
+    def __init__(self, output_dir, label_length: int, shard_size: int = 4096,
+                 chunk_size: int = 256, workers: int = 4):
+        self.output_dir = Path(output_dir)
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.label_length = label_length
+        self.shard_size = shard_size
+        self.chunk_size = chunk_size
+
+        self.pool = ThreadPoolExecutor(max_workers=workers)
+        self.shards = []
+        self.count = 0
+        self._raw, self._labels = [], []
+
+    def add(self, raw_images: list, labels: list):
+        for label in labels:
+            invalid = sorted(set(label) - set(characters))
+            if invalid:
+                raise ValueError(f"Characters outside the alphabet: {''.join(invalid)}")
+            if len(label) > self.label_length:
+                raise ValueError(f"Label longer than {self.label_length}: {label}")
+
+        self._raw.extend(raw_images)
+        self._labels.extend(labels)
+        while len(self._raw) >= self.shard_size:
+            self._write_shard(self._raw[:self.shard_size], self._labels[:self.shard_size])
+            del self._raw[:self.shard_size], self._labels[:self.shard_size]
+
+    def _write_shard(self, raw_images: list, labels: list):
+        name = f"shard_{len(self.shards):05d}"
+
+        images = np.lib.format.open_memmap(
+            self.output_dir / f"{name}_images.npy",
+            mode="w+",
+            dtype=np.float32,
+            shape=(len(raw_images), IMG_WIDTH, IMG_HEIGHT, 1)
+        )
+        # Chaque thread remplit sa tranche du memmap (pas de copie intermédiaire)
+        step = self.chunk_size
+        list(self.pool.map(
+            lambda i: preprocess_batch_np(raw_images[i:i + step], out=images[i:i + step]),
+            range(0, len(raw_images), step)
+        ))
+        images.flush()
+        del images
+
+        np.save(self.output_dir / f"{name}_labels.npy", encode_labels(labels, self.label_length))
+
+        offsets = [0]
+        with open(self.output_dir / f"{name}_raw.bin", "wb") as f:
+            for data in raw_images:
+                offsets.append(offsets[-1] + f.write(data))
+        np.save(self.output_dir / f"{name}_offsets.npy", np.array(offsets, dtype=np.int64))
+
+        self.shards.append({"name": name, "count": len(raw_images)})
+        self.count += len(raw_images)
+        print(f"{name}: {len(raw_images)} images")
+
+    def close(self) -> dict:
+        if self._raw:
+            self._write_shard(self._raw, self._labels)
+            self._raw, self._labels = [], []
+        self.pool.shutdown()
+
+        index = {
+            "version": FORMAT_VERSION,
+            "count": self.count,
+            "image_shape": [IMG_WIDTH, IMG_HEIGHT, 1],
+            "dtype": "float32",
+            "label_length": self.label_length,
+            "characters": "".join(characters),
+            "shards": self.shards,
+        }
+        with open(self.output_dir / INDEX_FILE, "w", encoding="utf-8") as f:
+            json.dump(index, f, indent=2)
+
+        return index
+
+
+def pack(image_paths: list, labels: list, output_dir, shard_size: int = 4096,
+         chunk_size: int = 256, workers: int = 4) -> dict:
+    """
+    Écrit un dossier d'images labellisées en shards de `shard_size` images.
+    """
+    writer = ShardWriter(
+        output_dir,
+        label_length=max((len(label) for label in labels), default=0),
+        shard_size=shard_size,
+        chunk_size=chunk_size,
+        workers=workers
+    )
+    for start in range(0, len(image_paths), shard_size):
+        batch = image_paths[start:start + shard_size]
+        writer.add([Path(path).read_bytes() for path in batch], labels[start:start + shard_size])
+    return writer.close()
+
+
+# ======================
+# LECTURE
+# ======================
+class ShardedDataset:
+    """
+    Lecture d'un dossier écrit par `pack`.
+
+    - images(start, stop) : tenseurs prétraités, vue sans copie si la
+      tranche tient dans un shard
+    - raw(i) : octets encodés d'origine (memoryview sur le fichier)
+    - blocks(block_size) : (images, labels) par blocs contigus, pour
+      l'entraînement ; l'ordre des blocs peut être mélangé
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        with open(self.path / INDEX_FILE, encoding="utf-8") as f:
+            self.index = json.load(f)
+
+        if self.index["characters"] != "".join(characters):
+            raise ValueError(f"{path} was packed with another alphabet")
+
+        self._images, self._labels, self._offsets, self._raw = [], [], [], []
+        for shard in self.index["shards"]:
+            name = self.path / shard["name"]
+            self._images.append(np.load(f"{name}_images.npy", mmap_mode="r"))
+            self._labels.append(np.load(f"{name}_labels.npy", mmap_mode="r"))
+            self._offsets.append(np.load(f"{name}_offsets.npy", mmap_mode="r"))
+            self._raw.append(self._map_raw(f"{name}_raw.bin"))
+
+        # Début de chaque shard dans la numérotation globale
+        self._starts = np.cumsum([0] + [shard["count"] for shard in self.index["shards"]])
+        self._texts = None
+
+    @staticmethod
+    def _map_raw(path):
+        with open(path, "rb") as f:
+            if f.seek(0, 2) == 0:
+                return memoryview(b"")
+            return memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+    def __len__(self) -> int:
+        return int(self._starts[-1])
+
+    def _locate(self, i: int):
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        shard = int(np.searchsorted(self._starts, i, side="right")) - 1
+        return shard, i - int(self._starts[shard])
+
+    @property
+    def labels(self) -> list:
+        if self._texts is None:
+            self._texts = [text for encoded in self._labels for text in decode_labels(encoded)]
+        return self._texts
+
+    def images(self, start: int = 0, stop: int = None) -> np.ndarray:
+        stop = len(self) if stop is None else min(stop, len(self))
+        if start >= stop:
+            return np.empty((0, IMG_WIDTH, IMG_HEIGHT, 1), dtype=np.float32)
+
+        first, local_start = self._locate(start)
+        last, local_stop = self._locate(stop - 1)
+        if first == last:
+            return self._images[first][local_start:local_stop + 1]
+
+        # Tranche à cheval sur plusieurs shards : seule copie du format
+        parts = [self._images[first][local_start:]]
+        parts += [self._images[s] for s in range(first + 1, last)]
+        parts.append(self._images[last][:local_stop + 1])
+        return np.concatenate(parts)
+
+    def raw(self, i: int) -> memoryview:
+        shard, local = self._locate(i)
+        offsets = self._offsets[shard]
+        return self._raw[shard][int(offsets[local]):int(offsets[local + 1])]
+
+    def raw_images(self, limit: int = None) -> list:
+        return [self.raw(i) for i in range(min(len(self), limit or len(self)))]
+
+    def blocks(self, block_size: int = 256, shuffle: bool = False, seed: int = None):
+        spans = [
+            (shard, start)
+            for shard, images in enumerate(self._images)
+            for start in range(0, len(images), block_size)
+        ]
+        if shuffle:
+            np.random.default_rng(seed).shuffle(spans)
+
+        for shard, start in spans:
+            yield (
+                self._images[shard][start:start + block_size],
+                self._labels[shard][start:start + block_size],
+            )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pack d'un dossier de captchas en shards memory-mappés")
+    parser.add_argument("--data-dir", required=True, nargs="+", help="Captchas labellisés par leur nom de fichier")
+    parser.add_argument("--output", required=True)
+    parser.add_argument("--shard-size", type=int, default=4096)
+    parser.add_argument("--limit", type=int, default=None, help="Images max par dossier")
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args(argv)
+
+    paths, labels = [], []
+    for folder in args.data_dir:
+        folder_paths, folder_labels = load_labelled_folder(folder, args.limit)
+        paths += folder_paths
+        labels += folder_labels
+
+    if not paths:
+        print(f"No images found in {args.data_dir}")
+        return 1
+
+    index = pack(paths, labels, args.output, shard_size=args.shard_size, workers=args.workers)
+    print(f"{index['count']} images in {len(index['shards'])} shards written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
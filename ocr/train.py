@@ -0,0 +1,556 @@
+"""
+Entraînement du modèle CTC (ocr/model.py) hors notebook.
+
+    python -m ocr.train --data-dir data/data_OCR_Captcha --epochs 30
+    python -m ocr.train --data-dir data/finetune_site --init models/ocr_ctc_train.keras --lr 1e-4
+    python -m ocr.train --data-dir data/shards/train --val-dir data/shards/val
+    python -m ocr.train --synthetic-steps 1000 --val-dir data/finetune_site
+    python -m ocr.train --data-dir data/shards/train --mixed-precision bf16 --local-workers 4
+
+Pipeline d'entrée tf.data en flux :
+lecture + décodage parallèles (preprocess_image, la chaîne de référence),
+encodage des labels par char_to_num, cache des tenseurs décodés sur
+disque (--cache-dir), shuffle par buffer, batch puis prefetch, le tout
+en AUTOTUNE. Après la première epoch les images ne sont plus relues :
+une epoch CPU est bornée par le calcul, pas par les E/S.
+
+Un dossier de shards (python -m ocr.shards) est lu directement, sans
+décodage ni cache. --synthetic-steps génère les captchas à la volée
+(SyntheticCaptchaSource), sans aller-retour par le disque.
+
+Entraînement CPU multi-cœurs / multi-hôtes : --strategy multi-worker
+(MultiWorkerMirroredStrategy, un processus par worker, cluster décrit par
+TF_CONFIG) ; --local-workers N lance N workers sur la machine.
+--mixed-precision bf16 calcule en bfloat16 (AVX512-BF16 / AMX), poids,
+softmax et perte CTC restant en float32.
+"""
+
+import argparse
+import hashlib
+import itertools
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import tensorflow as tf
+import keras
+
+from ocr.augment import SITE_PRESET, BatchAugmenter
+from ocr.charset import characters
+from ocr.ctc_decoding import greedy_decode_text
+from ocr.ctc_layer import CTCLayer
+from ocr.dataset import load_labelled_folder
+from ocr.metrics import compute_metrics
+from ocr.model import IMG_HEIGHT, IMG_WIDTH, build_infer_model, build_ocr_model
+from ocr.preprocess import preprocess_image
+from ocr.shards import ShardedDataset, is_shard_dir
+
+AUTOTUNE = tf.data.AUTOTUNE
+SEED = 42
+
+
+# ======================
+# PIPELINE D'ENTRÉE
+# ======================
+def encode_label(label):
+    # "ab12" -> [10, 11, 1, 2] (StringLookup dans le graphe, sans passage Python).
+    # Import tardif : créer la couche initialise TensorFlow, ce qui doit
+    # attendre la création de la stratégie multi-worker.
+    from ocr.vocab import char_to_num
+    return tf.cast(char_to_num(tf.strings.unicode_split(label, "UTF-8")), tf.int32)
+
+
+def _decode_example(path, label):
+    return {"image": preprocess_image(path), "label": encode_label(label)}
+
+
+def _cache_file(cache_dir, name: str, paths) -> str:
+    # Un cache par liste de fichiers : un dossier modifié n'en réutilise pas un ancien
+    digest = hashlib.blake2b("\n".join(paths).encode(), digest_size=8).hexdigest()
+    cache_dir = Path(cache_dir)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    return str(cache_dir / f"{name}_{digest}")
+
+
+def build_dataset(paths, labels, batch_size: int = 32, training: bool = False,
+                  cache_dir=None, name: str = "train", shuffle_buffer: int = 4096,
+                  augment=None, seed: int = SEED):
+    """
+    tf.data.Dataset de batches {"image": (B, 200, 50, 1), "label": (B, L)}
+    (labels complétés par -1, ignorés par CTCLayer).
+
+    `augment` : BatchAugmenter (ocr.augment) appliqué par batch après le
+    cache, donc différent à chaque epoch.
+    """
+    paths = [str(p) for p in paths]
+
+    ds = tf.data.Dataset.from_tensor_slices((paths, list(labels)))
+    ds = ds.map(_decode_example, num_parallel_calls=AUTOTUNE, deterministic=not training)
+
+    # Cache des tenseurs décodés (fichier local, sinon mémoire), rempli
+    # par la première epoch complète : tf.data jette un cache incomplet
+    cache_file = _cache_file(cache_dir, name, paths) if cache_dir else ""
+    ds = ds.cache(cache_file)
+
+    return _shuffle_batch(ds, len(paths), batch_size, training, shuffle_buffer, augment, seed)
+
+
+def build_shard_dataset(shards, batch_size: int = 32, training: bool = False,
+                        shuffle_buffer: int = 4096, augment=None, seed: int = SEED,
+                        block_size: int = 256):
+    """
+    Même dataset que build_dataset, lu dans un ShardedDataset (ocr.shards) :
+    blocs contigus des fichiers memory-mappés, sans décodage ni cache.
+    En entraînement l'ordre des blocs change à chaque epoch, le buffer de
+    shuffle mélange ensuite les images.
+    """
+    epochs = itertools.count(seed)
+    signature = (
+        tf.TensorSpec((None, IMG_WIDTH, IMG_HEIGHT, 1), tf.float32),
+        tf.TensorSpec((None, shards.index["label_length"]), tf.int32),
+    )
+
+    ds = tf.data.Dataset.from_generator(
+        lambda: shards.blocks(block_size, shuffle=training, seed=next(epochs)),
+        output_signature=signature
+    )
+    ds = ds.unbatch().apply(tf.data.experimental.assert_cardinality(len(shards)))
+    ds = ds.map(lambda image, label: {"image": image, "label": label})
+
+    return _shuffle_batch(ds, len(shards), batch_size, training, shuffle_buffer, augment, seed)
+
+
+def build_synthetic_dataset(source, batch_size: int = 32, augment=None, seed: int = SEED):
+    """
+    Dataset infini sur un SyntheticCaptchaSource (mode "ctc") : les
+    captchas sont générés à la volée par ses processus, sans écriture
+    disque. À utiliser avec `steps_per_epoch`.
+    """
+    from ocr.shards import encode_labels
+
+    signature = (
+        tf.TensorSpec((None, IMG_WIDTH, IMG_HEIGHT, 1), tf.float32),
+        tf.TensorSpec((None, source.max_length), tf.int32),
+    )
+
+    ds = tf.data.Dataset.from_generator(
+        lambda: ((images, encode_labels(texts, source.max_length)) for images, texts in source),
+        output_signature=signature
+    )
+    ds = ds.unbatch().map(lambda image, label: {"image": image, "label": label})
+
+    # Flux déjà aléatoire : petit buffer, seulement pour mélanger les workers
+    ds = _shuffle_batch(ds, source.batch_size * 4, batch_size, True, source.batch_size * 4, augment, seed)
+
+    # En multi-worker chaque worker a sa propre source (seed différente) :
+    # pas de partage d'un même flux entre workers
+    options = tf.data.Options()
+    options.experimental_distribute.auto_shard_policy = tf.data.experimental.AutoShardPolicy.OFF
+    return ds.with_options(options)
+
+
+def _shuffle_batch(ds, size, batch_size, training, shuffle_buffer, augment, seed):
+    if training:
+        ds = ds.shuffle(min(size, shuffle_buffer), seed=seed, reshuffle_each_iteration=True)
+
+    ds = ds.padded_batch(
+        batch_size,
+        padded_shapes={"image": [IMG_WIDTH, IMG_HEIGHT, 1], "label": [None]},
+        padding_values={"image": 0.0, "label": -1},
+        drop_remainder=training
+    )
+
+    # Augmentation vectorisée sur le batch entier (une op par transformation)
+    if augment is not None:
+        ds = augment.apply(ds)
+
+    options = tf.data.Options()
+    options.autotune.enabled = True
+    options.deterministic = not training
+    return ds.with_options(options).prefetch(AUTOTUNE)
+
+
+def split_paths(paths, labels, val_frac: float = 0.1, seed: int = SEED):
+    idx = np.random.default_rng(seed).permutation(len(paths))
+    n_val = int(len(paths) * val_frac)
+    val, train = idx[:n_val], idx[n_val:]
+    pick = lambda items, rows: [items[i] for i in rows]
+    return pick(paths, train), pick(labels, train), pick(paths, val), pick(labels, val)
+
+
+# ======================
+# MÉTRIQUES PAR EPOCH
+# ======================
+class EvalCallback(keras.callbacks.Callback):
+    """
+    CER et exact match sur la validation à la fin de chaque epoch
+    (même décodage greedy que le service).
+    """
+
+    def __init__(self, infer_model, dataset, batches: int = 20):
+        super().__init__()
+        self.infer_model = infer_model
+        self.dataset = dataset
+        self.batches = batches
+
+    def on_epoch_end(self, epoch, logs=None):
+        preds, labels = [], []
+        for batch in self.dataset.take(self.batches):
+            probs = self.infer_model(batch["image"], training=False)
+            preds.extend(greedy_decode_text(np.asarray(probs)))
+            labels.extend(
+                "".join(characters[c] for c in row if c >= 0)
+                for row in batch["label"].numpy()
+            )
+
+        exact, cer = compute_metrics(preds, labels)
+        if logs is not None:
+            logs["val_exact_match"] = exact
+            logs["val_cer"] = cer
+        print(f"[VAL] Epoch {epoch + 1} — CER={cer:.4f} | Exact={exact:.4f}")
+
+
+# ======================
+# PRÉCISION ET DISTRIBUTION
+# ======================
+def cpu_supports_bf16() -> bool:
+    # Sans AVX512-BF16 ni AMX, le bfloat16 est émulé (plus lent que float32)
+    try:
+        flags = Path("/proc/cpuinfo").read_text()
+    except OSError:
+        return False
+    return "avx512_bf16" in flags or "amx_bf16" in flags
+
+
+def set_mixed_precision(enabled: bool):
+    """
+    mixed_bfloat16 : calculs en bfloat16, poids en float32. La softmax et
+    CTCLayer restent en float32 (ocr/model.py). Pas de loss scaling : le
+    bfloat16 a la même plage d'exposant que le float32.
+    """
+    keras.mixed_precision.set_global_policy("mixed_bfloat16" if enabled else "float32")
+
+
+def make_strategy(name: str = "default"):
+    """
+    - default : un seul processus
+    - multi-worker : MultiWorkerMirroredStrategy, un réplica par processus,
+      cluster décrit par TF_CONFIG (plusieurs hôtes, ou --local-workers)
+
+    À appeler avant toute opération TensorFlow.
+    """
+    if name == "multi-worker":
+        communication = tf.distribute.experimental.CommunicationOptions(
+            implementation=tf.distribute.experimental.CommunicationImplementation.RING
+        )
+        return tf.distribute.MultiWorkerMirroredStrategy(communication_options=communication)
+    return tf.distribute.get_strategy()
+
+
+def is_chief(strategy) -> bool:
+    resolver = getattr(strategy, "cluster_resolver", None)
+    if resolver is None or not resolver.task_type:
+        return True
+    return resolver.task_type == "chief" or (resolver.task_type == "worker" and resolver.task_id == 0)
+
+
+def _worker_path(path: str, strategy, scratch_dir: str) -> str:
+    # Tous les workers sauvegardent (collectifs), seul le chef dans `path`,
+    # les autres dans `scratch_dir` (supprimé en fin d'entraînement)
+    if is_chief(strategy):
+        return path
+    return str(Path(scratch_dir) / Path(path).name)
+
+
+def launch_local_workers(workers: int, argv: list) -> int:
+    """
+    Lance `workers` processus `ocr.train --strategy multi-worker` sur cette
+    machine (TF_CONFIG sur localhost), les cœurs répartis entre eux.
+    """
+    ports = []
+    for _ in range(workers):
+        with socket.socket() as s:
+            s.bind(("localhost", 0))
+            ports.append(s.getsockname()[1])
+    cluster = {"worker": [f"localhost:{port}" for port in ports]}
+    threads = max(1, (os.cpu_count() or 1) // workers)
+
+    processes = []
+    for index in range(workers):
+        env = {
+            **os.environ,
+            "TF_CONFIG": json.dumps({"cluster": cluster, "task": {"type": "worker", "index": index}}),
+            "TF_NUM_INTRAOP_THREADS": str(threads),
+            "TF_NUM_INTEROP_THREADS": "2",
+        }
+        processes.append(subprocess.Popen(
+            [sys.executable, "-m", "ocr.train", *argv, "--strategy", "multi-worker"], env=env
+        ))
+    return max(process.wait() for process in processes)
+
+
+# ======================
+# ENTRAÎNEMENT
+# ======================
+def _distributed_fit(model, train_ds, val_ds, epochs, steps_per_epoch, callbacks, strategy):
+    """
+    model.fit pour plusieurs réplicas. Keras 3 ne sait pas distribuer un
+    batch dict {"image", "label"} (strategy.reduce sur une structure
+    imbriquée) : même boucle, avec le train_step / test_step de Keras
+    exécutés par strategy.run. Gradients sommés entre réplicas, perte
+    normalisée sur le batch global par CTCLayer.
+    """
+    with strategy.scope():
+        model.optimizer.build(model.trainable_variables)
+
+    @tf.function
+    def train_step(batch):
+        logs = strategy.run(model.train_step, args=(batch,))
+        return strategy.experimental_local_results(logs)[0]
+
+    @tf.function
+    def test_step(batch):
+        strategy.run(model.test_step, args=(batch,))
+
+    train_dist = strategy.experimental_distribute_dataset(train_ds)
+    val_dist = strategy.experimental_distribute_dataset(val_ds) if val_ds is not None else None
+    iterator = iter(train_dist) if steps_per_epoch else None
+
+    callbacks = keras.callbacks.CallbackList(
+        callbacks, add_history=True, add_progbar=True, model=model, verbose=1, epochs=epochs, steps=steps_per_epoch
+    )
+    logs = {}
+    callbacks.on_train_begin()
+    for epoch in range(epochs):
+        model.reset_metrics()
+        callbacks.on_epoch_begin(epoch)
+
+        batches = itertools.islice(iterator, steps_per_epoch) if steps_per_epoch else train_dist
+        for step, batch in enumerate(batches):
+            callbacks.on_train_batch_begin(step)
+            callbacks.on_train_batch_end(step, train_step(batch))
+
+        # Métriques agrégées sur tous les réplicas
+        logs = dict(model.get_metrics_result())
+        if val_dist is not None:
+            model.reset_metrics()
+            for batch in val_dist:
+                test_step(batch)
+            logs.update({f"val_{name}": value for name, value in model.get_metrics_result().items()})
+
+        callbacks.on_epoch_end(epoch, logs)
+    callbacks.on_train_end(logs)
+    return model.history
+
+
+def _float32_infer_model(model):
+    # Copie float32 du modèle d'inférence : le service et ocr.export ne
+    # chargent pas de couches bfloat16
+    policy = keras.mixed_precision.global_policy()
+    keras.mixed_precision.set_global_policy("float32")
+    try:
+        export = build_infer_model(build_ocr_model())
+    finally:
+        keras.mixed_precision.set_global_policy(policy)
+    export.set_weights(build_infer_model(model).get_weights())
+    return export
+
+
+def train(train_ds, val_ds=None, epochs: int = 30, lr: float = 1e-3, init=None,
+          output: str = "models/ocr_ctc.keras", checkpoint: str = None, steps_per_epoch: int = None,
+          strategy=None):
+    """
+    Entraîne (ou reprend `init`) et écrit le modèle d'inférence dans `output`,
+    au format chargé par OCRService / ocr.export.
+
+    `strategy` : tf.distribute (make_strategy) ; les batches des datasets
+    sont alors des batches globaux, répartis entre les réplicas.
+    """
+    strategy = strategy or tf.distribute.get_strategy()
+    mixed = keras.mixed_precision.global_policy().name != "float32"
+
+    with strategy.scope():
+        if init and mixed:
+            # load_model garderait les couches float32 du checkpoint
+            model = build_ocr_model()
+            model.load_weights(init)
+        elif init:
+            model = keras.models.load_model(init, custom_objects={"CTCLayer": CTCLayer}, compile=False)
+        else:
+            model = build_ocr_model()
+        model.compile(optimizer=keras.optimizers.Adam(lr))
+
+        infer_model = build_infer_model(model)
+
+    Path(output).parent.mkdir(parents=True, exist_ok=True)
+    checkpoint = checkpoint or str(Path(output).with_name(Path(output).stem + "_train.keras"))
+
+    # Sorties des workers non-chefs : un seul dossier temporaire par entraînement
+    with tempfile.TemporaryDirectory(prefix="ocr_worker_") as scratch:
+        callbacks = [
+            keras.callbacks.ModelCheckpoint(
+                _worker_path(checkpoint, strategy, scratch),
+                monitor="val_loss" if val_ds is not None else "loss",
+                save_best_only=True
+            ),
+            keras.callbacks.CSVLogger(_worker_path(str(Path(output).with_suffix(".csv")), strategy, scratch)),
+        ]
+        if val_ds is not None:
+            callbacks.insert(0, EvalCallback(infer_model, val_ds))
+
+        if strategy.num_replicas_in_sync > 1:
+            history = _distributed_fit(model, train_ds, val_ds, epochs, steps_per_epoch, callbacks, strategy)
+        else:
+            history = model.fit(
+                train_ds,
+                validation_data=val_ds,
+                epochs=epochs,
+                steps_per_epoch=steps_per_epoch,
+                callbacks=callbacks
+            )
+
+        if mixed:
+            infer_model = _float32_infer_model(model)
+        infer_model.save(_worker_path(output, strategy, scratch))
+
+    if is_chief(strategy):
+        print(f"Inference model saved to {output} (training checkpoint: {checkpoint})")
+    return history
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Entraînement du modèle OCR CTC")
+    parser.add_argument("--data-dir", nargs="+", default=[], help="Captchas labellisés par leur nom de fichier, ou un dossier de shards")
+    parser.add_argument("--synthetic-steps", type=int, default=None,
+                        help="Captchas synthétiques générés à la volée, N batches par epoch (remplace --data-dir)")
+    parser.add_argument("--synthetic-workers", type=int, default=2)
+    parser.add_argument("--synthetic-fonts", nargs="+", default=None, help="Polices .ttf des captchas synthétiques")
+    parser.add_argument("--synthetic-length", nargs=2, type=int, default=[6, 6], metavar=("MIN", "MAX"))
+    parser.add_argument("--val-dir", default=None, help="Validation séparée, dossier ou shards (sinon --val-frac des images)")
+    parser.add_argument("--val-frac", type=float, default=0.1)
+    parser.add_argument("--limit", type=int, default=None, help="Images max par dossier")
+    parser.add_argument("--epochs", type=int, default=30)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--lr", type=float, default=1e-3)
+    parser.add_argument("--init", default=None, help="Modèle d'entraînement à reprendre (fine-tuning)")
+    parser.add_argument("--cache-dir", default=".cache/tfdata", help="Cache des images décodées ('' : en mémoire)")
+    parser.add_argument("--shuffle-buffer", type=int, default=4096)
+    parser.add_argument("--augment", choices=("none", "site"), default="none",
+                        help="Augmentation par batch des images d'entraînement (site : proche de aug_site_strong)")
+    parser.add_argument("--seed", type=int, default=SEED)
+    parser.add_argument("--output", default="models/ocr_ctc.keras")
+    parser.add_argument("--mixed-precision", choices=("none", "bf16"), default="none",
+                        help="Calculs en bfloat16 (CPU avec AVX512-BF16 ou AMX)")
+    parser.add_argument("--strategy", choices=("default", "multi-worker"), default="default",
+                        help="multi-worker : cluster décrit par TF_CONFIG")
+    parser.add_argument("--local-workers", type=int, default=None,
+                        help="Lance N workers multi-worker sur cette machine")
+    argv = sys.argv[1:] if argv is None else list(argv)
+    args = parser.parse_args(argv)
+
+    if args.local_workers:
+        # Chaque worker relance ocr.train avec les mêmes options, sans --local-workers
+        if "--local-workers" in argv:
+            i = argv.index("--local-workers")
+            argv = argv[:i] + argv[i + 2:]
+        argv = [arg for arg in argv if not arg.startswith("--local-workers=")]
+        return launch_local_workers(args.local_workers, argv)
+
+    # Avant toute opération TensorFlow
+    strategy = make_strategy(args.strategy)
+    replicas = strategy.num_replicas_in_sync
+    if args.mixed_precision == "bf16":
+        if not cpu_supports_bf16():
+            print("Warning: no native bfloat16 on this CPU (AVX512-BF16 / AMX), training may be slower")
+        set_mixed_precision(True)
+
+    # --batch-size par réplica
+    batch_size = args.batch_size * replicas
+    # Un cache tf.data et une source synthétique par worker
+    task_id = getattr(getattr(strategy, "cluster_resolver", None), "task_id", None) or 0
+    suffix = f"_worker{task_id}" if replicas > 1 else ""
+
+    cache_dir = args.cache_dir or None
+    val_paths, val_labels = [], []
+
+    if not args.data_dir and not args.synthetic_steps:
+        parser.error("--data-dir or --synthetic-steps is required")
+
+    augment = BatchAugmenter(seed=args.seed, **SITE_PRESET) if args.augment == "site" else None
+
+    source = None
+    if args.synthetic_steps:
+        from webscraping_captcha.scraping_finetunning_benchmarking.synthetic_source import SyntheticCaptchaSource
+
+        source = SyntheticCaptchaSource(
+            batch_size=256,
+            workers=args.synthetic_workers,
+            seed=args.seed + task_id,
+            fonts=args.synthetic_fonts,
+            length=tuple(args.synthetic_length)
+        )
+        n_train = args.synthetic_steps * batch_size
+        train_ds = build_synthetic_dataset(source, batch_size, augment=augment, seed=args.seed)
+    elif any(is_shard_dir(folder) for folder in args.data_dir):
+        if len(args.data_dir) > 1:
+            print("A shard directory must be the only --data-dir")
+            return 1
+        shards = ShardedDataset(args.data_dir[0])
+        n_train = len(shards)
+        train_ds = build_shard_dataset(
+            shards, batch_size, training=True, shuffle_buffer=args.shuffle_buffer,
+            augment=augment, seed=args.seed
+        )
+    else:
+        paths, labels = [], []
+        for folder in args.data_dir:
+            folder_paths, folder_labels = load_labelled_folder(folder, args.limit)
+            paths += folder_paths
+            labels += folder_labels
+
+        if not paths:
+            print(f"No images found in {args.data_dir}")
+            return 1
+
+        if not args.val_dir:
+            paths, labels, val_paths, val_labels = split_paths(paths, labels, args.val_frac)
+
+        n_train = len(paths)
+        train_ds = build_dataset(
+            paths, labels, batch_size, training=True,
+            cache_dir=cache_dir, name="train" + suffix, shuffle_buffer=args.shuffle_buffer,
+            augment=augment, seed=args.seed
+        )
+
+    val_ds = None
+    if args.val_dir and is_shard_dir(args.val_dir):
+        val_shards = ShardedDataset(args.val_dir)
+        n_val = len(val_shards)
+        val_ds = build_shard_dataset(val_shards, batch_size)
+    else:
+        if args.val_dir:
+            val_paths, val_labels = load_labelled_folder(args.val_dir, args.limit)
+        n_val = len(val_paths)
+        if val_paths:
+            val_ds = build_dataset(val_paths, val_labels, batch_size, cache_dir=cache_dir, name="val" + suffix)
+
+    print(f"{n_train} training images, {n_val} validation images, {replicas} replica(s)")
+
+    try:
+        train(
+            train_ds, val_ds, epochs=args.epochs, lr=args.lr, init=args.init, output=args.output,
+            steps_per_epoch=args.synthetic_steps, strategy=strategy
+        )
+    finally:
+        if source is not None:
+            source.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
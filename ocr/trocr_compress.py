@@ -0,0 +1,242 @@
+"""
+Variantes allégées du TrOCR finetuné : int8 dynamique et élève distillé.
+
+    python -m ocr.trocr_compress quantize
+    python -m ocr.trocr_compress distill --train-dir data/finetune_site --quantize
+
+Les sorties par défaut correspondent aux entrées du registre
+(trocr_custom_int8, trocr_custom_student, trocr_custom_student_int8).
+Avec --eval-dir, chaque variante est mesurée par le benchmark
+(python -m ocr.benchmark) à côté de trocr_custom.
+"""
+
+import argparse
+import copy
+import json
+import random
+import sys
+from pathlib import Path
+
+import torch
+import torch.nn.functional as F
+from PIL import Image
+from transformers import TrOCRProcessor, VisionEncoderDecoderModel
+
+from ocr.dataset import load_labelled, load_labelled_folder
+from ocr.trocr_predictor import QUANTIZATION_FILE, QUANTIZED_WEIGHTS, quantize_linear
+
+MODELS_DIR = Path(__file__).resolve().parents[1] / "models"
+TEACHER_DIR = MODELS_DIR / "trocr_custom"
+
+
+# ======================
+# QUANTIFICATION INT8
+# ======================
+def save_quantized(model_path, output_dir) -> Path:
+    """
+    Linear -> int8 dynamique. Le checkpoint garde config, processor et
+    generation_config ; les poids int8 sont dans un state_dict torch.
+    """
+    out = Path(output_dir)
+    out.mkdir(parents=True, exist_ok=True)
+
+    model = VisionEncoderDecoderModel.from_pretrained(model_path).eval()
+    model.config.save_pretrained(out)
+    model.generation_config.save_pretrained(out)
+    TrOCRProcessor.from_pretrained(model_path).save_pretrained(out)
+
+    quantized = quantize_linear(model)
+    torch.save(quantized.state_dict(), out / QUANTIZED_WEIGHTS)
+
+    with open(out / QUANTIZATION_FILE, "w", encoding="utf-8") as f:
+        json.dump({"scheme": "dynamic", "dtype": "qint8", "modules": ["Linear"], "source": str(model_path)}, f, indent=2)
+
+    print(f"Quantized model saved to {out}")
+    return out
+
+
+# ======================
+# DISTILLATION
+# ======================
+def _keep_layers(layers, n: int):
+    """
+    Garde n couches réparties uniformément (initialisation de l'élève).
+    """
+    if n >= len(layers):
+        return layers
+    step = (len(layers) - 1) / max(1, n - 1)
+    keep = sorted({round(i * step) for i in range(n)})
+    return torch.nn.ModuleList(layers[i] for i in keep)
+
+
+def build_student(teacher, encoder_layers: int, decoder_layers: int):
+    student = copy.deepcopy(teacher)
+
+    encoder = student.encoder.encoder
+    encoder.layer = _keep_layers(encoder.layer, encoder_layers)
+    student.config.encoder.num_hidden_layers = len(encoder.layer)
+
+    decoder = student.decoder.model.decoder
+    decoder.layers = _keep_layers(decoder.layers, decoder_layers)
+    student.config.decoder.decoder_layers = len(decoder.layers)
+
+    return student
+
+
+def _label_ids(processor, labels, max_length: int):
+    """
+    Tokenisation identique au finetuning du professeur (notebooks/crnn_captcha.ipynb) :
+    <s> + texte + </s>, complété / tronqué à la longueur fixe du checkpoint.
+    """
+    return processor.tokenizer(
+        labels,
+        padding="max_length",
+        max_length=max_length,
+        truncation=True,
+        return_tensors="pt",
+    ).input_ids
+
+
+def _batches(paths, labels, batch_size, seed):
+    order = list(range(len(paths)))
+    random.Random(seed).shuffle(order)
+    for i in range(0, len(order), batch_size):
+        idx = order[i:i + batch_size]
+        yield [paths[j] for j in idx], [labels[j] for j in idx]
+
+
+def distill(model_path, output_dir, train_paths, train_labels, encoder_layers=6, decoder_layers=3,
+            epochs=3, batch_size=16, lr=5e-5, temperature=2.0, alpha=0.5, seed=42) -> Path:
+    """
+    Élève = professeur avec moins de couches, entraîné sur
+    alpha * CE(labels) + (1 - alpha) * KL(professeur || élève) à température T.
+    """
+    torch.manual_seed(seed)
+    device = "cuda" if torch.cuda.is_available() else "cpu"
+
+    processor = TrOCRProcessor.from_pretrained(model_path)
+    teacher = VisionEncoderDecoderModel.from_pretrained(model_path).to(device).eval()
+    student = build_student(teacher, encoder_layers, decoder_layers).to(device).train()
+
+    optimizer = torch.optim.AdamW(student.parameters(), lr=lr)
+    pad_id = processor.tokenizer.pad_token_id
+    max_length = teacher.generation_config.max_length
+
+    for epoch in range(epochs):
+        total, steps = 0.0, 0
+
+        for paths, labels in _batches(train_paths, train_labels, batch_size, seed + epoch):
+            images = [Image.open(p).convert("RGB") for p in paths]
+            pixel_values = processor(images, return_tensors="pt").pixel_values.to(device)
+
+            target = _label_ids(processor, labels, max_length).to(device)
+            mask = target != pad_id
+            target = target.masked_fill(~mask, -100)
+
+            with torch.no_grad():
+                teacher_logits = teacher(pixel_values=pixel_values, labels=target).logits
+
+            out = student(pixel_values=pixel_values, labels=target)
+
+            kl = F.kl_div(
+                F.log_softmax(out.logits / temperature, dim=-1),
+                F.softmax(teacher_logits / temperature, dim=-1),
+                reduction="none",
+            ).sum(-1)
+            kd_loss = (kl * mask).sum() / mask.sum() * temperature ** 2
+
+            loss = alpha * out.loss + (1 - alpha) * kd_loss
+
+            optimizer.zero_grad()
+            loss.backward()
+            optimizer.step()
+
+            total += loss.item()
+            steps += 1
+
+        print(f"[distill] epoch {epoch + 1}/{epochs} loss={total / max(1, steps):.4f}")
+
+    out_dir = Path(output_dir)
+    student.eval().save_pretrained(out_dir)
+    processor.save_pretrained(out_dir)
+    print(f"Student model saved to {out_dir}")
+    return out_dir
+
+
+# ======================
+# RAPPORT (HARNESS DE BENCHMARK)
+# ======================
+def benchmark_variants(model_keys, eval_dir, limit=None, batch_sizes=(1, 8, 32)) -> list:
+    from ocr.benchmark import print_summary, run_benchmarks
+
+    paths, labels = load_labelled(eval_dir, limit)
+    results = run_benchmarks(model_keys, paths, labels, batch_sizes)
+    print_summary(results)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Quantification int8 / distillation du TrOCR")
+    parser.add_argument("mode", choices=("quantize", "distill"))
+    parser.add_argument("--model", default=str(TEACHER_DIR), help="Checkpoint TrOCR de référence")
+    parser.add_argument("--output", default=None, help="Dossier de sortie (défaut : entrée du registre)")
+    parser.add_argument("--train-dir", help="Captchas labellisés (distillation)")
+    parser.add_argument("--train-limit", type=int, default=None)
+    parser.add_argument("--encoder-layers", type=int, default=6)
+    parser.add_argument("--decoder-layers", type=int, default=3)
+    parser.add_argument("--epochs", type=int, default=3)
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--lr", type=float, default=5e-5)
+    parser.add_argument("--temperature", type=float, default=2.0)
+    parser.add_argument("--alpha", type=float, default=0.5, help="Poids de la CE face à la KL")
+    parser.add_argument("--quantize", action="store_true", help="Quantifie aussi l'élève distillé")
+    parser.add_argument("--eval-dir", default=None, help="Benchmark des variantes produites")
+    parser.add_argument("--eval-limit", type=int, default=None)
+    parser.add_argument("--report", default=None, help="Rapport JSON du benchmark")
+    args = parser.parse_args(argv)
+
+    produced = []
+
+    if args.mode == "quantize":
+        save_quantized(args.model, args.output or MODELS_DIR / "trocr_custom_int8")
+        produced.append("trocr_custom_int8")
+
+    else:
+        if not args.train_dir:
+            parser.error("--train-dir is required for distill")
+
+        paths, labels = load_labelled_folder(args.train_dir, args.train_limit)
+        student_dir = distill(
+            args.model,
+            args.output or MODELS_DIR / "trocr_custom_student",
+            paths,
+            labels,
+            encoder_layers=args.encoder_layers,
+            decoder_layers=args.decoder_layers,
+            epochs=args.epochs,
+            batch_size=args.batch_size,
+            lr=args.lr,
+            temperature=args.temperature,
+            alpha=args.alpha,
+        )
+        produced.append("trocr_custom_student")
+
+        if args.quantize:
+            save_quantized(student_dir, MODELS_DIR / "trocr_custom_student_int8")
+            produced.append("trocr_custom_student_int8")
+
+    if args.eval_dir:
+        # Le registre pointe sur les dossiers par défaut : --output n'est pas benchmarké
+        keys = ["trocr_custom"] + (produced if not args.output else [])
+        results = benchmark_variants(keys, args.eval_dir, args.eval_limit)
+
+        if args.report:
+            with open(args.report, "w", encoding="utf-8") as f:
+                json.dump(results, f, indent=2, ensure_ascii=False)
+            print(f"Report saved to {args.report}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
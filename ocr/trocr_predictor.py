@@ -1,35 +1,203 @@
+from pathlib import Path
+
+import numpy as np
 import torch
 from PIL import Image
-from transformers import VisionEncoderDecoderModel, TrOCRProcessor
+from transformers import GenerationConfig, TrOCRProcessor, VisionEncoderDecoderConfig, VisionEncoderDecoderModel
+
+from ocr.charset import max_length
+from ocr.image_io import decode_image_bytes, is_image_bytes
+
+# Checkpoint quantifié (python -m ocr.trocr_compress) : config + state_dict int8
+QUANTIZATION_FILE = "quantization.json"
+QUANTIZED_WEIGHTS = "quantized_state_dict.pt"
+
+
+# ======================
+# CHARGEMENT
+# ======================
+def quantize_linear(model):
+    """
+    Quantification dynamique int8 des couches Linear (CPU uniquement).
+    """
+    return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def load_trocr_model(model_path):
+    """
+    Checkpoint Hugging Face classique, ou variante int8 produite par
+    ocr.trocr_compress (l'architecture est reconstruite puis quantifiée
+    avant de recharger les poids int8).
+    """
+    path = Path(model_path)
+
+    if not (path / QUANTIZATION_FILE).exists():
+        return VisionEncoderDecoderModel.from_pretrained(model_path)
+
+    model = VisionEncoderDecoderModel(config=VisionEncoderDecoderConfig.from_pretrained(model_path))
+    model.generation_config = GenerationConfig.from_pretrained(model_path)
+    model.eval()
+
+    model = quantize_linear(model)
+    # state_dict de tenseurs (int8 quantifiés compris) : aucun objet arbitraire à désérialiser
+    model.load_state_dict(torch.load(path / QUANTIZED_WEIGHTS, map_location="cpu", weights_only=True))
+    return model
+
+
+def generation_budget(generation_config) -> int:
+    """
+    Nombre max de tokens générés : borne d'entraînement du checkpoint
+    (max_length inclut le token de départ du décodeur), sans dépasser
+    un captcha de longueur max + EOS.
+    """
+    budget = max_length + 1
+    if generation_config.max_length:
+        budget = min(budget, generation_config.max_length - 1)
+    return max(1, budget)
 
 
 class TrOCRPredictor:
+    """
+    TrOCR finetuné sur les captchas.
+
+    - génération bornée : au plus `max_new_tokens` tokens, par défaut la
+      borne du checkpoint (generation_config.max_length, token de départ
+      compris) plafonnée à la longueur max d'un captcha + EOS ; greedy par
+      défaut ou `num_beams` faisceaux
+    - `predict_batch` : un seul passage processor + generate pour N images
+    - `num_threads` : threads intra-op torch (réglage global du processus)
+    - checkpoint int8 (quantization.json) rechargé automatiquement, sur CPU
+    - `compile` : encodeur compilé (torch.compile) pour l'entrée fixe 384x384,
+      préchauffé par `warmup` pour que la première requête ne paie pas la compilation
+    """
+
+    def __init__(self, model_path: str, max_new_tokens: int = None, num_beams: int = 1,
+                 batch_size: int = 16, num_threads: int = None, compile: bool = False):
+
+        self.quantized = (Path(model_path) / QUANTIZATION_FILE).exists()
 
-    def __init__(self, model_path: str):
+        # Les noyaux int8 dynamiques n'existent que sur CPU
+        self.device = "cuda" if torch.cuda.is_available() and not self.quantized else "cpu"
 
-        self.device = "cuda" if torch.cuda.is_available() else "cpu"
+        if num_threads:
+            torch.set_num_threads(num_threads)
 
         self.processor = TrOCRProcessor.from_pretrained(model_path)
-        self.model = VisionEncoderDecoderModel.from_pretrained(model_path)
+        self.model = load_trocr_model(model_path)
 
         self.model.to(self.device)
         self.model.eval()
 
+        # Le checkpoint désactive le cache : sans lui chaque token recalcule tout le préfixe
+        self.model.config.use_cache = True
+        self.model.config.decoder.use_cache = True
+        self.model.generation_config.use_cache = True
+
+        self.compiled = compile
+        if compile:
+            # Forme statique (B, 3, 384, 384) : pas de graphe dynamique,
+            # une recompilation par taille de batch (préchauffée dans warmup)
+            self.model.encoder = torch.compile(self.model.encoder, dynamic=False)
+
+        self.max_new_tokens = max_new_tokens or generation_budget(self.model.generation_config)
+        self.num_beams = num_beams
+        self.batch_size = batch_size
+
+        # Compilation dès le chargement, même hors préchargement du pool
+        if compile:
+            self.warmup()
+
+    # ======================
+    # IMAGE LOADER
+    # ======================
+    def _load(self, item):
+        if isinstance(item, (str, Path)):
+            return Image.open(item).convert("RGB")
+        if is_image_bytes(item):
+            item = decode_image_bytes(item)
+        return Image.fromarray(np.asarray(item)).convert("RGB")
+
+    # ======================
+    # PREDICT
+    # ======================
     def predict(self, image_path: str) -> str:
 
-        image = Image.open(image_path).convert("RGB")
+        return self.predict_batch([image_path])[0]
 
+    def predict_array(self, array) -> str:
+
+        return self.predict_batch([array])[0]
+
+    def predict_bytes(self, data) -> str:
+
+        return self.predict_batch([data])[0]
+
+    def predict_batch(self, items) -> list:
+        texts = []
+
+        for i in range(0, len(items), self.batch_size):
+            images = [self._load(item) for item in items[i:i + self.batch_size]]
+            n = len(images)
+
+            # Mode compilé : batch complété à batch_size pour rester sur une forme déjà compilée
+            if self.compiled and n not in (1, self.batch_size):
+                images += [images[-1]] * (self.batch_size - n)
+
+            texts.extend(self._generate(images)[:n])
+
+        return texts
+
+    def _generate(self, images) -> list:
+
+        # Le processor redimensionne et empile tout le batch (384x384)
         pixel_values = self.processor(
-            image,
+            images,
             return_tensors="pt"
         ).pixel_values.to(self.device)
 
-        with torch.no_grad():
-            ids = self.model.generate(pixel_values)
+        with torch.inference_mode():
+            ids = self.model.generate(
+                pixel_values,
+                max_new_tokens=self.max_new_tokens,
+                num_beams=self.num_beams,
+                do_sample=False,
+                early_stopping=self.num_beams > 1,
+                use_cache=True,
+            )
 
-        text = self.processor.batch_decode(
+        texts = self.processor.batch_decode(
             ids,
             skip_special_tokens=True
-        )[0]
+        )
+
+        return [text.strip() for text in texts]
+
+    def uses_kv_cache(self) -> bool:
+        """
+        Vérifie que generate renvoie bien un cache clé/valeur du décodeur.
+        """
+        pixel_values = self.processor(
+            Image.new("RGB", (200, 50), "white"),
+            return_tensors="pt"
+        ).pixel_values.to(self.device)
+
+        with torch.inference_mode():
+            out = self.model.generate(
+                pixel_values,
+                max_new_tokens=2,
+                use_cache=True,
+                return_dict_in_generate=True,
+            )
+
+        return getattr(out, "past_key_values", None) is not None
+
+    def warmup(self):
+        blank = Image.new("RGB", (200, 50), "white")
+
+        # Compilation pour les tailles de batch attendues (1 et batch_size)
+        sizes = {1, self.batch_size} if self.compiled else {1}
+        for size in sorted(sizes):
+            self._generate([blank] * size)
 
-        return text.strip()
\ No newline at end of file
+        if not self.uses_kv_cache():
+            print("[trocr] Warning: decoder KV cache is not used by generate")
@@ -1,9 +1,7 @@
 import tensorflow as tf
 from keras import layers
 
-characters = list("0123456789abcdefghijklmnopqrstuvwxyz")
-num_chars = len(characters)
-num_classes = num_chars + 1
+from .charset import characters, num_chars, num_classes
 
 char_to_num = layers.StringLookup(
     vocabulary=characters,
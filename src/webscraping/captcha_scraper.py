@@ -281,17 +281,15 @@ class CaptchaScraper:
         print("NO CAPTCHA DETECTED")
         return False
 
-    def save_captcha_image(self):
+    def get_captcha_bytes(self):
+        # ================================================================================================================================
+        # CAPTCHA image bytes, kept in memory (no file written)
+        # ================================================================================================================================
         if not self.captcha_element:
-            print("No CAPTCHA element to save")
+            print("No CAPTCHA element to capture")
             return None
-        
+
         try:
-            os.makedirs("data/raw", exist_ok=True)
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"captcha_{timestamp}.png"
-            path = f"data/raw/{filename}"
-            
             # Method 1: Try downloading from src
             tag_name = self.captcha_element.tag_name.lower()
             if tag_name == 'img':
@@ -315,10 +313,8 @@ class CaptchaScraper:
                         response = session.get(src, timeout=10)
                         
                         if response.status_code == 200:
-                            with open(path, 'wb') as f:
-                                f.write(response.content)
-                            print(f"Image downloaded: {path}")
-                            return path
+                            print(f"Image downloaded ({len(response.content)} bytes)")
+                            return response.content
                     except Exception as e:
                         print(f" Download failed: {e}")
             
@@ -328,8 +324,27 @@ class CaptchaScraper:
                                       self.captcha_element)
             time.sleep(0.5)
             
-            self.captcha_element.screenshot(path)
-            print(f"SAVED Screenshot: {path}")
+            return self.captcha_element.screenshot_as_png
+            
+        except Exception as e:
+            print(f"ERROR Capture failed: {e}")
+            return None
+
+    def save_captcha_image(self, image_bytes=None):
+        if image_bytes is None:
+            image_bytes = self.get_captcha_bytes()
+        if not image_bytes:
+            return None
+        
+        try:
+            os.makedirs("data/raw", exist_ok=True)
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            filename = f"captcha_{timestamp}.png"
+            path = f"data/raw/{filename}"
+
+            with open(path, 'wb') as f:
+                f.write(image_bytes)
+            print(f"SAVED CAPTCHA: {path}")
             return path
             
         except Exception as e:
@@ -226,11 +226,14 @@ class CaptchaSolver(CaptchaScraper):
     # MAIN SOLVER (CORRECTED)
     # =====================================================================
 
-    def solve_with_model(self, url, model_callback, human_like=True):
+    def solve_with_model(self, url, model_callback, human_like=True, in_memory=False):
 
         """
         Page is ALREADY loaded by API
         Do NOT reload here
+
+        in_memory=True : model_callback receives the image bytes,
+        nothing is written to data/raw
         """
 
         result = {
@@ -268,20 +271,32 @@ class CaptchaSolver(CaptchaScraper):
                 return result
 
 
-            # STEP 3 — SAVE IMAGE
-            print("[3] Saving CAPTCHA")
+            # STEP 3 — SAVE IMAGE (or keep it in memory)
+            if in_memory:
+                print("[3] Capturing CAPTCHA in memory")
 
-            path = self.save_captcha_image()
-            result["captcha_path"] = path
+                path = None
+                image = self.get_captcha_bytes()
 
-            if not path:
-                return result
+                if not image:
+                    return result
+
+            else:
+                print("[3] Saving CAPTCHA")
+
+                path = self.save_captcha_image()
+                result["captcha_path"] = path
+
+                if not path:
+                    return result
+
+                image = path
 
 
             # STEP 4 — OCR
             print("[4] Solving")
 
-            solution = model_callback(path)
+            solution = model_callback(image)
             result["solution"] = solution
 
 
@@ -0,0 +1,22 @@
+import numpy as np
+
+from ocr.augment import SITE_PRESET, BatchAugmenter
+
+
+def test_batch_augmentation_is_deterministic_and_bounded():
+    images = np.random.default_rng(0).random((8, 200, 50, 1), dtype=np.float32)
+    augmenter = BatchAugmenter(seed=7, p=1.0, **SITE_PRESET)
+
+    out = augmenter(images, 3).numpy()
+    assert out.shape == images.shape and out.dtype == np.float32
+    assert out.min() >= 0.0 and out.max() <= 1.0
+    assert not np.allclose(out, images)
+
+    np.testing.assert_array_equal(augmenter(images, 3).numpy(), out)
+    assert not np.allclose(augmenter(images, 4).numpy(), out)
+
+
+def test_disabled_transforms_leave_images_unchanged():
+    images = np.random.default_rng(1).random((2, 200, 50, 1), dtype=np.float32)
+    out = BatchAugmenter(p=0.0, **SITE_PRESET)(images, 0).numpy()
+    np.testing.assert_allclose(out, images, atol=1e-6)
@@ -0,0 +1,125 @@
+import numpy as np
+import pytest
+
+from ocr.charset import num_classes
+from ocr.ctc_decoding import (
+    BLANK_INDEX,
+    beam_search_decode,
+    decode_details,
+    greedy_decode,
+    greedy_decode_text,
+    indices_to_text,
+)
+
+
+def random_probs(batch=8, steps=50, seed=0):
+    rng = np.random.default_rng(seed)
+    logits = rng.normal(size=(batch, steps, num_classes)) * 3
+    probs = np.exp(logits)
+    return (probs / probs.sum(-1, keepdims=True)).astype(np.float32)
+
+
+def one_hot_path(path):
+    probs = np.full((1, len(path), num_classes), 1e-4, dtype=np.float32)
+    for t, c in enumerate(path):
+        probs[0, t, c] = 1.0
+    return probs / probs.sum(-1, keepdims=True)
+
+
+def test_greedy_collapses_repeats_and_blanks():
+    b = BLANK_INDEX
+    # "a a _ a b b _ _ 1" -> "aab1"
+    probs = one_hot_path([10, 10, b, 10, 11, 11, b, b, 1])
+
+    dense, lengths = greedy_decode(probs)
+
+    assert lengths.tolist() == [4]
+    assert indices_to_text(dense) == ["aab1"]
+
+
+def test_details_scores_follow_the_best_path():
+    b = BLANK_INDEX
+    probs = one_hot_path([10, 10, b, 11, b])
+    # Deuxième frame du "a" moins sûre : le caractère garde le max de ses frames
+    probs[0, 1, 10] = 0.5
+    probs[0, 1, b] = 0.4
+    probs /= probs.sum(-1, keepdims=True)
+
+    result = decode_details(probs, top_k=2)[0]
+
+    assert result["text"] == "ab"
+    assert len(result["char_probs"]) == 2
+    assert result["char_probs"][0] == pytest.approx(probs[0, :2, 10].max(), abs=1e-6)
+    assert result["logprob"] == pytest.approx(np.log(probs[0].max(-1) + 1e-8).sum(), rel=1e-6)
+    assert 0 < result["confidence"] <= 1
+    assert result["alternatives"][0]["text"] == "ab"
+    assert len(result["alternatives"]) == 2
+
+
+def test_beam_search_matches_greedy_on_peaked_probs():
+    b = BLANK_INDEX
+    probs = one_hot_path([3, b, 3, 20, 20, b, 35])
+
+    hyps = beam_search_decode(probs, beam_width=5, top_paths=3)[0]
+
+    assert indices_to_text([hyps[0][0]]) == greedy_decode_text(probs) == ["33kz"]
+    assert [lp for _, lp in hyps] == sorted((lp for _, lp in hyps), reverse=True)
+
+
+def test_greedy_matches_tensorflow():
+    tf = pytest.importorskip("tensorflow")
+    probs = random_probs()
+
+    decoded, _ = tf.keras.backend.ctc_decode(
+        probs, input_length=np.full(probs.shape[0], probs.shape[1]), greedy=True
+    )
+    expected = decoded[0].numpy()
+
+    dense, _ = greedy_decode(probs)
+
+    assert np.array_equal(dense[:, :expected.shape[1]], expected)
+
+
+def test_beam_search_matches_tensorflow():
+    tf = pytest.importorskip("tensorflow")
+    probs = random_probs(batch=4, steps=20, seed=1)
+
+    decoded, _ = tf.nn.ctc_beam_search_decoder(
+        tf.math.log(tf.transpose(probs, [1, 0, 2]) + 1e-8),
+        np.full(probs.shape[0], probs.shape[1], dtype=np.int32),
+        beam_width=10,
+    )
+    expected = tf.sparse.to_dense(decoded[0], -1).numpy()
+
+    hyps = beam_search_decode(probs, beam_width=10, prune_prob=0.0)
+
+    for row, sample_hyps in zip(expected, hyps):
+        assert sample_hyps[0][0].tolist() == row[row >= 0].tolist()
+
+
+def test_constrained_beam_only_returns_valid_texts():
+    from ocr.ctc_decoding import DecodingConstraints
+
+    probs = random_probs(batch=4, steps=20, seed=3)
+    constraints = DecodingConstraints(length=4, allowed="0123456789abc", pattern=r"[a-c][0-9a-c]*")
+
+    results = decode_details(probs, top_k=3, constraints=constraints)
+
+    for result in results:
+        texts = [result["text"]] + [alt["text"] for alt in result["alternatives"]]
+        for text in texts:
+            assert len(text) == 4
+            assert text[0] in "abc"
+            assert set(text) <= set("0123456789abc")
+
+
+def test_constrained_greedy_path_with_disallowed_char_falls_back_to_beam():
+    from ocr.ctc_decoding import DecodingConstraints
+
+    probs = random_probs(batch=4, steps=20, seed=3)
+    greedy = greedy_decode_text(probs)
+    assert any(set(text) - set("abc") for text in greedy)
+
+    constraints = DecodingConstraints(allowed="abc")
+    for result in decode_details(probs, top_k=1, constraints=constraints):
+        assert set(result["text"]) <= set("abc")
@@ -0,0 +1,89 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from api.app.services.ensemble_service import EnsemblePredictor, vote
+
+
+class FakePool:
+    def __init__(self, predictors):
+        self.predictors = predictors
+
+    def pin(self, model_key):
+        return self.predictors.get(model_key)
+
+    def unpin(self, model_key):
+        self.predictors.pop(model_key, None)
+
+
+class FixedPredictor:
+    def __init__(self, text, confidence=None, delay=0.0):
+        self.text, self.confidence, self.delay = text, confidence, delay
+
+    def predict_details_batch(self, items, top_k=1):
+        time.sleep(self.delay)
+        return [{"text": self.text, "confidence": self.confidence} for _ in items]
+
+
+def test_vote_weights_characters_by_confidence():
+    result = vote([
+        {"model": "a", "text": "abc12", "confidence": 0.9, "weight": 1.0},
+        {"model": "b", "text": "abd12", "confidence": 0.3, "weight": 1.0},
+        {"model": "c", "text": "xbd12", "confidence": 0.4, "weight": 1.0},
+        {"model": "d", "text": "abc1", "confidence": 0.2, "weight": 1.0},
+    ])
+    assert result["text"] == "abc12"
+    assert 0 < result["confidence"] < 1
+
+
+def test_late_member_is_ignored():
+    ensemble = EnsemblePredictor("test", [
+        {"model": "fast", "deadline_ms": 500},
+        {"model": "slow", "deadline_ms": 50},
+    ], pool=FakePool({
+        "fast": FixedPredictor("abc12", 0.8),
+        "slow": FixedPredictor("zzz99", 1.0, delay=0.5),
+    }))
+
+    start = time.perf_counter()
+    result = ensemble.predict_details_batch([b"img"])[0]
+    assert time.perf_counter() - start < 0.4
+
+    assert result["text"] == "abc12"
+    assert result["votes"] == {"fast": "abc12"}
+    assert ensemble.stats()["members"][1]["timeouts"] == 1
+    ensemble.close()
+
+
+def test_concurrent_requests_each_get_a_full_vote():
+    ensemble = EnsemblePredictor("test", [
+        {"model": "a", "deadline_ms": 1000},
+        {"model": "b", "deadline_ms": 1000},
+    ], pool=FakePool({
+        "a": FixedPredictor("abc12", 0.8, delay=0.1),
+        "b": FixedPredictor("abc12", 0.6, delay=0.2),
+    }), max_concurrency=4)
+
+    with ThreadPoolExecutor(max_workers=4) as callers:
+        results = list(callers.map(lambda _: ensemble.predict_details_batch([b"img"])[0], range(4)))
+
+    for result in results:
+        assert result["votes"] == {"a": "abc12", "b": "abc12"}
+    assert [m["answered"] for m in ensemble.stats()["members"]] == [4, 4]
+    ensemble.close()
+
+
+def test_overrun_member_is_skipped_until_it_finishes():
+    pool = FakePool({"slow": FixedPredictor("zzz99", 1.0, delay=0.3)})
+    ensemble = EnsemblePredictor("test", [{"model": "slow", "deadline_ms": 50}], pool=pool, max_concurrency=2)
+
+    assert ensemble.predict_details_batch([b"img"])[0]["error"] == "no_ensemble_member_answered"
+    # Calcul en retard encore en cours : le membre n'est pas relancé
+    assert ensemble.predict_details_batch([b"img"])[0]["text"] is None
+    counts = ensemble.stats()["members"][0]
+    assert (counts["timeouts"], counts["skipped"], counts["available"]) == (1, 1, False)
+
+    time.sleep(0.4)
+    assert ensemble.stats()["members"][0]["available"]
+
+    ensemble.close()
+    assert pool.predictors == {}
@@ -0,0 +1,50 @@
+import pytest
+
+from api.app.services.micro_batcher import MicroBatcher
+
+
+def test_short_result_list_fails_every_future():
+    batcher = MicroBatcher(lambda items: items[:-1], max_batch_size=4, max_wait_ms=50)
+    futures = [batcher.submit(i) for i in range(3)]
+
+    for future in futures:
+        with pytest.raises(RuntimeError):
+            future.result(timeout=5)
+    batcher.close()
+
+
+def test_submit_after_close_raises():
+    batcher = MicroBatcher(lambda items: items)
+    assert batcher.predict("a", timeout=5) == "a"
+
+    batcher.close()
+    with pytest.raises(RuntimeError):
+        batcher.submit("b")
+
+
+def test_bad_item_fails_only_its_own_request():
+    batches = []
+
+    def batch_fn(items):
+        batches.append(len(items))
+        return [10 // item for item in items]
+
+    batcher = MicroBatcher(batch_fn, max_batch_size=8, max_wait_ms=200)
+    futures = [batcher.submit(i) for i in (1, 0, 5)]
+
+    assert futures[0].result(timeout=5) == 10
+    with pytest.raises(ZeroDivisionError):
+        futures[1].result(timeout=5)
+    assert futures[2].result(timeout=5) == 2
+    assert batches[0] == 3  # un seul batch, puis reprise image par image
+    batcher.close()
+
+
+def test_prepare_runs_in_the_caller_thread():
+    batcher = MicroBatcher(lambda items: items, prepare=lambda item: item.decode())
+    assert batcher.predict(b"ok", timeout=5) == "ok"
+
+    # Entrée illisible : erreur pour l'appelant seul, rien n'entre dans le batch
+    with pytest.raises(UnicodeDecodeError):
+        batcher.submit(b"\xff")
+    batcher.close()
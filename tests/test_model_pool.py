@@ -0,0 +1,38 @@
+from api.app.services.model_pool import ModelPool
+
+
+class FakePredictor:
+    def __init__(self, key):
+        self.key = key
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+def test_evicted_predictor_is_closed_only_after_release():
+    pool = ModelPool(FakePredictor, max_resident=1)
+
+    with pool.lease("a") as a:
+        pool.get("b")  # évince "a", encore utilisé
+        assert not a.closed
+        assert pool.stats()["retired_in_use"] == 1
+
+    assert a.closed
+    assert pool.stats()["retired_in_use"] == 0
+
+
+def test_pinned_models_are_not_evicted_and_hits_are_counted():
+    pool = ModelPool(FakePredictor, max_resident=1)
+
+    stage = pool.pin("stage")
+    pool.get("other")
+    pool.get("other")
+    assert not stage.closed
+
+    stats = {m["key"]: m for m in pool.stats()["models"]}
+    assert stats["stage"]["pinned"] is True
+    assert stats["other"]["hits"] == 1
+
+    pool.unpin("stage")
+    assert stage.closed  # de nouveau évinçable : au-delà de max_resident
@@ -0,0 +1,61 @@
+from api.app.services.prediction_cache import PredictionCache
+
+
+class EchoPredictor:
+    def __init__(self):
+        self.calls = 0
+
+    def predict_bytes(self, data):
+        self.calls += 1
+        return data.decode()
+
+    def predict_batch(self, images):
+        self.calls += len(images)
+        return [data.decode() for data in images]
+
+
+def test_only_unseen_images_reach_the_model():
+    cache = PredictionCache(max_entries=16)
+    predictor = EchoPredictor()
+
+    assert cache.predict_many("a_jb_t", predictor, [b"abc", b"xyz", b"abc"]) == [
+        ("abc", False), ("xyz", False), ("abc", False)
+    ]
+    assert predictor.calls == 2
+
+    assert cache.predict_many("a_jb_t", predictor, [b"abc", b"new"]) == [("abc", True), ("new", False)]
+    assert predictor.calls == 3
+    assert cache.stats()["hits"] == 1
+
+
+def test_lru_eviction_and_disk_tier(tmp_path):
+    db = str(tmp_path / "cache.db")
+    predictor = EchoPredictor()
+
+    cache = PredictionCache(max_entries=1, db_path=db)
+    cache.predict_bytes("a_jb_t", predictor, b"one")
+    cache.predict_bytes("a_jb_t", predictor, b"two")
+    assert cache.stats()["entries"] == 1
+
+    # Nouveau processus : relu depuis SQLite, sans repasser par le modèle
+    restarted = PredictionCache(max_entries=1, db_path=db)
+    assert restarted.predict_bytes("a_jb_t", predictor, b"one") == "one"
+    assert predictor.calls == 2
+    assert restarted.stats()["disk_hits"] == 1
+
+
+def test_key_depends_on_model():
+    cache = PredictionCache()
+    assert cache.key("a_jb_t", b"img") != cache.key("trocr_custom", b"img")
+
+
+def test_text_is_served_from_cached_details():
+    cache = PredictionCache(max_entries=16)
+    predictor = EchoPredictor()
+
+    details = cache.predict_many("a_jb_t", predictor, [b"abc"], details=True)
+    assert details == [({"text": "abc", "confidence": None}, False)]
+
+    # Même entrée pour le texte seul (résolution) et le détail (/captcha/ocr)
+    assert cache.predict_many("a_jb_t", predictor, [b"abc"]) == [("abc", True)]
+    assert predictor.calls == 1
@@ -0,0 +1,74 @@
+import threading
+
+import cv2
+import numpy as np
+import pytest
+
+from ocr.preprocess import IMG_HEIGHT, IMG_WIDTH, BatchPreprocessor, preprocess_batch_np
+
+
+def random_png(tmp_path, name, shape, seed):
+    rng = np.random.default_rng(seed)
+    img = rng.integers(0, 256, size=shape, dtype=np.uint8)
+    path = tmp_path / f"{name}.png"
+    cv2.imwrite(str(path), img)
+    return str(path)
+
+
+@pytest.fixture
+def images(tmp_path):
+    return [
+        random_png(tmp_path, "gray_small", (50, 200), 0),
+        random_png(tmp_path, "gray_large", (73, 311), 1),
+        random_png(tmp_path, "color", (60, 180, 3), 2),
+    ]
+
+
+def test_batch_sources_agree(images):
+    arrays = [cv2.imread(p, cv2.IMREAD_GRAYSCALE) for p in images]
+    encoded = [open(p, "rb").read() for p in images]
+
+    from_paths = preprocess_batch_np(images)
+    assert from_paths.shape == (3, IMG_WIDTH, IMG_HEIGHT, 1)
+    assert from_paths.dtype == np.float32
+
+    np.testing.assert_array_equal(from_paths, preprocess_batch_np(encoded))
+    np.testing.assert_array_equal(from_paths, preprocess_batch_np(arrays))
+    # Tenseurs déjà prétraités recopiés tels quels
+    np.testing.assert_array_equal(from_paths, preprocess_batch_np(list(from_paths)))
+
+
+def test_preallocated_buffer_is_reused(images):
+    prep = BatchPreprocessor(capacity=8)
+    out = prep(images)
+
+    assert out.shape[0] == len(images)
+    assert np.shares_memory(out, prep.buffer)
+
+
+def test_float_images_are_not_rescaled(images):
+    arrays = [cv2.imread(p, cv2.IMREAD_GRAYSCALE) for p in images]
+    floats = [a.astype(np.float32) / 255.0 for a in arrays]
+
+    np.testing.assert_allclose(preprocess_batch_np(floats), preprocess_batch_np(arrays), atol=1e-6)
+
+
+def test_buffer_per_thread(images):
+    prep = BatchPreprocessor(capacity=8)
+    out = prep(images)
+
+    other = []
+    thread = threading.Thread(target=lambda: other.append(prep(images[:1])))
+    thread.start()
+    thread.join()
+
+    assert not np.shares_memory(out, other[0])
+
+
+def test_parity_with_tensorflow(images):
+    pytest.importorskip("tensorflow")
+    from ocr.preprocess import preprocess_image
+
+    expected = np.stack([preprocess_image(p).numpy() for p in images])
+    # Arrondis float32 de l'interpolation uniquement (< 1/40 de niveau de gris)
+    np.testing.assert_allclose(preprocess_batch_np(images), expected, atol=1e-4)
@@ -0,0 +1,34 @@
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from ocr.dataset import load_labelled
+from ocr.preprocess import preprocess_batch_np
+from ocr.shards import ShardedDataset, pack
+
+
+def test_pack_and_read_back(tmp_path):
+    rng = np.random.default_rng(0)
+    labels = ["ab12", "x9y8z", "k3", "zz", "q1w2e3"]
+    paths = []
+    for label, width in zip(labels, (200, 180, 240, 200, 160)):
+        path = tmp_path / f"{label}.png"
+        cv2.imwrite(str(path), rng.integers(0, 256, size=(50, width), dtype=np.uint8))
+        paths.append(str(path))
+
+    pack(paths, labels, tmp_path / "shards", shard_size=2, chunk_size=1, workers=2)
+    dataset = ShardedDataset(tmp_path / "shards")
+
+    assert len(dataset) == 5
+    assert dataset.labels == labels
+    np.testing.assert_array_equal(dataset.images(), preprocess_batch_np(paths))
+
+    # Tranche dans un seul shard : vue sur le fichier memory-mappé
+    view = dataset.images(2, 4)
+    assert isinstance(view, np.memmap)
+    assert dataset.raw(3).tobytes() == Path(paths[3]).read_bytes()
+
+    images, loaded_labels = load_labelled(tmp_path / "shards", limit=3)
+    assert loaded_labels == labels[:3]
+    np.testing.assert_array_equal(preprocess_batch_np(images), preprocess_batch_np(paths[:3]))
@@ -0,0 +1,26 @@
+import numpy as np
+
+from webscraping_captcha.scraping_finetunning_benchmarking.parallel_captcha_generator import generate_chunks
+
+
+def test_chunks_do_not_depend_on_worker_count():
+    one = [sample for chunk in generate_chunks(12, seed=1, workers=1, chunk_size=5) for sample in chunk]
+    three = [sample for chunk in generate_chunks(12, seed=1, workers=3, chunk_size=5) for sample in chunk]
+
+    assert len(one) == 12
+    # Mêmes textes et mêmes PNG, dans le même ordre
+    assert one == three
+
+
+def test_synthetic_source_batch():
+    from ocr.preprocess import IMG_HEIGHT, IMG_WIDTH
+    from webscraping_captcha.scraping_finetunning_benchmarking.synthetic_source import SyntheticCaptchaSource
+
+    with SyntheticCaptchaSource(batch_size=4, workers=1, length=(4, 6)) as source:
+        images, labels = next(iter(source))
+
+    assert images.shape == (4, IMG_WIDTH, IMG_HEIGHT, 1)
+    assert images.dtype == np.float32
+    assert 0.0 <= images.min() and images.max() <= 1.0
+    assert len(labels) == 4
+    assert all(4 <= len(label) <= 6 and label == label.lower() for label in labels)
@@ -0,0 +1,111 @@
+import cv2
+import numpy as np
+
+from ocr.charset import characters
+from ocr.train import build_dataset
+
+
+def test_dataset_yields_padded_batches_and_reuses_cache(tmp_path):
+    rng = np.random.default_rng(0)
+    labels = ["ab12", "x9y8z", "k3"]
+    paths = []
+    for label in labels:
+        path = tmp_path / f"{label}.png"
+        cv2.imwrite(str(path), rng.integers(0, 256, size=(50, 200), dtype=np.uint8))
+        paths.append(str(path))
+
+    cache_dir = tmp_path / "cache"
+    # Une passe complète (première epoch) remplit le cache
+    (batch,) = list(build_dataset(paths, labels, batch_size=3, cache_dir=cache_dir, name="t"))
+
+    assert batch["image"].shape == (3, 200, 50, 1)
+    decoded = ["".join(characters[c] for c in row if c >= 0) for row in batch["label"].numpy()]
+    assert decoded == labels
+    assert batch["label"].numpy()[2, 2:].tolist() == [-1, -1, -1]
+
+    # Les images ne sont plus relues : le cache suffit
+    for path in paths:
+        (tmp_path / path).unlink()
+    again = next(iter(build_dataset(paths, labels, batch_size=3, cache_dir=cache_dir, name="t")))
+    np.testing.assert_array_equal(again["image"].numpy(), batch["image"].numpy())
+
+
+def test_bf16_training_exports_float32_model(tmp_path):
+    import keras
+    import tensorflow as tf
+    from ocr.train import set_mixed_precision, train
+
+    images = tf.random.uniform((4, 200, 50, 1), seed=0)
+    labels = tf.constant([[1, 2, 3], [4, 5, -1], [6, 7, 8], [9, -1, -1]], tf.int32)
+    ds = tf.data.Dataset.from_tensors({"image": images, "label": labels})
+
+    set_mixed_precision(True)
+    try:
+        history = train(ds, epochs=1, output=str(tmp_path / "m.keras"))
+    finally:
+        set_mixed_precision(False)
+
+    assert np.isfinite(history.history["loss"][0])
+    model = keras.models.load_model(tmp_path / "m.keras")
+    assert {layer.dtype_policy.name for layer in model.layers} == {"float32"}
+    assert model(images).dtype == tf.float32
+
+
+# Deux réplicas CPU (devices logiques) : à configurer avant l'initialisation de TF,
+# d'où un processus séparé
+TWO_REPLICAS_STEP = """
+import sys
+import numpy as np
+import tensorflow as tf
+
+cpu = tf.config.list_physical_devices("CPU")[0]
+tf.config.set_logical_device_configuration(cpu, [tf.config.LogicalDeviceConfiguration()] * 2)
+
+import keras
+from ocr.model import build_ocr_model
+from ocr.train import _distributed_fit
+
+rng = np.random.default_rng(0)
+# 7 images : parts inégales (4 / 3) entre les deux réplicas
+batch = {
+    "image": rng.random((7, 200, 50, 1), dtype=np.float32),
+    "label": rng.integers(0, 30, size=(7, 5)).astype(np.int32),
+}
+ds = tf.data.Dataset.from_tensors(batch)
+
+keras.utils.set_random_seed(0)
+initial = build_ocr_model().get_weights()
+
+def one_step(strategy):
+    with strategy.scope():
+        model = build_ocr_model()
+        model.set_weights(initial)
+        model.compile(optimizer=keras.optimizers.SGD(0.1))
+    if strategy.num_replicas_in_sync > 1:
+        _distributed_fit(model, ds, None, 1, None, [], strategy)
+    else:
+        model.fit(ds, epochs=1, verbose=0)
+    return np.concatenate([(w - w0).ravel() for w, w0 in zip(model.get_weights(), initial)])
+
+single = one_step(tf.distribute.get_strategy())
+mirrored = tf.distribute.MirroredStrategy(["/cpu:0", "/cpu:1"])
+assert mirrored.num_replicas_in_sync == 2
+replicated = one_step(mirrored)
+np.save(sys.argv[1], np.stack([single, replicated]))
+"""
+
+
+def test_two_replica_step_matches_single_process(tmp_path):
+    import os
+    import subprocess
+    import sys
+    from pathlib import Path
+
+    out = tmp_path / "deltas.npy"
+    root = Path(__file__).resolve().parents[1]
+    env = {**os.environ, "PYTHONPATH": str(root), "CUDA_VISIBLE_DEVICES": ""}
+    subprocess.run([sys.executable, "-c", TWO_REPLICAS_STEP, str(out)], env=env, cwd=tmp_path, check=True)
+
+    single, replicated = np.load(out)
+    assert np.abs(single).max() > 0
+    np.testing.assert_allclose(replicated, single, atol=1e-5 * np.abs(single).max())
@@ -5,19 +5,89 @@
 
 import os
 import random
+from functools import lru_cache
+
+import cv2
+import numpy as np
 from PIL import Image, ImageDraw, ImageFont
 
+DEFAULT_FONT = '/System/Library/Fonts/Helvetica.ttc'
+CHARS = 'ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789'
+
+
+@lru_cache(maxsize=64)
+def load_font(path, size):
+    # ================================================================================================================================
+    # Fonts are loaded once per process (truetype parsing is slower than drawing the captcha)
+    # ================================================================================================================================
+    try:
+        return ImageFont.truetype(path, size)
+    except OSError:
+        return ImageFont.load_default()
+
+
 class CaptchaGenerator:
-    def __init__(self, width=120, height=72):
+    def __init__(self, width=120, height=72, font_path=DEFAULT_FONT, font_size=32, seed=None,
+                 fonts=None, chars=CHARS, length=6, noise_lines=2, distortion=0.0):
+        # ================================================================================================================================
+        # fonts       : list of font files, one drawn per image (default: [font_path])
+        # length      : int, (min, max) range or {length: weight} distribution
+        # noise_lines : int or (min, max) range
+        # distortion  : amplitude in pixels of a random sine warp (0 = none)
+        # ================================================================================================================================
         self.width = width
         self.height = height
+        self.font_path = font_path
+        self.font_size = font_size
+        self.fonts = list(fonts) if fonts else [font_path]
+        self.chars = chars
+        self.length = length
+        self.noise_lines = noise_lines
+        self.distortion = distortion
+        # Own RNG: parallel workers get independent, reproducible streams
+        self.rng = random.Random(seed)
+
+    def _draw_count(self, value):
+        if isinstance(value, dict):
+            return self.rng.choices(list(value), weights=list(value.values()))[0]
+        if isinstance(value, (tuple, list)):
+            return self.rng.randint(value[0], value[1])
+        return value
+
+    @property
+    def max_length(self):
+        if isinstance(self.length, dict):
+            return max(self.length)
+        if isinstance(self.length, (tuple, list)):
+            return self.length[1]
+        return self.length
     
-    def generate_text(self, length=6):
+    def generate_text(self, length=None):
+        # ================================================================================================================================
+        # Generating random characters (6 by default)
+        # ================================================================================================================================
+        if length is None:
+            length = self._draw_count(self.length)
+        return ''.join(self.rng.choice(self.chars) for _ in range(length))
+
+    def distort(self, image):
         # ================================================================================================================================
-        # Generating random 6 characters
+        # Sine warp: each column is shifted vertically, each row horizontally (random period and phase)
         # ================================================================================================================================
-        chars = 'ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789'
-        return ''.join(random.choice(chars) for _ in range(length))
+        array = np.asarray(image)
+        h, w = array.shape[:2]
+        ys, xs = np.indices((h, w), dtype=np.float32)
+
+        amplitude = self.distortion
+        period_x = self.rng.uniform(0.5, 1.5) * w
+        period_y = self.rng.uniform(0.5, 1.5) * h
+        phase_x, phase_y = self.rng.uniform(0, 2 * np.pi), self.rng.uniform(0, 2 * np.pi)
+
+        map_x = xs + amplitude / 2 * np.sin(2 * np.pi * ys / period_y + phase_y)
+        map_y = ys + amplitude * np.sin(2 * np.pi * xs / period_x + phase_x)
+
+        warped = cv2.remap(array, map_x, map_y, interpolation=cv2.INTER_LINEAR, borderMode=cv2.BORDER_REPLICATE)
+        return Image.fromarray(warped)
     
     def generate_captcha(self, text=None):
         # ================================================================================================================================
@@ -27,18 +97,16 @@ class CaptchaGenerator:
             text = self.generate_text()
         
         # Bg colours
-        bg_color = (random.randint(220, 255),) * 3
+        bg_color = (self.rng.randint(220, 255),) * 3
         image = Image.new('RGB', (self.width, self.height), bg_color)
         draw = ImageDraw.Draw(image)
         
-        # Load font
-        try:
-            font = ImageFont.truetype('/System/Library/Fonts/Helvetica.ttc', 32)
-        except:
-            font = ImageFont.load_default()
+        # Load font (cached)
+        font_path = self.fonts[0] if len(self.fonts) == 1 else self.rng.choice(self.fonts)
+        font = load_font(font_path, self.font_size)
         
         # Text colours
-        text_color = (random.randint(20, 80),)*3
+        text_color = (self.rng.randint(20, 80),)*3
         
         # Center text
         bbox = draw.textbbox((0, 0), text, font=font)
@@ -48,10 +116,13 @@ class CaptchaGenerator:
         draw.text((x, y), text, fill=text_color, font=font)
         
         # Add noise lines
-        for _ in range(2):
-            x1, y1 = random.randint(0, self.width), random.randint(0, self.height)
-            x2, y2 = random.randint(0, self.width), random.randint(0, self.height)
+        for _ in range(self._draw_count(self.noise_lines)):
+            x1, y1 = self.rng.randint(0, self.width), self.rng.randint(0, self.height)
+            x2, y2 = self.rng.randint(0, self.width), self.rng.randint(0, self.height)
             draw.line([(x1, y1), (x2, y2)], fill=(120, 120, 120), width=1)
+
+        if self.distortion:
+            image = self.distort(image)
         
         return image, text
     
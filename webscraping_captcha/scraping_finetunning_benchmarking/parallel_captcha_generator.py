@@ -0,0 +1,146 @@
+# ================================================================================================================================
+# PARALLEL CAPTCHA GENERATOR
+# Millions of synthetic captchas for pre-training: CaptchaGenerator spread over a process pool.
+#
+#   python -m webscraping_captcha.scraping_finetunning_benchmarking.parallel_captcha_generator \
+#       --count 1000000 --format shards --output data/shards/synthetic
+#
+# Each chunk of `chunk_size` images gets its own seed (derived from --seed and the index of its first
+# image): the output is the same whatever the number of workers.
+# ================================================================================================================================
+
+import argparse
+import io
+import os
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from webscraping_captcha.scraping_finetunning_benchmarking.captcha_generator_for_training import (
+    DEFAULT_FONT,
+    CaptchaGenerator,
+)
+
+LABELS_FILE = 'labels.txt'
+
+
+def chunk_seed(seed, start):
+    return int(np.random.SeedSequence([seed, start]).generate_state(1)[0])
+
+
+def render_chunk(start, count, seed, generator_options, output_dir=None):
+    # ================================================================================================================================
+    # Worker: renders `count` captchas. With `output_dir` the PNG files are written here and only
+    # (filename, text) go back to the parent; otherwise the encoded PNG bytes are returned.
+    # ================================================================================================================================
+    generator = CaptchaGenerator(seed=chunk_seed(seed, start), **generator_options)
+
+    samples = []
+    for i in range(start, start + count):
+        image, text = generator.generate_captcha()
+
+        if output_dir is not None:
+            filename = f'captcha_{i:08d}_{text}.png'
+            image.save(os.path.join(output_dir, filename))
+            samples.append((filename, text))
+        else:
+            buffer = io.BytesIO()
+            image.save(buffer, format='PNG')
+            samples.append((buffer.getvalue(), text))
+
+    return samples
+
+
+def generate_chunks(count, seed=0, workers=None, chunk_size=1000, first_index=0,
+                    generator_options=None, output_dir=None):
+    # ================================================================================================================================
+    # Yields the chunks in order. At most 2 chunks per worker are in flight, so memory stays bounded
+    # when the consumer (shard writer, disk) is slower than the workers.
+    # ================================================================================================================================
+    generator_options = generator_options or {}
+    workers = workers or os.cpu_count()
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for start in range(0, count, chunk_size):
+            # Seeded by the global index: a resumed run (first_index > 0) draws new captchas
+            pending.append(pool.submit(
+                render_chunk, first_index + start, min(chunk_size, count - start), seed, generator_options, output_dir
+            ))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+
+        while pending:
+            yield pending.popleft().result()
+
+
+def generate_png(count, output_dir, **options):
+    # ================================================================================================================================
+    # PNG files + append-only labels.txt (one "filename<TAB>text" line per image, flushed per chunk).
+    # A second run in the same folder continues the numbering.
+    # ================================================================================================================================
+    os.makedirs(output_dir, exist_ok=True)
+    labels_path = os.path.join(output_dir, LABELS_FILE)
+
+    first_index = 0
+    if os.path.exists(labels_path):
+        with open(labels_path, encoding='utf-8') as f:
+            first_index = sum(1 for line in f if line.strip())
+
+    written = 0
+    with open(labels_path, 'a', encoding='utf-8') as f:
+        for samples in generate_chunks(count, first_index=first_index, output_dir=output_dir, **options):
+            f.write(''.join(f'{filename}\t{text}\n' for filename, text in samples))
+            f.flush()
+            written += len(samples)
+            print(f'{written}/{count} images')
+
+    return written
+
+
+def generate_shards(count, output_dir, shard_size=4096, label_length=6, **options):
+    # ================================================================================================================================
+    # Sharded dataset (ocr/shards.py), labels lower-cased like the OCR alphabet.
+    # ================================================================================================================================
+    from ocr.shards import ShardWriter
+
+    writer = ShardWriter(output_dir, label_length=label_length, shard_size=shard_size)
+    for samples in generate_chunks(count, **options):
+        writer.add([data for data, _ in samples], [text.lower() for _, text in samples])
+
+    return writer.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Parallel synthetic captcha generation')
+    parser.add_argument('--count', type=int, required=True)
+    parser.add_argument('--output', required=True)
+    parser.add_argument('--format', choices=('shards', 'png'), default='shards')
+    parser.add_argument('--workers', type=int, default=None, help='Default: number of CPUs')
+    parser.add_argument('--chunk-size', type=int, default=1000)
+    parser.add_argument('--shard-size', type=int, default=4096)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--font', default=DEFAULT_FONT)
+    parser.add_argument('--font-size', type=int, default=32)
+    args = parser.parse_args(argv)
+
+    options = {
+        'seed': args.seed,
+        'workers': args.workers,
+        'chunk_size': args.chunk_size,
+        'generator_options': {'font_path': args.font, 'font_size': args.font_size},
+    }
+
+    if args.format == 'png':
+        written = generate_png(args.count, args.output, **options)
+        print(f'Created {written} images in {args.output}/ (labels in {LABELS_FILE})')
+    else:
+        index = generate_shards(args.count, args.output, shard_size=args.shard_size, **options)
+        print(f"Created {index['count']} images in {len(index['shards'])} shards in {args.output}/")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,148 @@
+# ================================================================================================================================
+# ON-THE-FLY SYNTHETIC CAPTCHAS
+# Infinite stream of CaptchaGenerator batches for training, with no PNG round trip through disk.
+#
+#   with SyntheticCaptchaSource(batch_size=256, workers=4, length=(4, 6), distortion=2) as source:
+#       images, labels = next(iter(source))      # (256, 200, 50, 1) float32, ['a8k2b', ...]
+#
+# - SyntheticCaptchaSource : background processes render batches and hand over NumPy buffers,
+#   either preprocessed for the CTC model (mode="ctc") or raw RGB (mode="rgb")
+# - ocr.train.build_synthetic_dataset : tf.data.Dataset on top of it
+# - torch_dataset : PyTorch IterableDataset (RGB arrays + text) for TrOCR
+# ================================================================================================================================
+
+import multiprocessing
+import queue
+
+import cv2
+import numpy as np
+
+from webscraping_captcha.scraping_finetunning_benchmarking.captcha_generator_for_training import CaptchaGenerator
+from webscraping_captcha.scraping_finetunning_benchmarking.parallel_captcha_generator import chunk_seed
+
+
+def render_batch(generator, batch_size, mode='ctc', lowercase=True):
+    # ================================================================================================================================
+    # One batch as NumPy: (B, 200, 50, 1) float32 (same preprocessing as the API) or (B, H, W, 3) uint8
+    # ================================================================================================================================
+    images, texts = [], []
+    for _ in range(batch_size):
+        image, text = generator.generate_captcha()
+        images.append(np.asarray(image))
+        texts.append(text.lower() if lowercase else text)
+
+    if mode == 'ctc':
+        from ocr.preprocess import preprocess_batch_np
+        return preprocess_batch_np([cv2.cvtColor(image, cv2.COLOR_RGB2GRAY) for image in images]), texts
+
+    return np.stack(images), texts
+
+
+def _worker(batches, stop, seed, batch_size, mode, lowercase, generator_options):
+    generator = CaptchaGenerator(seed=seed, **generator_options)
+
+    while not stop.is_set():
+        batch = render_batch(generator, batch_size, mode, lowercase)
+
+        # Bounded queue: the worker waits while the training loop is behind
+        while not stop.is_set():
+            try:
+                batches.put(batch, timeout=0.5)
+                break
+            except queue.Full:
+                continue
+
+
+class SyntheticCaptchaSource:
+    def __init__(self, batch_size=256, workers=2, prefetch=4, seed=0, mode='ctc', lowercase=True,
+                 **generator_options):
+        # ================================================================================================================================
+        # generator_options : CaptchaGenerator options (fonts, length, noise_lines, distortion, ...)
+        # prefetch          : batches kept ready in advance (shared by all workers)
+        # ================================================================================================================================
+        if mode not in ('ctc', 'rgb'):
+            raise ValueError(f'Unknown mode: {mode}')
+
+        self.batch_size = batch_size
+        self.workers = workers
+        self.prefetch = prefetch
+        self.seed = seed
+        self.mode = mode
+        self.lowercase = lowercase
+        self.generator_options = generator_options
+        self.max_length = CaptchaGenerator(**generator_options).max_length
+
+        self._processes = []
+        self._batches = None
+        self._stop = None
+
+    def start(self):
+        if self._processes:
+            return self
+
+        # spawn: safe even when TensorFlow / PyTorch are already loaded in the parent
+        ctx = multiprocessing.get_context('spawn')
+        self._batches = ctx.Queue(maxsize=self.prefetch)
+        self._stop = ctx.Event()
+
+        for worker in range(self.workers):
+            process = ctx.Process(
+                target=_worker,
+                args=(self._batches, self._stop, chunk_seed(self.seed, worker), self.batch_size,
+                      self.mode, self.lowercase, self.generator_options),
+                daemon=True,
+            )
+            process.start()
+            self._processes.append(process)
+
+        return self
+
+    def __iter__(self):
+        self.start()
+        while True:
+            yield self._batches.get()
+
+    def close(self):
+        if not self._processes:
+            return
+
+        self._stop.set()
+        # Drain so that workers blocked on put() can exit
+        try:
+            while True:
+                self._batches.get_nowait()
+        except queue.Empty:
+            pass
+
+        for process in self._processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+        self._processes = []
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def torch_dataset(seed=0, lowercase=True, **generator_options):
+    # ================================================================================================================================
+    # PyTorch IterableDataset: infinite (RGB uint8 array, text) samples for TrOCR. Rendering happens in the
+    # DataLoader workers, each with its own seed:
+    #
+    #   loader = DataLoader(torch_dataset(length=(4, 6)), batch_size=16, num_workers=4,
+    #                       collate_fn=lambda batch: tuple(zip(*batch)))
+    # ================================================================================================================================
+    import torch
+
+    class SyntheticCaptchaDataset(torch.utils.data.IterableDataset):
+        def __iter__(self):
+            info = torch.utils.data.get_worker_info()
+            generator = CaptchaGenerator(seed=chunk_seed(seed, info.id if info else 0), **generator_options)
+            while True:
+                image, text = generator.generate_captcha()
+                yield np.asarray(image), text.lower() if lowercase else text
+
+    return SyntheticCaptchaDataset()